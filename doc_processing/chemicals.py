@@ -12,44 +12,168 @@ Out: ['MnSi']
 """
 
 import collections
-import csv
+import functools
 import os
 import re
 
 import numpy as np
 import pandas as pd
+import regex
 from mat2vec.processing.process import MaterialsTextProcessor
 from pymatgen.core.composition import Composition
 
-# The following units are not accepted as chemical formulae
-NOT_CHEMICALS = ["K", "h", "V", "wt", "wt.", "MHz", "kHz", "GHz", "Hz", "days", "weeks",
-                 "T", "MPa", "GPa", "N", "A", "kOe", "Oe", "h.", "mWcm−2", "keV", "MeV", "meV",
-                 "mAcm−2", "mA", "mK", "mT", "s-1", "dB",
-                 "Ag-1", "mAg-1", "mAg−1", "mAg", "mAh", "mAhg−1", "m-2", "mJ", "kJ",
-                 "m2g−1", "THz", "KHz", "kJmol−1", "Torr", "gL-1", "Vcm−1", "mVs−1",
-                 "J", "GJ", "mTorr", "bar", "cm2", "mbar", "kbar", "mmol", "mol", "molL−1",
-                 "MΩ", "Ω", "kΩ", "mΩ", "mgL−1", "moldm−3", "m2", "m3", "cm-1", "cm",
-                 "Scm−1", "Acm−1", "eV−1cm−2", "cm-2", "sccm", "cm−2eV−1", "cm−3eV−1",
-                 "kA", "s−1", "emu", "L", "cmHz1", "gmol−1", "kVcm−1", "MPam1",
-                 "cm2V−1s−1", "Acm−2", "cm−2s−1", "MV", "ionscm−2", "Jcm−2", "ncm−2",
-                 "Jcm−2", "Wcm−2", "GWcm−2", "Acm−2K−2", "gcm−3", "cm3g−1", "mgl−1",
-                 "mgml−1", "mgcm−2", "mΩcm", "cm−2s−1", "cm−2", "ions", "moll−1",
-                 "nmol", "psi", "mol·L−1", "Jkg−1K−1", "km", "Wm−2", "mass", "mmHg",
-                 "mmmin−1", "GeV", "m−2", "m−2s−1", "Kmin−1", "gL−1", "ng", "hr", "w",
-                 "mN", "kN", "Mrad", "rad", "arcsec", "Ag−1", "dpa", "cdm−2",
-                 "mHz", "mL", "ML", "mlmin−1", "MWm−2",
-                 "Wm−1K−1", "Wm−1K−1", "kWh", "Wkg−1", "Jm−3", "m-3", "gl−1", "A−1",
-                 "Ks−1", "mgdm−3", "mms−1", "ks", "appm", "ºC", "HV", "kDa", "Da", "kG",
-                 "kGy", "MGy", "Gy", "mGy", "Gbps", "μB", "μL", "μF", "nF", "pF", "mF",
-                 "A", "Å", "A˚", "μgL−1", "MGOe", "AMFs", "TC", "Tc", "TN", "Tn"]
-
-ELEMENTS = ["H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar", "K",
-            "Ca", "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn", "Ga", "Ge", "As", "Se", "Br", "Kr",
-            "Rb", "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn", "Sb", "Te", "I",
-            "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb",
-            "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr",
-            "Ra", "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr", "Rf",
-            "Db", "Sg", "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og", "Uue"]
+import lexicon as lex
+import sinks
+
+# The lists of words are kept in lexicon.py
+NOT_CHEMICALS = lex.NOT_CHEMICALS
+ELEMENTS = lex.ELEMENTS
+
+# Maximum number of formulae whose compositions are kept in memory (see composition_key)
+COMPOSITION_CACHE_SIZE = 65536
+# Number of decimals the atomic fractions of a composition key are rounded to
+KEY_DECIMALS = 6
+
+# Tokens are either a capitalised word (with optional brackets and surrounding space), a number or a subscript x/y
+# Possessive quantifiers (regex package): none of the tokens can be found by giving back characters,
+# so the tokens are the same as with '[ ]?[(]?[A-Z][a-z()]*[ ]?|(?:\d+[.]?\d*[)]?|[-+]?[xy])', without backtracking
+TOKEN_PATTERN = regex.compile('[ ]?+[(]?+[A-Z][a-z()]*+[ ]?+|(?:\d++[.]?+\d*+[)]?+|[-+]?+[xy])')
+_TWO_LOWERCASE = re.compile('[a-z]{2}')
+_WORD = re.compile('\w+')
+_DIGIT = re.compile('\d')
+_BRACKET_FOLLOWED_BY_NUMBER = regex.compile('[(][A-Za-z0-9.]++[)]\d')
+_ELEMENT_SYMBOL = re.compile('[A-Z][a-z]')
+_FORMULA_CHARACTERS = re.compile('[A-Za-z0-9.()]')
+_LEADING_DIGIT = re.compile('\A\d')
+_LEADING_XY = re.compile('\A[xy]')
+_CHEMICAL_CHARACTERS = re.compile('[A-Za-z0-9.()-+]')
+
+
+def is_element_token(token):
+    """
+    Whether or not a token contains a chemical element symbol as a separate word
+    (e.g. 'Fe', ' (Fe ' but not 'Fa' or 'Tc')
+    :param token: string
+    :return: boolean
+    """
+    return not lex.is_excluded(token) and any(lex.is_element(word) for word in _WORD.findall(token))
+
+
+def scan_phrases(text):
+    """
+    Single left-to-right pass over text, joining adjacent tokens into candidate chemical phrases.
+    A phrase is a run of tokens where each token starts exactly where the previous one ends
+    (e.g. 'Cu', '2', ' OSe', 'O', '3' for 'Cu2 OSeO3'), or a single token containing an element symbol.
+
+    beg is the offset from which the current token is looked up. Each look-up is bounded by the end of
+    the token itself, so the text is only ever read forward and the scan is linear in the length of text.
+    :param text: string
+    :return: list of (phrase, start, end), with start and end being the offsets of the phrase in text
+    """
+    tokens = [m for m in TOKEN_PATTERN.finditer(text) if not _TWO_LOWERCASE.search(m.group())]
+    phrases = []
+    beg = 0
+    position = 0  # where the previous phrase ends
+
+    for i, m in enumerate(tokens):
+        token = m.group()
+        found = text.find(token, beg, m.end())
+
+        # If the token is found where the previous phrase ends, then add the token to the end of that phrase
+        if found == position and position != 0:
+            phrase, start, _ = phrases[-1]
+            phrases[-1] = (phrase + token, start, m.end())
+            beg = beg + len(token)
+            position = beg
+
+        # If the token ends where the next token starts, then it begins a new phrase
+        elif i != len(tokens) - 1 and not _DIGIT.search(token) \
+                and text.find(tokens[i + 1].group(), beg, found + len(token) + len(tokens[i + 1].group())) \
+                == found + len(token):
+            phrases.append((token, m.start(), m.end()))
+            beg = found + len(token)
+            position = beg
+
+        # If the token is a chemical element on its own, keep it as a phrase
+        elif is_element_token(token):
+            phrases.append((token, m.start(), m.end()))
+            beg = found + len(token)
+
+        # Otherwise, move past the token
+        else:
+            beg = found + len(token)
+
+    return phrases
+
+
+def clean_phrase(phrase):
+    """
+    Clean up a candidate phrase found by scan_phrases
+    :param phrase: string
+    :return: string (the chemical formula, with whitespace removed) or None if the phrase is not a chemical
+    """
+    t = phrase
+
+    # 1. If a closing bracket is not followed by a number, then split the inside and outside of bracket
+    #    then save the part that is a chemical formula
+    if ')' in t and '(' in t:
+        if not _BRACKET_FOLLOWED_BY_NUMBER.search(t):
+            for part in t.split('('):
+                if _ELEMENT_SYMBOL.search(part):
+                    phrase = part
+                    t = part
+
+    # 2. If the phrase starts with a number, then it is not a chemical formula
+    if _LEADING_DIGIT.findall(''.join(_FORMULA_CHARACTERS.findall(phrase))):
+        return None
+
+    # 3. If the phrase begins with a lowercase x or y, then remove this x or y (due to matching for x or y in
+    #                                                                           subscript)
+    if _LEADING_XY.findall(''.join(phrase.split())):
+        phrase = phrase[1:]
+
+    # 4. If the phrase does not contain an element symbol with an uppercase and a lowercase letter,
+    #    then ignore it
+    if not _ELEMENT_SYMBOL.search(t):
+        return None
+
+    if ')' in t and '(' not in t:
+        phrase = phrase.replace(')', '')
+    if t[0] == '.':
+        phrase = t[1:]
+    if t[-1] == '.':
+        phrase = t[:-1]
+    if '(' in t and ')' not in t:
+        phrase = phrase.replace('(', '')
+
+    if lex.is_excluded(''.join(_CHEMICAL_CHARACTERS.findall(phrase))):
+        return None
+    return ''.join(phrase.split())
+
+
+def find_chemical_spans(text):
+    """
+    Same as find_chemical, but each chemical is returned with its position in text
+    :param: text (str)
+    :return: list of (chemical, start, end), sorted by start.
+             text[start:end] is the chemical as it is written in text (e.g. 'Cu 2 OSeO 3' for 'Cu2OSeO3')
+
+    Example:
+    >>> from doc_processing.chemicals import find_chemical_spans
+    >>> find_chemical_spans('MnSi orders below T c =29.6K [11] helimagnetically.')
+    Out: [('MnSi', 0, 4)]
+    """
+    assert type(text) == str, "Input (parameter text) must be of string type."
+
+    result = []
+    for phrase, start, end in scan_phrases(text):
+        chemical = clean_phrase(phrase)
+        if chemical is not None:
+            # Leave out the spaces around the phrase
+            start = start + len(phrase) - len(phrase.lstrip())
+            end = end - len(phrase) + len(phrase.rstrip())
+            result.append((chemical, start, end))
+    return result
 
 
 def find_chemical(text, sorted_dict=False):
@@ -65,6 +189,8 @@ def find_chemical(text, sorted_dict=False):
     These limitations are acceptable for the materials that we care about, but this function is
     definitely not general.
 
+    The text is scanned once (see scan_phrases), so the running time is linear in the length of the text.
+
     Example:
     >>> from doc_processing.chemicals import find_chemical
     >>> find_chemical('MnSi orders below T c =29.6K [11] helimagnetically.')
@@ -84,93 +210,25 @@ def find_chemical(text, sorted_dict=False):
     """
     assert type(text) == str, "Input (parameter text) must be of string type."
 
-    # The bit of code below try to match to chemicals written in the form Cu 2 OSeO 3
-
-    temp = [x for x in re.findall('[ ]?[(]?[A-Z][a-z()]*[ ]?|'
-                                  '(?:\d+[.]?\d*[)]?|[-+]?[xy])', text)
-            if not re.search('[a-z]{2}', x)]
+    result = [chemical for chemical, _, _ in find_chemical_spans(text)]
 
-    beg = 0
-    position = 0  # where the previous word ends
-    temp2 = []  # Eliminates phrases that are either not a chemical element or not a part of a bigger phrase
-
-    for i in range(len(temp)):
-        # If the phrase is found where the previous phrase ends, then add that phrase to the end of the previous phrase
-        if text.find(temp[i], beg) == position and position != 0:
-            if i > 0 and len(temp2) > 0:  # and not (re.search('\d',temp[i-1]) and re.search('\d', temp[i])):
-                temp2[-1] = (temp2[-1] + temp[i])
-                beg = beg + len(temp[i])
-                position = beg
-
-        # If the phrase ends where the next phrase starts, then add the phrase to temp2
-        elif (i != len(temp) - 1) and (text.find(temp[i], beg) + len(temp[i]) == text.find(temp[i + 1], beg)) \
-                and not re.search('\d', temp[i]):
-
-            temp2.append(temp[i])
-            beg = text.find(temp[i + 1], beg)  # + len(temp[i+1])
-            position = beg
-
-        # If the phrase is a chemical element, add it to temp2
-        elif any(el for el in ELEMENTS if re.findall('(?:\A|\W)' + el + '(?:\W|\Z)', temp[i])) and temp[
-            i] not in NOT_CHEMICALS:
-            temp2.append(temp[i])
-            beg = text.find(temp[i], beg) + len(temp[i])
-
-        # Otherwise, if the phrase is found but does not meet any of the other requirements
-        elif text.find(temp[i], beg) != -1:
-            beg = text.find(temp[i], beg) + len(temp[i])
-
-    # Cleaning up phrases to get relevant results
-    temp3 = []
-
-    for i, t in enumerate(temp2):
-
-        # 1. If a closing bracket is not followed by a number, then split the inside and outside of bracket
-        #    then save the part that is a chemical formula
-        if ')' in t and '(' in t:
-            if not re.search('[(][A-Za-z0-9.]+[)]\d', t):
-                for part in t.split('('):
-                    if re.search('[A-Z][a-z]', part):
-                        temp2[i] = part
-                        t = part
-
-        # 2. If the phrase starts with a number, then it is not a chemical formula
-        if re.findall('\A\d', ''.join(re.findall('[A-Za-z0-9.()]', temp2[i]))):
-            continue
-
-        # 3. If the phrase begins with a lowercase x or y, then remove this x or y (due to matching for x or y in
-        #                                                                           subscript)
-        if re.findall('\A[xy]', ''.join(temp2[i].split())):
-            temp2[i] = temp2[i][1:]
-
-        # 4. If the phrase does not contain an element symbol with an uppercase and a lowercase letter,
-        #    then ignore it
-        if not re.search('[A-Z][a-z]', t):
-            continue
-
-        if ')' in t and '(' not in t:
-            temp2[i] = temp2[i].replace(')', '')
-        if t[0] == '.':
-            temp2[i] = t[1:]
-        if t[-1] == '.':
-            temp2[i] = t[:-1]
-        if '(' in t and ')' not in t:
-            temp2[i] = temp2[i].replace('(', '')
-
-        if ''.join(re.findall('[A-Za-z0-9.()-+]', temp2[i])) not in NOT_CHEMICALS:
-            temp3.append(''.join(temp2[i].split()))
-
-    result = temp3
-
-    if sorted_dict:
-        counter = collections.Counter(result)
-        sorted_counter = sorted(counter.items(), key=lambda kv: kv[1])
-        sorted_dict = collections.OrderedDict(sorted_counter)
-        return sorted_dict
+    if sorted_dict and sorted_dict != 'n':
+        return sort_by_frequency(result)
     else:
         return result
 
 
+def sort_by_frequency(chemicals):
+    """
+    :param chemicals: list of chemicals (str)
+    :return: OrderedDict with keys being the chemicals and values being the number of mentions,
+             sorted from the least to the most mentioned
+    """
+    counter = collections.Counter(chemicals)
+    sorted_counter = sorted(counter.items(), key=lambda kv: kv[1])
+    return collections.OrderedDict(sorted_counter)
+
+
 def find_overlap(text, list_1, list_2):
     """
     A function written to help with find_chemicals - No longer in use
@@ -209,10 +267,95 @@ def write_chemical_latex(chemical):
     return result
 
 
+@functools.lru_cache(maxsize=COMPOSITION_CACHE_SIZE)
+def parse_composition(formula):
+    """
+    :param formula: str
+    :return: pymatgen Composition of formula, or None if formula is not a valid formula.
+             Each formula is only parsed once (the last COMPOSITION_CACHE_SIZE formulae are kept)
+    """
+    if type(formula) != str:
+        return None
+    try:
+        return Composition(formula)
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=COMPOSITION_CACHE_SIZE)
+def composition_key(formula):
+    """
+    Canonical key of the composition of a formula: formulae of the same composition, whatever the way they are
+    written (e.g. 'FeGe', 'GeFe', 'Fe2Ge2', 'Fe0.5Ge0.5', 'Fe Ge') have the same key, so that they can be compared,
+    grouped or joined with hash lookups.
+    :param formula: str
+    :return: tuple of (element, atomic fraction), sorted by element; None if formula is not a valid formula
+
+    Example:
+    >>> composition_key('Cu2OSeO3')
+    OUT: (('Cu', 0.285714), ('O', 0.571429), ('Se', 0.142857))
+    >>> composition_key('Fe Ge') == composition_key('Ge2Fe2')
+    OUT: True
+    """
+    composition = parse_composition(formula)
+    if composition is None:
+        return None
+    amounts = composition.fractional_composition.get_el_amt_dict()
+    if not amounts or not all(lex.is_element(element) for element in amounts):
+        return None
+    return tuple(sorted((element, round(amount, KEY_DECIMALS)) for element, amount in amounts.items()))
+
+
+def normalize_many(formulae):
+    """
+    Composition keys of a list of formulae. Each distinct formula is only parsed once
+    :param formulae: list of str (or pandas Series)
+    :return: list of composition keys (see composition_key), in the order of formulae
+    """
+    keys = {formula: composition_key(formula) for formula in pd.unique(pd.Series(formulae, dtype=object))}
+    return [keys[formula] for formula in formulae]
+
+
+def group_by_composition(formulae):
+    """
+    :param formulae: list of str
+    :return: OrderedDict, keys are composition keys and values are the lists of formulae of this composition.
+             Formulae which are not valid formulae are left out
+
+    Example:
+    >>> group_by_composition(['FeGe', 'MnSi', 'Fe2Ge2'])
+    OUT: OrderedDict([((('Fe', 0.5), ('Ge', 0.5)), ['FeGe', 'Fe2Ge2']), ((('Mn', 0.5), ('Si', 0.5)), ['MnSi'])])
+    """
+    groups = collections.OrderedDict()
+    for formula, key in zip(formulae, normalize_many(formulae)):
+        if key is not None:
+            groups.setdefault(key, []).append(formula)
+    return groups
+
+
+_processor = None
+
+
+@functools.lru_cache(maxsize=COMPOSITION_CACHE_SIZE)
+def normalized_formula(name):
+    """
+    :param name: str
+    :return: str, the formula normalised by mat2vec. The MaterialsTextProcessor is only created once
+    """
+    global _processor
+    if _processor is None:
+        _processor = MaterialsTextProcessor()
+    return _processor.normalized_formula(name)
+
+
 class Material:
     def __init__(self, name):
-        self.dict_repr = Composition(name).get_el_amt_dict()
-        self.normalized = MaterialsTextProcessor().normalized_formula(name)
+        composition = parse_composition(name)
+        if composition is None:
+            raise ValueError('\'' + str(name) + '\' is not a valid formula')
+        self.dict_repr = composition.get_el_amt_dict()
+        self.key = composition_key(name)
+        self.normalized = normalized_formula(name)
         self.curie_T = []
 
         if not os.path.exists(os.path.join('Materials', self.write_chemical())):
@@ -228,10 +371,19 @@ class Material:
         self.ferrimagnet = None
 
     def isequal(self, name):
-        if self.normalized == MaterialsTextProcessor().normalized_formula(name):
-            return True
-        else:
-            return False
+        """
+        :param name: str or Material
+        :return: boolean, whether or not name has the same composition as this material
+        """
+        if isinstance(name, Material):
+            return self.key == name.key
+        return self.key == composition_key(name)
+
+    def __eq__(self, other):
+        return isinstance(other, Material) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
     def add_Curie_T_mentions(self, curie_mention):
         """
@@ -266,16 +418,10 @@ class Material:
         # Temperature/'+ filename):
 
         ### OVERWRITE EXISTING FILE 
-        with open(os.path.join('Materials', self.write_chemical(), 'curie_temperature.csv'), 'w') as f:
-            write = csv.writer(f)
-            write.writerow(columns)
-
-        for curie_mention in self.curie_T:
-            write_out = self.write_chemical() + curie_mention
-
-            with open(os.path.join('Materials', self.write_chemical(), 'curie_temperature.csv'), 'a') as f:
-                writeo = csv.writer(f)
-                writeo.writerow(write_out)
+        with sinks.CSVSink(os.path.join('Materials', self.write_chemical(), 'curie_temperature.csv'), columns,
+                           rewrite='y') as sink:
+            for curie_mention in self.curie_T:
+                sink.write([self.write_chemical()] + list(curie_mention))
 
     def load_Curie_T(self):
         if os.path.exists(os.path.join('Materials', self.write_chemical(), 'curie_temperature.csv')):
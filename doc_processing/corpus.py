@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Running the extraction of Doc.extract_all over a whole corpus of downloaded articles, using several processes.
+
+The corpus is a directory laid out the way the scrapers write it:
+    Elsevier soups/<query>/<file>.json                 (written by webscraping/elsevier_query.py)
+    SpringerNature_soups/<query>/<identifier>.txt      (written by webscraping/springer_query.py)
+    SpringerNature_query/<query>.json                  (the metadata records of the Springer articles)
+
+The identifiers of the documents that have been processed are written to a checkpoint file, so that
+a run that is stopped can be started again and only processes the remaining documents. The checkpoint
+starts with the fingerprint of the extraction (extractor version, registries, properties, keywords and options);
+a checkpoint of another extraction is discarded.
+
+Every processed document is also recorded in a manifest, with its DOI, the hash of its text and the
+fingerprint of the extraction. A later run skips the documents whose text and extraction fingerprint have not
+changed, so only new or modified articles are processed again. The records are then written to the same files
+at every run, and the old records of a modified article are deleted from them before its new records are added.
+
+If a feature cache is given, the sentences, chemicals and quantities of each document are read from it
+(see feature_cache.py), so that running the extraction again with other keywords is much faster.
+
+To import this file, call
+
+>>> from doc_processing.corpus import Corpus
+>>> corpus = Corpus('.', processes=4)
+>>> records = corpus.run(['curie_temperature'])
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import urllib.parse
+
+from tqdm import tqdm
+
+from doc_processing.document import Doc, PROPERTIES, EXTRACTOR_VERSION
+from doc_processing.elsevier_doc import ElsevierDoc
+from doc_processing.feature_cache import FeatureCache, registry_hash, text_hash
+from doc_processing.springer_doc import SpringerDoc
+
+ELSEVIER_FOLDER = 'Elsevier soups'
+SPRINGER_FOLDER = 'SpringerNature_soups'
+SPRINGER_QUERY_FOLDER = 'SpringerNature_query'
+
+# Manifest of the previous runs, set in each worker process by set_manifest
+MANIFEST = {}
+
+# Start of the first line of a checkpoint file, followed by the fingerprint of the extraction
+CHECKPOINT_HEADER = '# fingerprint '
+
+
+def load_document(spec):
+    """
+    :param spec: (doc_id, kind, path, record) as returned by Corpus.documents
+    :return: ElsevierDoc or SpringerDoc
+    """
+    doc_id, kind, path, record = spec
+    if kind == 'elsevier':
+        with open(path, encoding='utf-8') as f:
+            return ElsevierDoc(json.load(f))
+    elif kind == 'springer':
+        from bs4 import BeautifulSoup
+        with open(path, encoding='utf-8') as f:
+            return SpringerDoc(record, BeautifulSoup(f.read(), 'html.parser'))
+    else:
+        raise ValueError('Document kind \'' + str(kind) + '\' is not recognised. '
+                         'The only recognised kinds are \'elsevier\' and \'springer\'.')
+
+
+def set_manifest(manifest):
+    global MANIFEST
+    MANIFEST = manifest
+
+
+def stable_key(value):
+    """
+    A value that is the same at every run for the same settings, to be written to JSON
+    (objects are represented by their class and their configuration, not by their repr, which contains their address)
+    :param value: an argument of Doc.extract_all
+    :return: None, bool, int, float, str, list or dictionary
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): stable_key(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted((stable_key(v) for v in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [stable_key(v) for v in value]
+    name = type(value).__module__ + '.' + type(value).__qualname__
+    if hasattr(value, 'config'):
+        return {'class': name, 'config': stable_key(value.config())}
+    if callable(value) and hasattr(value, '__qualname__'):
+        return {'function': value.__module__ + '.' + value.__qualname__}
+    raise ValueError('Cannot fingerprint the argument ' + repr(value) + ' of the extraction: ' + name
+                     + ' has no config method.')
+
+
+def fingerprint(properties, kwargs):
+    """
+    Fingerprint of an extraction: it changes if the extractor version, the registered units and exclusions
+    (see feature_cache.registry_hash), the properties, their keywords or the other arguments of Doc.extract_all change
+    :param properties: list of str, keys of PROPERTIES
+    :param kwargs: dictionary, the other arguments passed to Doc.extract_all (see stable_key)
+    :return: str
+    """
+    keywords = kwargs.get('keywords') or {}
+    config = {'version': EXTRACTOR_VERSION,
+              'registries': registry_hash(),
+              'properties': sorted(properties),
+              'keywords': {p: keywords.get(p) or PROPERTIES[p]['keywords'] for p in properties},
+              'options': stable_key({k: v for k, v in kwargs.items() if k != 'keywords'})}
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def extract_document(task):
+    """
+    Extract the properties of one document. This is the function run by the worker processes
+    :param task: (spec, extract_all arguments, fingerprint of the extraction, whether unchanged documents are skipped,
+                  folder of the feature cache or None)
+    :return: (doc_id, dictionary of records or None, error message or None, manifest entry or None)
+             The records are None if the document has not changed since it was last processed
+    """
+    spec, kwargs, config, incremental, feature_cache = task
+    try:
+        doc = load_document(spec)
+        entry = {'key': doc.doi if doc.doi else spec[0], 'doi': doc.doi, 'title': doc.title, 'path': spec[0],
+                 'hash': text_hash(doc.text), 'fingerprint': config}
+        previous = MANIFEST.get(entry['key'])
+        if incremental and previous is not None and previous['hash'] == entry['hash'] \
+                and previous['fingerprint'] == config:
+            return spec[0], None, None, entry
+        if feature_cache is not None:
+            FeatureCache(feature_cache).attach(doc)
+        return spec[0], doc.extract_all(write='n', **kwargs), None, entry
+    except Exception as e:
+        return spec[0], None, repr(e), None
+
+
+class Corpus:
+    def __init__(self, directory='.', processes=None, chunksize=8, checkpoint=None, manifest=None,
+                 feature_cache=None):
+        """
+        :param directory: str, the directory containing 'Elsevier soups' and/or 'SpringerNature_soups'
+        :param processes: None or int, the number of worker processes
+                        If not specified, one process per CPU is used. If 1, no pool is started
+        :param chunksize: int, the number of documents sent to a worker at once
+        :param checkpoint: None or str, the file the identifiers of processed documents are written to
+                        If not specified, it is 'corpus_checkpoint.txt' in directory
+        :param manifest: None or str, the file the processed documents are recorded in (one JSON entry per line)
+                        If not specified, it is 'corpus_manifest.jsonl' in directory
+        :param feature_cache: None or str, the folder the features of the documents are cached in
+                        (see feature_cache.FeatureCache). If not specified, no features are cached
+        """
+        self.directory = directory
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.chunksize = chunksize
+        if checkpoint is None:
+            checkpoint = os.path.join(directory, 'corpus_checkpoint.txt')
+        self.checkpoint = checkpoint
+        if manifest is None:
+            manifest = os.path.join(directory, 'corpus_manifest.jsonl')
+        self.manifest = manifest
+        self.feature_cache = feature_cache
+        self.errors = {}
+        self.unchanged = []
+
+    def documents(self):
+        """
+        List the documents of the corpus, without reading them
+        :return: list of (doc_id, kind, path, record); doc_id is the path of the file relative to the directory,
+                 kind is 'elsevier' or 'springer', record is the Springer metadata record (None for Elsevier)
+        """
+        result = []
+
+        elsevier_folder = os.path.join(self.directory, ELSEVIER_FOLDER)
+        for root, _, files in sorted(os.walk(elsevier_folder)):
+            for name in sorted(files):
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    result.append((os.path.relpath(path, self.directory), 'elsevier', path, None))
+
+        springer_folder = os.path.join(self.directory, SPRINGER_FOLDER)
+        if os.path.isdir(springer_folder):
+            for query in sorted(os.listdir(springer_folder)):
+                records = self.springer_records(query)
+                query_folder = os.path.join(springer_folder, query)
+                if not os.path.isdir(query_folder):
+                    continue
+                for name in sorted(os.listdir(query_folder)):
+                    if name.endswith('.txt'):
+                        path = os.path.join(query_folder, name)
+                        identifier = urllib.parse.unquote_plus(name[:-len('.txt')])
+                        result.append((os.path.relpath(path, self.directory), 'springer', path,
+                                       records.get(identifier, {})))
+
+        return result
+
+    def springer_records(self, query):
+        """
+        :param query: str, the name of a folder in SpringerNature_soups
+        :return: dictionary, keys are the identifiers of the articles and values are their metadata records
+        """
+        path = os.path.join(self.directory, SPRINGER_QUERY_FOLDER, query + '.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return {r['identifier']: r for r in data.get('records', []) if 'identifier' in r}
+
+    def completed(self):
+        """
+        :return: set of the identifiers of the documents already processed (read from the checkpoint file)
+        """
+        if not os.path.exists(self.checkpoint):
+            return set()
+        with open(self.checkpoint, encoding='utf-8') as f:
+            return set(line.rstrip('\n') for line in f if line.strip() and not line.startswith(CHECKPOINT_HEADER))
+
+    def checkpoint_fingerprint(self):
+        """
+        :return: str, the fingerprint of the extraction the checkpoint file was written by,
+                 or None if there is no checkpoint file (or it was written without a fingerprint)
+        """
+        if not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint, encoding='utf-8') as f:
+            line = f.readline().rstrip('\n')
+        return line[len(CHECKPOINT_HEADER):] if line.startswith(CHECKPOINT_HEADER) else None
+
+    def load_manifest(self):
+        """
+        :return: dictionary, keys are the DOIs of the documents (or their identifiers if they have no DOI)
+                 and values are their latest manifest entries
+        """
+        manifest = {}
+        if os.path.exists(self.manifest):
+            with open(self.manifest, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        manifest[entry['key']] = entry
+        return manifest
+
+    @staticmethod
+    def save_checkpoint(checkpoint, manifest, pending, outputs, replaced=()):
+        """
+        Mark documents as done. Their records are written out first (and the old records of the documents
+        extracted again are deleted), so that a document in the checkpoint file always has its records,
+        and only them, in the output files.
+        :param checkpoint: the checkpoint file, open in append mode
+        :param manifest: the manifest file, open in append mode
+        :param pending: list of (doc_id, manifest entry or None)
+        :param outputs: dictionary of sinks.ResultSink
+        :param replaced: list of dictionaries, the values of the old records to delete (see old_records)
+        """
+        for sink in outputs.values():
+            sink.flush()
+            sink.delete_previous(list(replaced))
+        for doc_id, entry in pending:
+            checkpoint.write(doc_id + '\n')
+            if entry is not None:
+                manifest.write(json.dumps(entry) + '\n')
+        checkpoint.flush()
+        manifest.flush()
+
+    @staticmethod
+    def old_records(entry):
+        """
+        :param entry: dictionary, the manifest entry of a document processed by a previous run
+        :return: dictionary, keys are columns and values are the values of the records of the document
+                 (its DOI, or its title for a document without DOI)
+        """
+        if entry.get('doi'):
+            return {'DOI': entry['doi']}
+        return {'DOI': None, 'Title': entry.get('title')}
+
+    def run(self, properties=None, output_format='csv', filenames=None, rewrite='n', resume=True,
+            incremental=True, keep_records=True, progress=True, **kwargs):
+        """
+        Extract properties from every document of the corpus that has not been processed yet
+        :param properties: None or list of str, keys of document.PROPERTIES. If None, all properties are extracted
+        :param output_format: None, 'csv', 'sqlite' or 'parquet'. The records of each property are written to
+                        one file of this format (see Doc.open_sink). If None, nothing is written
+        :param filenames: None or dictionary, keys are properties and values are the names of their files.
+                        If a property is not in the dictionary, the filename is the one in PROPERTIES
+                        (+ today's date, unless incremental, so that every run writes to the same files)
+        :param rewrite: str type, whether or not the output files should be re-written
+                        If 'y', every document is processed, since the records of the previous runs are deleted.
+                        The files are not re-written when a checkpoint is resumed
+        :param resume: bool, whether or not documents in the checkpoint file are skipped
+                        If False, the checkpoint file is emptied and every document is processed
+                        The checkpoint file is also emptied if it was written by another extraction
+                        (see fingerprint). It is removed once every document has been processed without error
+        :param incremental: bool, whether or not documents that have not changed since they were last processed
+                        (same text, same extraction fingerprint, see the manifest) are skipped.
+                        The old records of a document that is processed again are deleted from the output files
+        :param keep_records: bool, whether or not the records are returned (they are always written out)
+        :param progress: bool, whether or not a progress bar is shown
+        :param kwargs: other arguments passed to Doc.extract_all (e.g. keywords, exclude_thinfilm, recognizer)
+        :return: dictionary, keys are the properties and values are the lists of records of all the documents.
+                 Documents that raised an error are not checkpointed; their errors are kept in self.errors.
+                 The identifiers of the documents skipped because they have not changed are kept in self.unchanged
+        """
+        if properties is None:
+            properties = list(PROPERTIES.keys())
+        if filenames is None:
+            filenames = {}
+        if rewrite == 'y':
+            incremental = False
+        if incremental:
+            filenames = dict({p: PROPERTIES[p]['filename'] for p in properties}, **filenames)
+
+        config = fingerprint(properties, kwargs)
+        # The documents of the checkpoint of another extraction have to be processed again
+        if os.path.exists(self.checkpoint) and (not resume or self.checkpoint_fingerprint() != config):
+            os.remove(self.checkpoint)
+        done = self.completed()
+        if done:
+            # The records of the documents of the checkpoint are in the output files already
+            rewrite = 'n'
+        tasks = [(spec, dict(kwargs, properties=properties), config, incremental, self.feature_cache)
+                 for spec in self.documents() if spec[0] not in done]
+        manifest = self.load_manifest()
+
+        records = {p: [] for p in properties}
+        self.errors = {}
+        self.unchanged = []
+        outputs = {}
+        if output_format is not None:
+            for p in properties:
+                outputs[p] = Doc.open_sink(p, filenames.get(p), rewrite, output_format)
+
+        for path in (self.checkpoint, self.manifest):
+            folder = os.path.dirname(path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+
+        pool = None
+        try:
+            if self.processes > 1 and len(tasks) > 1:
+                pool = multiprocessing.Pool(self.processes, initializer=set_manifest, initargs=(manifest,))
+                results = pool.imap_unordered(extract_document, tasks, chunksize=self.chunksize)
+            else:
+                set_manifest(manifest)
+                results = map(extract_document, tasks)
+
+            with open(self.checkpoint, 'a', encoding='utf-8') as checkpoint, \
+                    open(self.manifest, 'a', encoding='utf-8') as manifest_file:
+                if checkpoint.tell() == 0:
+                    checkpoint.write(CHECKPOINT_HEADER + config + '\n')
+                pending = []  # documents whose records may not have been written out yet
+                replaced = []  # old records of the documents processed again, to be deleted
+                for doc_id, doc_records, error, entry in tqdm(results, total=len(tasks), disable=not progress):
+                    if error is not None:
+                        self.errors[doc_id] = error
+                        continue
+                    if doc_records is None:
+                        self.unchanged.append(doc_id)
+                        pending.append((doc_id, None))
+                        continue
+                    for p in properties:
+                        if p in outputs:
+                            outputs[p].write_rows(doc_records[p])
+                        if keep_records:
+                            records[p].extend(doc_records[p])
+                    if entry['key'] in manifest:
+                        replaced.append(self.old_records(manifest[entry['key']]))
+                    pending.append((doc_id, entry))
+                    if len(pending) >= self.chunksize:
+                        self.save_checkpoint(checkpoint, manifest_file, pending, outputs, replaced)
+                        pending = []
+                        replaced = []
+                self.save_checkpoint(checkpoint, manifest_file, pending, outputs, replaced)
+
+            # The run is complete: the next run starts from the manifest, not from the checkpoint
+            if not self.errors:
+                os.remove(self.checkpoint)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            for sink in outputs.values():
+                sink.close()
+
+        return records
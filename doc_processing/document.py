@@ -6,38 +6,144 @@ Created on Sun Jun 23 17:39:15 2019
 """
 
 import nltk  # natural language processing toolkits
+import bisect
 import temperature as tmp
 import datetime
 import chemicals as chem
+import keyword_matcher as km
+import lexicon as lex
+import recognizers as rec
+import sinks as snk
 import skyrmion_size as sks
+import quantity as qty
 from abc import ABC, abstractmethod
-import csv
-import os
+import collections
+import contextlib
 import re
 
-SPLIT_UNITS = ["K", "h", "V", "wt", "wt.", "MHz", "kHz", "GHz", "Hz", "days", "weeks",
-               "hours", "minutes", "seconds", "T", "MPa", "GPa", "at.", "mol.",
-               "at", "m", "N", "s-1", "vol.", "vol", "eV", "A", "atm", "bar",
-               "kOe", "Oe", "h.", "mWcm−2", "keV", "MeV", "meV", "day", "week", "hour",
-               "minute", "month", "months", "year", "cycles", "years", "fs", "ns",
-               "ps", "rpm", "g", "mg", "mAcm−2", "mA", "mK", "mT", "s-1", "dB",
-               "Ag-1", "mAg-1", "mAg−1", "mAg", "mAh", "mAhg−1", "m-2", "mJ", "kJ",
-               "m2g−1", "THz", "KHz", "kJmol−1", "Torr", "gL-1", "Vcm−1", "mVs−1",
-               "J", "GJ", "mTorr", "bar", "cm2", "mbar", "kbar", "mmol", "mol", "molL−1",
-               "MΩ", "Ω", "kΩ", "mΩ", "mgL−1", "moldm−3", "m2", "m3", "cm-1", "cm",
-               "Scm−1", "Acm−1", "eV−1cm−2", "cm-2", "sccm", "cm−2eV−1", "cm−3eV−1",
-               "kA", "s−1", "emu", "L", "cmHz1", "gmol−1", "kVcm−1", "MPam1",
-               "cm2V−1s−1", "Acm−2", "cm−2s−1", "MV", "ionscm−2", "Jcm−2", "ncm−2",
-               "Jcm−2", "Wcm−2", "GWcm−2", "Acm−2K−2", "gcm−3", "cm3g−1", "mgl−1",
-               "mgml−1", "mgcm−2", "mΩcm", "cm−2s−1", "cm−2", "ions", "moll−1",
-               "nmol", "psi", "mol·L−1", "Jkg−1K−1", "km", "Wm−2", "mass", "mmHg",
-               "mmmin−1", "GeV", "m−2", "m−2s−1", "Kmin−1", "gL−1", "ng", "hr", "w",
-               "mN", "kN", "Mrad", "rad", "arcsec", "Ag−1", "dpa", "cdm−2",
-               "cd", "mcd", "mHz", "m−3", "ppm", "phr", "mL", "ML", "mlmin−1", "MWm−2",
-               "Wm−1K−1", "Wm−1K−1", "kWh", "Wkg−1", "Jm−3", "m-3", "gl−1", "A−1",
-               "Ks−1", "mgdm−3", "mms−1", "ks", "appm", "ºC", "HV", "kDa", "Da", "kG",
-               "kGy", "MGy", "Gy", "mGy", "Gbps", "μB", "μL", "μF", "nF", "pF", "mF",
-               "A", "Å", "A˚", "μgL−1", "MGOe", "AMFs"]
+SPLIT_UNITS = lex.SPLIT_UNITS  # see lexicon.py
+
+# Version of the extraction, to be increased whenever a change to the code changes the records extracted.
+# Documents processed by an older version are processed again (see corpus.py)
+EXTRACTOR_VERSION = 2
+
+# Maximum number of results kept by Doc.cached for each document
+SENTENCE_CACHE_SIZE = 4096
+
+# Properties that can be extracted by Doc.extract_all
+#   keywords: default keywords used to find the relevant sentences
+#   folder, filename, columns: where and how the records are written out
+#   quantity: 'temperature' or 'size', what is extracted from a relevant sentence
+#   material_in_sentence: whether the material must be mentioned in the sentence
+#   default_material: whether a quantity without chemical nearby is assigned to the material
+#   max_length: longest sentence accepted in Elsevier files (to remove the weird long sentence at the start)
+#   thinfilm: sentences containing these words are excluded if exclude_thinfilm == 'y'
+#   excluded: sentences containing these words are always excluded
+TEMPERATURE_COLUMNS = ['Compound', 'Extracted Temperature (K)', 'Sentence', 'Title',
+                       'DOI', 'Author(s)', 'Journal', 'Volume', 'Page',
+                       'Cover Date', 'Access Date']
+
+PROPERTIES = {
+    'curie_temperature': {
+        'keywords': ['Tc', 'T_c', 'T c', 'TC', 'T_C', 'T C', 'Curie temperature',
+                     'transition temperature AND ferromagnet', ' ferromagnetic order', ' FM order'],
+        'folder': 'Data/Curie Temperature',
+        'filename': 'Curie_temperature_records',
+        'columns': TEMPERATURE_COLUMNS,
+        'quantity': 'temperature',
+        'material_in_sentence': False,
+        'default_material': False,
+        'max_length': 1100,
+        'thinfilm': ['nanostruct', 'wire', 'film', 'quantum dot', 'substrate'],
+        'excluded': [],
+    },
+    'neel_temperature': {
+        'keywords': ['Tn', 'T_n', 'T n', 'TN', 'T_N', 'T N', 'Neel temperature', 'Néel temperature',
+                     'antiferromagnet AND transition temperature', 'AFM order', 'antiferromagnetic order'],
+        'folder': 'Data/Neel Temperature',
+        'filename': 'Neel_temperature_records',
+        'columns': TEMPERATURE_COLUMNS,
+        'quantity': 'temperature',
+        'material_in_sentence': True,
+        'default_material': True,
+        'max_length': 1500,
+        'thinfilm': ['nanostruct', 'wire', 'film', 'quantum dot', 'substrate'],
+        'excluded': [],
+    },
+    'skyrmion_size': {
+        'keywords': ['skyrmion AND size', 'skyrmion AND radius', 'skyrmion AND diameter',
+                     'heli AND wavelength', 'helical pitch', 'helical period'],
+        'folder': 'Data/Skyrmion_Size',
+        'filename': 'skyrmion_size_records',
+        'columns': ['Compound', 'Original Skyrmion Size', 'Original Unit',
+                    'Skyrmion Size (nm)', 'Sentence', 'Title',
+                    'DOI', 'Author(s)', 'Journal', 'Volume', 'Page',
+                    'Cover Date', 'Access Date'],
+        'quantity': 'size',
+        'material_in_sentence': True,
+        'default_material': True,
+        'max_length': 1500,
+        'thinfilm': ['nanostruct', 'wire', 'film', 'quantum dot'],
+        'excluded': ['nanoparticle', 'grain size', 'particle size', 'cell size', 'nanodisk'],
+    },
+}
+
+
+def segment(text):
+    """
+    Split text into sentences, keeping the position of each sentence in text
+    :param text: str
+    :return: list of (sentence, start, end), with text[start:end] == sentence
+
+    Example:
+    >>> segment('MnSi orders at 29 K. FeGe orders at 278 K.')
+    Out: [('MnSi orders at 29 K.', 0, 20), ('FeGe orders at 278 K.', 21, 42)]
+    """
+    table = []
+    end = 0
+    for sentence in nltk.sent_tokenize(text):
+        # Sentences are returned in order, so each one is found after the end of the previous one
+        start = text.find(sentence, end)
+        if start == -1:
+            start = end
+        end = start + len(sentence)
+        table.append((sentence, start, end))
+    return table
+
+
+def pair_by_offset(quantity_spans, chemical_spans):
+    """
+    Pair each quantity mention with the chemical mention closest to it in the same text.
+    Both lists are sorted by offset, so a single merge over the two lists is enough.
+    If a quantity is as close to the chemical before it as to the chemical after it,
+    the chemical before it is chosen.
+    :param quantity_spans: list of (quantity, start, end), sorted by start
+    :param chemical_spans: list of (chemical, start, end), sorted by start
+    :return: list of ((quantity, start, end), chemical)
+             chemical is None if there is no chemical in chemical_spans
+
+    Example:
+    >>> pair_by_offset([(' 278 K,', 32, 39), (' 58 K.', 66, 72)], [('FeGe', 25, 29), ('Cu2OSeO3', 48, 56)])
+    Out: [((' 278 K,', 32, 39), 'FeGe'), ((' 58 K.', 66, 72), 'Cu2OSeO3')]
+    """
+    def distance(chemical_span, quantity_span):
+        if chemical_span[2] <= quantity_span[1]:
+            return quantity_span[1] - chemical_span[2]
+        elif chemical_span[1] >= quantity_span[2]:
+            return chemical_span[1] - quantity_span[2]
+        return 0
+
+    result = []
+    j = 0  # index of the last chemical that starts before the current quantity
+    for quantity_span in quantity_spans:
+        while j < len(chemical_spans) - 1 and chemical_spans[j + 1][1] < quantity_span[1]:
+            j += 1
+        candidates = chemical_spans[j:j + 2]
+        if candidates:
+            result.append((quantity_span, min(candidates, key=lambda c: distance(c, quantity_span))[0]))
+        else:
+            result.append((quantity_span, None))
+    return result
 
 
 class Doc:
@@ -59,6 +165,22 @@ class Doc:
     coverDate = None
     accessDate = None
 
+    # Results of chemical and quantity recognition, keyed on (kind, sentence). See Doc.cached
+    sentence_cache = None
+    cache_hits = 0
+    cache_misses = 0
+
+    # Sentences of self.text, computed once by get_sentences. See segment
+    sentence_table = None
+    sentence_starts = None
+    sentence_table_text = None
+
+    # Features of self.text read from the feature cache (see feature_cache.py), used instead of recognising them
+    features = None
+
+    # Recogniser of chemicals (see recognizers.py). If None, the regular expressions of chemicals.py are used
+    recognizer = None
+
     def __init__(self):
         """
         Subclass: ElsevierDoc and SpringerDoc
@@ -80,8 +202,178 @@ class Doc:
     #    pass
 
     def add_text(self, text):
+        if text != self.text:
+            self.clear_cache()
         self.text = text
 
+    def clear_cache(self):
+        """
+        Empty the cache of chemicals and quantities recognised in this document, and reset its counters
+        """
+        self.sentence_cache = collections.OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.sentence_table = None
+        self.sentence_starts = None
+        self.sentence_table_text = None
+        self.features = None
+
+    def set_recognizer(self, recognizer):
+        """
+        :param recognizer: None, str or recognizers.Recognizer, see recognizers.get_recognizer
+        """
+        if rec.get_recognizer(recognizer) is not rec.get_recognizer(self.recognizer):
+            self.clear_cache()
+        self.recognizer = recognizer
+
+    def chemical_kind(self, recognizer=None):
+        """
+        :param recognizer: None, str or recognizers.Recognizer. If None, the recogniser of the document is used
+        :return: str, the kind (see Doc.cached) of the chemicals found by the recogniser
+        """
+        recognizer = rec.get_recognizer(self.recognizer if recognizer is None else recognizer)
+        if recognizer.name == 'regex':
+            return 'chemicals'
+        return 'chemicals_' + recognizer.name
+
+    def prefetch_chemicals(self, sentences):
+        """
+        Recognise the chemicals of several sentences at once (with a single batch for the recogniser),
+        so that find_chemical and find_chemical_spans read them from the cache afterwards
+        :param sentences: list of str
+        """
+        kind = self.chemical_kind()
+        if self.sentence_cache is None:
+            self.sentence_cache = collections.OrderedDict()
+        missing = [s for s in sentences if (kind, s) not in self.sentence_cache
+                   and (self.features is None or self.features.get(kind, s) is None)]
+        if not missing:
+            return
+        batch = dict(zip(missing, rec.get_recognizer(self.recognizer).find_spans_batch(missing)))
+        for s in missing:
+            self.cached(kind, s, batch.get)
+
+    def get_sentences(self, text=None):
+        """
+        Sentences of the text, with their positions. The sentences of the document are computed
+        the first time they are needed and shared by every extractor afterwards.
+        :param text: str or None. If None, the sentences of self.text are returned
+        :return: list of (sentence, start, end)
+
+        Example:
+        >>> els_doc = ElsevierDoc(els_data)
+        >>> els_doc.get_sentences()[:1]
+        Out: [('MnSi orders below T c =29.6K [11] helimagnetically.', 0, 51)]
+        """
+        if text is None:
+            text = self.text
+
+        if text is not self.text:
+            return self.cached('sentences', text, segment)
+
+        if self.sentence_table is None or self.sentence_table_text is not text:
+            if self.features is not None and self.features.text == text:
+                self.sentence_table = self.features.sentences()
+            else:
+                self.sentence_table = segment(text)
+            self.sentence_starts = [start for _, start, _ in self.sentence_table]
+            self.sentence_table_text = text
+        return self.sentence_table
+
+    def sentence_at(self, offset):
+        """
+        :param offset: int, position in self.text
+        :return: (sentence, start, end) of the sentence of self.text containing the offset,
+                 or None if the offset is not in any sentence
+        """
+        table = self.get_sentences()
+        i = bisect.bisect_right(self.sentence_starts, offset) - 1
+        if i >= 0 and offset < table[i][2]:
+            return table[i]
+        return None
+
+    def get_tokens(self, sentence):
+        """
+        :param sentence: str
+        :return: list of str, the words of the sentence (see nltk.word_tokenize)
+        """
+        return self.cached('tokens', sentence, nltk.word_tokenize)
+
+    def cached(self, kind, sentence, function):
+        """
+        Return function(sentence), computing it only if it has not been computed for this document before
+        (or read from the feature cache, if the features of the document have been loaded).
+        At most SENTENCE_CACHE_SIZE results are kept; the least recently used one is dropped first.
+        :param kind: str, what is computed (e.g. 'chemicals', 'temperatures', 'sizes')
+        :param sentence: str, the sentence (or text) the function is applied to
+        :param function: function taking sentence as its only argument
+        :return: the result of function(sentence)
+
+        Example:
+        >>> els_doc = ElsevierDoc(els_data)
+        >>> els_doc.cached('sizes', 'The skyrmion size is 18 nm.', sks.find_size)
+        Out: [' 18 nm.']
+        >>> els_doc.cache_hits, els_doc.cache_misses
+        Out: (0, 1)
+        """
+        if self.sentence_cache is None:
+            self.sentence_cache = collections.OrderedDict()
+
+        key = (kind, sentence)
+        if key in self.sentence_cache:
+            self.cache_hits += 1
+            self.sentence_cache.move_to_end(key)
+            return self.sentence_cache[key]
+
+        if self.features is not None:
+            result = self.features.get(kind, sentence)
+            if result is not None:
+                self.cache_hits += 1
+                return result
+
+        self.cache_misses += 1
+        result = function(sentence)
+        self.sentence_cache[key] = result
+        if len(self.sentence_cache) > SENTENCE_CACHE_SIZE:
+            self.sentence_cache.popitem(last=False)
+        return result
+
+    def find_temperatures(self, sentence):
+        """
+        :param sentence: str
+        :return: numpy array of all the temperatures (in their original units) mentioned in sentence
+        """
+        return self.cached('temperatures', sentence,
+                           lambda s: tmp.get_number_from_list([t for t, _, _ in self.find_temperature_spans(s)]))
+
+    def find_temperature_spans(self, sentence):
+        """
+        :param sentence: str
+        :return: list of (mention, start, end) of the temperatures mentioned in sentence
+        """
+        return self.cached('temperature_spans', sentence, tmp.find_temperature_spans)
+
+    def find_kelvin_spans(self, sentence):
+        """
+        :param sentence: str
+        :return: list of (mention, start, end) of the temperatures in kelvin mentioned in sentence
+        """
+        return self.cached('kelvin', sentence, lambda s: tmp.find_temperature_spans(s, units='K'))
+
+    def find_sizes(self, sentence):
+        """
+        :param sentence: str
+        :return: list of str, the mentions of length in sentence
+        """
+        return [size for size, _, _ in self.find_size_spans(sentence)]
+
+    def find_size_spans(self, sentence):
+        """
+        :param sentence: str
+        :return: list of (mention, start, end) of the lengths mentioned in sentence
+        """
+        return self.cached('size_spans', sentence, sks.find_size_spans)
+
     @property
     def get_text(self):
         """
@@ -107,9 +399,9 @@ class Doc:
         if text is None:
             text = self.text
         if sentence_segmentation == 'y':
-            sentences = nltk.sent_tokenize(text)
+            sentences = [s for s, _, _ in self.get_sentences(text)]
             if tokenization == 'y':
-                sentences = [nltk.word_tokenize(s) for s in sentences]
+                sentences = [self.get_tokens(s) for s in sentences]
                 if pos_tagging == 'y':
                     sentences = [nltk.pos_tag(s) for s in sentences]
             return sentences
@@ -128,48 +420,255 @@ class Doc:
                         If not specified, material is set to None
         :param quantitative: str. Whether or not what we're looking for is a quantitative value
                         If not specified, quantitative is set to 'y'
-        :return: list of relevant sentences (list of strings)
+        :return: list of relevant sentences (list of strings). Each sentence appears once, in the order of the text
 
-        #TODO: if 'AND' not in k for k in keywords
         #TODO: if 'NOT' in k for k in keywords
         """
+        return [sent for sent, _ in self.find_sentences_with_keywords(keywords, material=material, text=text,
+                                                                       quantitative=quantitative,
+                                                                       material_in_sentence=material_in_sentence)]
+
+    def find_sentences_with_keywords(self, keywords, material=None, text=None, quantitative=True,
+                                     material_in_sentence=True):
+        """
+        Same as find_sentences, but each sentence is returned with the keywords it contains.
+        The keywords are compiled once (see keyword_matcher.py) and each sentence is scanned once,
+        however many keywords there are.
+        :return: list of (sentence, list of keywords found in the sentence)
+
+        Example:
+        >>> els_doc = ElsevierDoc(els_data)
+        >>> els_doc.find_sentences_with_keywords(['Tc', 'T c'])[:1]
+        Out: [('MnSi orders below T c =29.6K [11] helimagnetically.', ['T c'])]
+        """
+        matcher = km.get_matcher(keywords)
+        candidates = []
+
+        for sent, _, _ in self.get_sentences(text):
+            if len(sent) >= 1500:
+                continue
+            # TODO: Accept equivalent material names
+            if material is not None and material not in sent:
+                continue
+            # If we are not looking for a quantity, then remove the requirement for re.search('\d', sent)
+            if quantitative and not re.search('\d', sent):
+                continue
+            matched = matcher.match(sent)
+            if not matched:
+                continue
+            candidates.append((sent, matched))
+
+        if not material_in_sentence:
+            return candidates
+        self.prefetch_chemicals([sent for sent, _ in candidates])
+        return [(sent, matched) for sent, matched in candidates if self.find_chemical(sent)]
+
+    def extract_all(self, properties=None, material=None, exclude_thinfilm='y', keywords=None,
+                    write='n', filenames=None, rewrite='n', text=None, material_in_sentence=True,
+                    output_format='csv', sinks=None, recognizer=None):
+        """
+        Extract several properties of the document in a single pass over its sentences.
+        The keywords of all the properties are matched together, and the chemicals and quantities
+        of a sentence are recognised once, however many properties the sentence is relevant to.
+        :param properties: None or list of str, keys of PROPERTIES (e.g. ['curie_temperature', 'skyrmion_size'])
+                        If not specified, all the properties in PROPERTIES are extracted
+        :param material: None or str type, the name of the materials to extract the properties of
+                        If it is not mentioned in the article, the most common material in the article is used
+        :param exclude_thinfilm: str type, whether or not we should exclude mentions of thin films
+        :param keywords: None or dictionary, keys are properties and values are their list of keywords
+                        Properties not in the dictionary are found with the keywords in PROPERTIES
+        :param write: str type, whether or not the result should be written out to files
+        :param filenames: None or dictionary, keys are properties and values are the names of their files
+                        If a property is not in the dictionary, the filename is the one in PROPERTIES + today's date
+        :param rewrite: str type, whether or not the files should be re-written
+        :param text: None or str type. If text is None, then the properties are extracted from self.text
+        :param material_in_sentence: bool, whether or not a chemical must be mentioned in the sentence
+        :param output_format: str, 'csv', 'sqlite' or 'parquet', the kind of files written if write == 'y'
+        :param sinks: None or dictionary, keys are properties and values are sinks.ResultSink objects
+                        The records of these properties are written to the sinks (whatever the value of write),
+                        which are left open so that they can be shared by many documents
+        :param recognizer: None, str or recognizers.Recognizer, the recogniser of chemicals (e.g. 'mat2vec').
+                        If None, the recogniser of the document is kept (see Doc.set_recognizer)
+        :return: dictionary, keys are the properties and values are the lists of records
+                (see get_curie_temperatures, get_neel_temperature and get_skyrmion_size)
+
+        Example:
+        >>> els_doc = ElsevierDoc(els_data)
+        >>> records = els_doc.extract_all(['curie_temperature', 'neel_temperature'])
+        >>> records['curie_temperature'][0][:2]
+        Out: ['MnSi', 29.6]
+        """
+        if properties is None:
+            properties = list(PROPERTIES.keys())
+        for p in properties:
+            if p not in PROPERTIES:
+                raise ValueError('Property \'' + str(p) + '\' is not recognised. The only recognised properties are '
+                                 + ', '.join(PROPERTIES.keys()))
+
+        if keywords is None:
+            keywords = {}
+        keywords = {p: keywords[p] if keywords.get(p) is not None else PROPERTIES[p]['keywords']
+                    for p in properties}
+
+        if recognizer is not None:
+            self.set_recognizer(recognizer)
+
         if text is None:
             text = self.text
-        sentences = nltk.sent_tokenize(text)
-        result = []
 
-        # TODO: Optimize this somehow. for loops are pretty inefficient and I'm using two of them
-        for k in keywords:
-            # if 'AND' in k:
-            keys = re.split('[ ]?AND[ ]?', k)
-            if material is not None:
-                # TODO: Accept equivalent material names
-                keys.append(material)
-            for sent in sentences:
-                # If we are not looking for a quantity, then remove the requirement for re.search('\d', sent)
-                if quantitative:
-                    if len(sent) < 1500 and all(word in sent for word in keys) and re.search('\d', sent):
-                        # for s in re.findall('.*?[K]{1}\W', sent):
-                        if material_in_sentence:
-                            if self.find_chemical(sent):
-                                result.append(sent)
-                        else:
-                            result.append(sent)
-                else:
-                    if len(sent) < 1500 and all(word in sent for word in keys):
-                        # for s in re.findall('.*?[K]{1}\W', sent):
-                        if material_in_sentence:
-                            if self.find_chemical(sent):
-                                result.append(sent)
-                        else:
-                            result.append(sent)
-
-                    ### Maybe we should remove the sentence from sentences if it has already been appended to result
+        records = {p: [] for p in properties}
 
+        if type(text) != str:
+            # If the text given is not a string, then return empty lists
+            return records
+
+        # If material is not mentioned in the article,
+        # then replace the material with the most common materials in article
+        chemicals = self.find_chemical(text=text)
+        if material is None or (material not in chemicals and (self.title is None or material not in self.title)):
+            if chemicals:
+                material = max(set(chemicals), key=chemicals.count)
+
+        if sinks is None:
+            sinks = {}
+        # Sinks opened here are closed at the end (even if the extraction fails);
+        # sinks given as arguments belong to the caller
+        with contextlib.ExitStack() as stack:
+            opened = {}
+            if write == 'y':
+                if filenames is None:
+                    filenames = {}
+                for p in properties:
+                    if p not in sinks:
+                        opened[p] = stack.enter_context(self.open_sink(p, filenames.get(p), rewrite,
+                                                                       output_format))
+            outputs = dict(sinks)
+            outputs.update(opened)
+
+            # Each keyword is mapped to the properties it is used for, so that all the keywords are matched together
+            keyword_properties = collections.OrderedDict()
+            for p in properties:
+                for k in keywords[p]:
+                    keyword_properties.setdefault(k, []).append(p)
+
+            for sent, matched in self.find_sentences_with_keywords(list(keyword_properties.keys()), text=text,
+                                                                   material_in_sentence=material_in_sentence):
+                matched_properties = set(p for k in matched for p in keyword_properties[k])
+
+                for p in properties:
+                    if p not in matched_properties:
+                        continue
+                    settings = PROPERTIES[p]
+
+                    if settings['material_in_sentence'] and material is not None and material not in sent:
+                        continue
+                    # If it's an Elsevier file, remove the weird long sentence at the start
+                    if self.is_elsevier() and len(sent) >= settings['max_length']:
+                        continue
+                    excluded = settings['excluded']
+                    if exclude_thinfilm == 'y':
+                        excluded = excluded + settings['thinfilm']
+                    if any(word in sent for word in excluded):
+                        continue
+
+                    default = material if settings['default_material'] else None
+                    if settings['quantity'] == 'temperature':
+                        rows = self.temperature_records(sent, keywords[p], default=default)
+                    else:
+                        rows = self.size_records(sent, default=default)
+
+                    for row in rows:
+                        write_out = row + [sent, self.title, self.doi, self.authors,
+                                           self.journal, self.volume, self.page, self.coverDate,
+                                           self.accessDate]
+                        records[p].append(write_out)
+
+                        if p in outputs:
+                            outputs[p].write(write_out)
+
+        for p in properties:
+            if p in sinks:
+                sinks[p].flush()
+
+        return records
+
+    @staticmethod
+    def open_sink(prop, filename=None, rewrite='n', output_format='csv'):
+        """
+        Open the file the records of a property are written to
+        :param prop: str, key of PROPERTIES
+        :param filename: None or str. If not specified, the filename is the one in PROPERTIES + today's date
+        :param rewrite: str type, whether or not the file should be re-written
+                        (if re-written, then old data will be deleted)
+        :param output_format: str, 'csv', 'sqlite' or 'parquet'
+        :return: sinks.ResultSink. It must be closed once all the records are written
+        """
+        if output_format not in snk.EXTENSIONS:
+            raise ValueError('Output format \'' + str(output_format) + '\' is not recognised. '
+                             'The only recognised formats are ' + ', '.join(snk.EXTENSIONS.keys()))
+        extension = snk.EXTENSIONS[output_format]
+        settings = PROPERTIES[prop]
+        if filename is None:
+            filename = settings['filename'] + str(datetime.date.today()) + extension
+
+        if extension not in filename:
+            filename = filename + extension
+
+        return snk.open_sink(settings['folder'] + '/' + filename, settings['columns'], rewrite=rewrite,
+                             output_format=output_format)
+
+    def temperature_records(self, sentence, keywords, default=None):
+        """
+        Assign the temperatures mentioned in a sentence to the chemicals mentioned in it
+        :param sentence: str
+        :param keywords: list of str. If the temperatures cannot be assigned one to one,
+                        only the temperatures preceded by one of the keywords are kept
+        :param default: None or str, the chemical assigned to a temperature if no chemical is mentioned
+        :return: list of [chemical, temperature]
+        """
+        result = []
+        chemical_spans = self.find_chemical_spans(sentence)
+        temperatures = self.find_temperatures(sentence)
+
+        # If the number of chemicals is equal to the number of temperature mentions
+        # Assign the first temperature to the first chemical, etc
+        # TODO: For the case of e.g. Co2 MnSn => ['MnSn', 'Co2 MnSn']
+        if len(chemical_spans) == len(temperatures):
+            for i, (chem, _, _) in enumerate(chemical_spans):
+                result.append([chem, temperatures[i]])
+        # Else, assign each temperature to the chemical mentioned closest to it
+        else:
+            fragment_start = 0
+            for (t, start, end), chem in pair_by_offset(self.find_kelvin_spans(sentence), chemical_spans):
+                # The keyword must be mentioned between the previous temperature and this one
+                fragment, fragment_start = sentence[fragment_start:end], end
+                if not self.has_keywords(sentence=fragment, keywords=keywords):
+                    continue
+                for num in tmp.get_number(t):
+                    result.append([chem if chem is not None else default, num])
+        return result
+
+    def size_records(self, sentence, default=None):
+        """
+        Assign the sizes mentioned in a sentence to the chemical mentioned most in it
+        :param sentence: str
+        :param default: None or str, the chemical assigned to the sizes if no chemical is mentioned
+        :return: list of [chemical, size, unit, size in nm]
+        """
+        result = []
+        chemicals = self.find_chemical(sentence, sorted='n')
+        for size in self.find_sizes(sentence):
+            if chemicals:
+                chem = max(set(chemicals), key=chemicals.count)
+            else:
+                chem = default
+            q = qty.parse_quantity(size, sks.skyrmion_size_units())
+            result.append([chem, q.values, q.unit, qty.convert(q.values, q.unit, 'nm')])
         return result
 
     def get_curie_temperatures(self, material=None, filename=None, exclude_thinfilm='y',
-                               keywords=None, write='y', rewrite='n', text=None, material_in_sentence=True):
+                               keywords=None, write='y', rewrite='n', text=None, material_in_sentence=True,
+                               sink=None):
         """
 
         :param material: None or str type, the name of the materials to extract temperature from
@@ -191,208 +690,29 @@ class Doc:
         :param text: None or str type, the text from which Curie temperatures are extracted from
                     If text is None, then we will look for Curie temperature from self.text
                     If not specified, text is set to None.
-        :return: dictionary: keys are the compound formulae,
-                            values are a list containing the temperature, sentence and citation
+        :param material_in_sentence: bool, whether or not a chemical must be mentioned in the sentence
+        :param sink: None or sinks.ResultSink, where the records are written to (instead of filename).
+                    The sink is not closed, so that it can be shared by many documents
+        :return: list of records: [compound, temperature, sentence, title, doi, authors,
+                                   journal, volume, page, cover date, access date]
         """
-
-        if keywords is None:
-            keywords = ['Tc', 'T_c', 'T c', 'TC', 'T_C', 'T C', 'Curie temperature',
-             'transition temperature AND ferromagnet', ' ferromagnetic order', ' FM order']
-
-        # TODO: Specify whether or not the file should be rewrite (as requested by variable rewrite
-        if text is None:
-            text = self.text
-
-        if type(text) != str:
-            # If the text given is not a string, then return an empty list
-            return []
-        else:
-            # If material is not mentioned in the article,
-            # then replace the material with the most common materials in article
-            chemicals = self.find_chemical(text=text)
-            if material is None or (material not in chemicals and material not in self.title):
-                if chemicals:
-                    material = max(set(chemicals), key=chemicals.count)
-
-            # TODO: Specify whether or not material name must be present in sentence
-            sentences = []
-            # Relevant sentences are found
-            sentences = self.find_sentences(keywords=keywords, text=text, material_in_sentence=material_in_sentence)  # , material)
-
-            # If it's an Elsevier file, remove the weird long sentence at the start
-            if self.is_elsevier():
-                # isElsevier is defined in ElsevierDoc (in elsevier_doc.py file)
-                sentences = [s for s in sentences if len(s) < 1100]
-
-            if write == 'y':
-                if filename is None:
-                    filename = 'Curie_temperature_records' + str(datetime.date.today()) + '.csv'
-
-                if '.csv' not in filename:
-                    filename = filename + '.csv'
-                # Check if directory exists; if not, create a new folder 
-                if not os.path.exists('Data/Curie Temperature'):
-                    os.makedirs('Data/Curie Temperature')
-
-                columns = ['Compound', 'Extracted Temperature (K)', 'Sentence', 'Title',
-                           'DOI', 'Author(s)', 'Journal', 'Volume', 'Page',
-                           'Cover Date', 'Access Date']
-
-                if not os.path.exists('Data/Curie Temperature/' + filename) or rewrite == 'y':
-                    with open('Data/Curie Temperature/' + filename, 'w') as f:
-                        writeo = csv.writer(f)
-                        writeo.writerow(columns)
-
-            curie_temperature = []
-
-            for sent in sentences:
-                #print(sent)
-                if exclude_thinfilm == 'y':
-                    if 'nanostruct' in sent or 'wire' in sent or 'film' in sent \
-                            or 'quantum dot' in sent or 'substrate' in sent:
-                        continue
-                if len(self.find_chemical(sent)) == len(tmp.get_number_from_list(tmp.find_temperature(sent))):
-                    #print(self.find_chemical(sent))
-                    #print(tmp.get_number_from_list(tmp.find_temperature(sent)))
-                    for i, chem in enumerate(self.find_chemical(sent)):
-                        #print(tmp.find_temperature(sent))
-                        write_out = [chem, tmp.get_number_from_list(tmp.find_temperature(sent))[i],
-                                     sent, self.title, self.doi, self.authors,
-                                     self.journal, self.volume, self.page, self.coverDate,
-                                     self.accessDate]
-                        curie_temperature.append(write_out)
-
-                        if write == 'y':
-                            with open('Data/Neel Temperature/' + filename, 'a') as f:
-                                if material == 'Fe0.5Co0.5Si':
-                                    print(write_out)
-                                writeo = csv.writer(f)
-                                writeo.writerow(write_out)
-                    # Else, assign the temperature to the chemical name most mentioned / the chemical we're looking for
-                else:
-                    for s in re.findall('.*?[K]{1}\W', sent):
-                        if 'nanostruct' in s or 'wire' in s or 'film' in s or 'quantum dot' in s:
-                            print(s)
-                        if self.has_keywords(sentence=s, keywords=keywords):
-                            for t in tmp.get_number_from_list(tmp.find_temperature(s, unit='K')):
-                                if self.find_chemical(s, sorted='n'):
-                                    write_out = [max(set(self.find_chemical(s, sorted='n')),
-                                                     key=self.find_chemical(s, sorted='n').count),
-                                                 t, sent, self.title, self.doi, self.authors,
-                                                 self.journal, self.volume, self.page, self.coverDate,
-                                                 self.accessDate]
-                                else:
-                                    write_out = [None, t, sent, self.title, self.doi, self.authors,
-                                                 self.journal, self.volume, self.page, self.coverDate,
-                                                 self.accessDate]
-
-                                curie_temperature.append(write_out)
-
-                                if write == 'y':
-                                    with open('Data/Curie Temperature/' + filename, 'a') as f:
-                                        if material == 'Fe0.5Co0.5Si':
-                                            print(write_out)
-                                        writeo = csv.writer(f)
-                                        writeo.writerow(write_out)
-
-            return curie_temperature
+        return self.extract_all(['curie_temperature'], material=material, exclude_thinfilm=exclude_thinfilm,
+                                keywords={'curie_temperature': keywords}, write=write,
+                                filenames={'curie_temperature': filename}, rewrite=rewrite,
+                                sinks={'curie_temperature': sink} if sink is not None else None,
+                                text=text, material_in_sentence=material_in_sentence)['curie_temperature']
 
     def get_neel_temperature(self, material=None, filename=None, exclude_thinfilm='y',
                              keywords=None,
-                             write='n', rewrite='n'):
-        # TODO: Double check with get_curie_temperature
-
-        if keywords is None:
-            keywords = ['Tn', 'T_n', 'T n', 'TN', 'T_N', 'T N', 'Neel temperature', 'Néel temperature',
-                        'antiferromagnet AND transition temperature', 'AFM order', 'antiferromagnetic order']
-
-        if type(self.text) != str:
-            return []
-        else:
-            # If material is not mentioned in the article,
-            # then replace the material with the most common materials in article
-            chemicals = self.find_chemical()
-            if material not in chemicals and material not in self.title:
-                if chemicals:
-                    material = max(set(chemicals), key=chemicals.count)
-
-            sentences = self.find_sentences(keywords, material)
-
-            # If it's an Elsevier file, remove the weird long sentence at the start
-            if self.is_elsevier():
-                sentences = [s for s in sentences if len(s) < 1500]
-
-            if write == 'y':
-                if filename is None:
-                    filename = 'Neel_temperature_records' + str(datetime.date.today()) + '.csv'
-
-                if '.csv' not in filename:
-                    filename = filename + '.csv'
-                # Check if directory exists; if not, create a new folder
-                if not os.path.exists('Data/Neel Temperature'):
-                    os.makedirs('Data/Neel Temperature')
-
-                columns = ['Compound', 'Extracted Temperature (K)', 'Sentence', 'Title',
-                           'DOI', 'Author(s)', 'Journal', 'Volume', 'Page',
-                           'Cover Date', 'Access Date']
-
-                if not os.path.exists('Data/Neel Temperature/' + filename) or rewrite == 'y':
-                    with open('Data/Neel Temperature/' + filename, 'w') as f:
-                        writeo = csv.writer(f)
-                        writeo.writerow(columns)
-
-            neel_temperature = []
-
-            for sent in sentences:
-                if exclude_thinfilm == 'y':
-                    if 'nanostruct' in sent or 'wire' in sent or 'film' in sent \
-                            or 'quantum dot' in sent or 'substrate' in sent:
-                        continue
-                # If the number of chemicals is equal to the number of temperature mentions
-                # Assign the first temperature to the first chemical, etc
-                # TODO: For the case of e.g. Co2 MnSn => ['MnSn', 'Co2 MnSn']
-                if len(self.find_chemical(sent)) == len(tmp.get_number_from_list(tmp.find_temperature(sent))):
-                    for i, chem in enumerate(self.find_chemical(sent)):
-                        write_out = [chem, tmp.get_number(tmp.find_temperature(sent))[i],
-                                     sent, self.title, self.doi, self.authors,
-                                     self.journal, self.volume, self.page, self.coverDate,
-                                     self.accessDate]
-                        neel_temperature.append(write_out)
-
-                        if write == 'y':
-                            with open('Data/Neel Temperature/' + filename, 'a') as f:
-                                if material == 'Fe0.5Co0.5Si':
-                                    print(write_out)
-                                writeo = csv.writer(f)
-                                writeo.writerow(write_out)
-                # Else, assign the temperature to the chemical name most mentioned / the chemical we're looking for
-                else:
-                    for s in re.findall('.*?[K]{1}\W', sent):
-                        if 'nanostruct' in s or 'wire' in s or 'film' in s or 'quantum dot' in s:
-                            print(s)
-                        if self.has_keywords(sentence=s, keywords=keywords):
-                            for t in tmp.find_temperature(s, unit='K'):
-                                for num in tmp.get_number(t):
-                                    if self.find_chemical(s, sorted='n'):
-                                        write_out = [max(set(self.find_chemical(s, sorted='n')),
-                                                         key=self.find_chemical(s, sorted='n').count),
-                                                     num, sent, self.title, self.doi, self.authors,
-                                                     self.journal, self.volume, self.page, self.coverDate,
-                                                     self.accessDate]
-                                    else:
-                                        write_out = [material, num, sent, self.title, self.doi, self.authors,
-                                                     self.journal, self.volume, self.page, self.coverDate,
-                                                     self.accessDate]
-
-                                    neel_temperature.append(write_out)
-
-                                    if write == 'y':
-                                        with open('Data/Neel Temperature/' + filename, 'a') as f:
-                                            if material == 'Fe0.5Co0.5Si':
-                                                print(write_out)
-                                            writeo = csv.writer(f)
-                                            writeo.writerow(write_out)
-            return neel_temperature
+                             write='n', rewrite='n', sink=None):
+        """
+        Same as get_curie_temperatures, for the Neel temperature.
+        The material (or the most common material in the article) must be mentioned in the sentence.
+        """
+        return self.extract_all(['neel_temperature'], material=material, exclude_thinfilm=exclude_thinfilm,
+                                keywords={'neel_temperature': keywords}, write=write,
+                                filenames={'neel_temperature': filename}, rewrite=rewrite,
+                                sinks={'neel_temperature': sink} if sink is not None else None)['neel_temperature']
 
     @staticmethod
     def has_keywords(sentence, keywords):
@@ -401,13 +721,9 @@ class Doc:
         :param sentence: str
         :param keywords: list of str
         :return: boolean: True if the sentence contain a keyword, no if not
+                 A keyword containing AND (e.g. "skyrmion AND size") is only contained if all its terms are
         """
-        for k in keywords:
-            if 'AND' in keywords:
-                return all(word in sentence for word in re.split('[ ]?AND[ ]?', k))
-            elif k in sentence:
-                return True
-        return False
+        return len(km.get_matcher(keywords).match(sentence)) > 0
 
     def find_chemical(self, text=None, sorted=False):
         """
@@ -446,10 +762,9 @@ class Doc:
         if type(text) != str or text == '':
             return []
 
-        if not sorted:
-            result = chem.find_chemical(text, sorted_dict='n')
-        else:
-            result = chem.find_chemical(text)
+        result = [chemical for chemical, _, _ in self.find_chemical_spans(text)]
+        if sorted and sorted != 'n':
+            result = chem.sort_by_frequency(result)
 
         #temp = re.findall(
         #    '\A[A-Z]{1}[A-Za-z0-9().]*[A-Z]{1}[A-Za-z0-9().]*\W|'
@@ -504,85 +819,37 @@ class Doc:
 
         # return (collections.OrderedDict(sorted(counter.items(), key = lambda kv: kv[1])))
 
-    def get_skyrmion_size(self, material=None, filename=None, exclude_thinfilm='y', \
-                          keywords=None, write='y', rewrite='n'):
+    def find_chemical_spans(self, text=None, recognizer=None):
+        """
+        :param: text: string or None type
+        :param: recognizer: None, str or recognizers.Recognizer. If None, the recogniser of the document is used
+        :return: list of (chemical, start, end): chemicals recognised from text, with their positions in text
 
-        if keywords is None:
-            keywords = ['skyrmion AND size', 'skyrmion AND radius', 'skyrmion AND diameter',
-                        'heli AND wavelength', 'helical pitch', 'helical period']
+        Example:
+        >>> els_doc = ElsevierDoc(els_data)
+        >>> els_doc.find_chemical_spans('MnSi orders below T c =29.6K [11] helimagnetically.')
+        Out: [('MnSi', 0, 4)]
+        """
+        if text is None:
+            text = self.text
 
-        if type(self.text) != str:
+        if type(text) != str or text == '':
             return []
-        else:
-            ### If material is not mentioned in the article, then ignore the article
-            chemicals = self.find_chemical()
-            if material is not None:
-                if material not in chemicals and material not in self.title:
-                    if chemicals:
-                        material = max(set(chemicals), key=chemicals.count)
-            else:
-                material = max(set(chemicals), key=chemicals.count)
-
-            sentences = self.find_sentences(keywords, material)
 
-            # If it's an Elsevier file, remove the weird long sentence at the start
-            if self.is_elsevier():
-                sentences = [s for s in sentences if len(s) < 1500]
+        return self.cached(self.chemical_kind(recognizer), text,
+                           rec.get_recognizer(self.recognizer if recognizer is None else recognizer).find_spans)
 
-            if write == 'y':
-                if filename is None:
-                    filename = 'skyrmion_size_records' + str(datetime.date.today()) + '.csv'
-
-                if '.csv' not in filename:
-                    filename = filename + '.csv'
-                # Check if directory exists; if not, create a new folder 
-                if not os.path.exists('Data/Skyrmion_Size'):
-                    os.makedirs('Data/Skyrmion_Size')
-
-                columns = ['Compound', 'Original Skyrmion Size', 'Original Unit',
-                           'Skyrmion Size (nm)', 'Sentence', 'Title',
-                           'DOI', 'Author(s)', 'Journal', 'Volume', 'Page',
-                           'Cover Date', 'Access Date']
-
-                if not os.path.exists('Data/Skyrmion_Size/' + filename) or rewrite == 'y':
-                    with open('Data/Skyrmion_Size/' + filename, 'w') as f:
-                        writeo = csv.writer(f)
-                        writeo.writerow(columns)
-
-            skyrmion_size = []
-
-            for sent in sentences:
-                if exclude_thinfilm == 'y':
-                    if 'nanostruct' in sent or 'wire' in sent or 'film' in sent or 'quantum dot' in sent:
-                        continue
-
-                if 'nanoparticle' in sent or 'grain size' in sent or 'particle size' in sent or 'cell size' in sent or 'nanodisk' in sent:
-                    continue
-
-                for size in sks.find_size(sent):
-
-                    if self.find_chemical(sent, sorted='n'):
-                        write_out = [max(set(self.find_chemical(sent, sorted='n')),
-                                         key=self.find_chemical(sent, sorted='n').count),
-                                     sks.get_number(size), sks.get_unit(size), sks.convert_to_nm(size),
-                                     sent, self.title, self.doi, self.authors,
-                                     self.journal, self.volume, self.page, self.coverDate,
-                                     self.accessDate]
-                    else:
-                        write_out = [material, sks.get_number(size), sks.get_unit(size), sks.convert_to_nm(size),
-                                     sent, self.title, self.doi, self.authors,
-                                     self.journal, self.volume, self.page, self.coverDate,
-                                     self.accessDate]
-
-                    skyrmion_size.append(write_out)
-
-                    if write == 'y':
-                        with open('Data/Skyrmion_Size/' + filename, 'a') as f:
-                            if material == 'Fe0.5Co0.5Si':
-                                print(write_out)
-                            writeo = csv.writer(f)
-                            writeo.writerow(write_out)
-            return skyrmion_size
+    def get_skyrmion_size(self, material=None, filename=None, exclude_thinfilm='y', \
+                          keywords=None, write='y', rewrite='n', sink=None):
+        """
+        Same as get_curie_temperatures, for the skyrmion size (or helical period).
+        :return: list of records: [compound, size, unit, size in nm, sentence, title, doi, authors,
+                                   journal, volume, page, cover date, access date]
+        """
+        return self.extract_all(['skyrmion_size'], material=material, exclude_thinfilm=exclude_thinfilm,
+                                keywords={'skyrmion_size': keywords}, write=write,
+                                filenames={'skyrmion_size': filename}, rewrite=rewrite,
+                                sinks={'skyrmion_size': sink} if sink is not None else None)['skyrmion_size']
 
     # TODO: Find magnetic domains of material from text
     # def find_magnetism(self, text):
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache of the features of documents on disk, so that the extraction can be run again (e.g. with other keywords
+or filters) without any natural language processing.
+
+The features of a document are its sentence boundaries and, for each sentence, the positions of the chemicals,
+temperatures (in any unit and in kelvin) and lengths mentioned in it. They are kept in numpy files, in a folder
+named after the hash of the text of the document:
+    <directory>/<version>/<SHA-1 of the text>/spans.npy    int32 array of (kind, sentence, start, end)
+    <directory>/<version>/<SHA-1 of the text>/names.npy    the chemical formulae of the chemical spans
+where <version> is v<EXTRACTOR_VERSION>-<start of registry_hash()>, so that registering a unit or an exclusion
+gives new folders. The files are memory-mapped when they are read. A document whose text changes gets a new folder.
+
+To import this file, call
+
+>>> from doc_processing.feature_cache import FeatureCache
+>>> cache = FeatureCache('feature_cache')
+>>> cache.attach(els_doc)  # load the features of els_doc, computing them the first time
+>>> records = els_doc.extract_all(keywords={'curie_temperature': ['Tc']})
+"""
+
+import hashlib
+import os
+import re
+
+import numpy as np
+
+import lexicon as lex
+import quantity as qty
+from doc_processing.document import EXTRACTOR_VERSION
+
+# Kinds of features, in the order they are stored. The names are the kinds used by Doc.cached
+KINDS = ['sentences', 'chemicals', 'temperature_spans', 'kelvin', 'size_spans']
+# Kinds of features only found in sentences containing a digit
+QUANTITY_KINDS = ['temperature_spans', 'kelvin', 'size_spans']
+# Number of characters of registry_hash in the name of the folder of a version
+REGISTRY_HASH_LENGTH = 12
+
+
+def text_hash(text):
+    """
+    :param text: str or None
+    :return: str, SHA-1 of the text
+    """
+    if type(text) != str:
+        text = ''
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def registry_hash():
+    """
+    Hash of what the features depend on besides the code and the text: the units (quantity.register_unit,
+    lexicon.register_units) and the words that are not chemicals (lexicon.register_exclusions)
+    :return: str, SHA-1
+    """
+    registries = [[list(unit) for unit in qty.UNITS.values()],
+                  sorted(lex.UNIT_SET), sorted(lex.NOT_CHEMICAL_SET), sorted(lex.ELEMENT_SET)]
+    return hashlib.sha1(repr(registries).encode('utf-8')).hexdigest()
+
+
+def compute_features(doc):
+    """
+    Recognise the features of a document
+    :param doc: Doc
+    :return: (spans, names): spans is an int32 array with one row (kind, sentence, start, end) for each feature,
+             sorted by kind and sentence. kind is the index in KINDS, sentence is the index of the sentence
+             (-1 for the chemicals of the whole text), start and end are positions in the sentence
+             (in the text for the sentences themselves). names is an array of the chemical formulae,
+             one for each row of kind 'chemicals'
+    """
+    rows = []
+    names = []
+    sentences = doc.get_sentences()
+    for i, (_, start, end) in enumerate(sentences):
+        rows.append((KINDS.index('sentences'), i, start, end))
+
+    # The chemicals kept in the cache are always those found by the regular expressions (see recognizers.py)
+    for chemical, start, end in doc.find_chemical_spans(doc.text, recognizer='regex'):
+        rows.append((KINDS.index('chemicals'), -1, start, end))
+        names.append(chemical)
+    for i, (sentence, _, _) in enumerate(sentences):
+        for chemical, start, end in doc.find_chemical_spans(sentence, recognizer='regex'):
+            rows.append((KINDS.index('chemicals'), i, start, end))
+            names.append(chemical)
+
+    spans = {'temperature_spans': doc.find_temperature_spans,
+             'kelvin': doc.find_kelvin_spans,
+             'size_spans': doc.find_size_spans}
+    for kind in QUANTITY_KINDS:
+        for i, (sentence, _, _) in enumerate(sentences):
+            if not re.search('\d', sentence):
+                continue
+            for _, start, end in spans[kind](sentence):
+                rows.append((KINDS.index(kind), i, start, end))
+
+    return np.array(rows, dtype=np.int32).reshape(-1, 4), np.array(names, dtype=str)
+
+
+class DocumentFeatures:
+    def __init__(self, text, spans, names):
+        """
+        The features of one document, as returned by compute_features. The arrays are kept as they are given
+        (memory-mapped if they are read from the cache): the rows of a feature are found by binary search
+        when it is asked for, and only these rows are read
+        :param text: str, the text of the document
+        :param spans: int32 array of (kind, sentence, start, end)
+        :param names: array of str
+        """
+        self.text = text
+        self.spans = spans
+        self.names = names
+
+        # Rows are sorted by kind, then by sentence: the rows of kind k are bounds[k]:bounds[k + 1]
+        self.bounds = np.searchsorted(spans[:, 0], np.arange(len(KINDS) + 1)).tolist()
+        # Built the first time they are needed
+        self.table = None
+        self.index = None
+
+    def sentences(self):
+        """
+        :return: list of (sentence, start, end), see document.segment
+        """
+        if self.table is None:
+            k = KINDS.index('sentences')
+            rows = self.spans[self.bounds[k]:self.bounds[k + 1], 2:4].tolist()
+            self.table = [(self.text[start:end], start, end) for start, end in rows]
+        return list(self.table)
+
+    def sentence_index(self, sentence):
+        """
+        :param sentence: str
+        :return: int, the index of the first sentence of the document equal to sentence, or None
+        """
+        if self.index is None:
+            self.index = {}
+            for i, (s, _, _) in enumerate(self.sentences()):
+                self.index.setdefault(s, i)
+        return self.index.get(sentence)
+
+    def get(self, kind, sentence):
+        """
+        :param kind: str, one of KINDS
+        :param sentence: str, a sentence of the document or the whole text
+        :return: list of (mention, start, end), or None if this feature of sentence is not in the cache
+        """
+        if kind not in KINDS or kind == 'sentences':
+            return None
+        i = self.sentence_index(sentence)
+        if i is None:
+            if kind == 'chemicals' and sentence == self.text:
+                i = -1
+            else:
+                return None
+
+        k = KINDS.index(kind)
+        sentences = self.spans[self.bounds[k]:self.bounds[k + 1], 1]
+        first = self.bounds[k] + int(np.searchsorted(sentences, i, side='left'))
+        last = self.bounds[k] + int(np.searchsorted(sentences, i, side='right'))
+        positions = self.spans[first:last, 2:4].tolist()
+        if kind == 'chemicals':
+            names = self.names[first - self.bounds[k]:last - self.bounds[k]].tolist()
+            return [(str(name), start, end) for name, (start, end) in zip(names, positions)]
+        return [(sentence[start:end], start, end) for start, end in positions]
+
+
+class FeatureCache:
+    def __init__(self, directory='feature_cache'):
+        """
+        :param directory: str, the folder the features are kept in
+        """
+        self.directory = directory
+
+    def path(self, text):
+        """
+        :param text: str, the text of a document
+        :return: str, the folder of the features of the text
+        """
+        # Read at every call, since the registries can change after the cache is created
+        version = 'v' + str(EXTRACTOR_VERSION) + '-' + registry_hash()[:REGISTRY_HASH_LENGTH]
+        return os.path.join(self.directory, version, text_hash(text))
+
+    def load(self, doc):
+        """
+        :param doc: Doc
+        :return: DocumentFeatures, or None if the features of doc are not in the cache
+        """
+        folder = self.path(doc.text)
+        if not os.path.exists(os.path.join(folder, 'spans.npy')):
+            return None
+        spans = np.load(os.path.join(folder, 'spans.npy'), mmap_mode='r')
+        names = np.load(os.path.join(folder, 'names.npy'), mmap_mode='r')
+        return DocumentFeatures(doc.text, spans, names)
+
+    def save(self, doc):
+        """
+        Compute the features of a document and write them to the cache
+        :param doc: Doc
+        :return: DocumentFeatures
+        """
+        spans, names = compute_features(doc)
+        folder = self.path(doc.text)
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        # Each file is written under a temporary name first, so that other processes never read half a file.
+        # names.npy is written first, since the features are considered in the cache once spans.npy exists
+        for name, array in (('names', names), ('spans', spans)):
+            temporary = os.path.join(folder, name + '.' + str(os.getpid()) + '.npy')
+            np.save(temporary, array, allow_pickle=False)
+            os.replace(temporary, os.path.join(folder, name + '.npy'))
+
+        return DocumentFeatures(doc.text, spans, names)
+
+    def attach(self, doc):
+        """
+        Load the features of a document (computing and saving them if they are not in the cache),
+        so that the document reads them instead of recognising them again
+        :param doc: Doc
+        :return: DocumentFeatures, or None if the document has no text
+        """
+        if type(doc.text) != str:
+            return None
+        features = self.load(doc)
+        if features is None:
+            features = self.save(doc)
+        doc.clear_cache()
+        doc.features = features
+        return features
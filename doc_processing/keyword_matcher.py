@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Matching a list of keywords against sentences in a single scan of each sentence (Aho-Corasick automaton)
+
+A keyword may contain the phrase AND (e.g. "skyrmion AND size"), in which case all of its terms
+must be found in the same sentence.
+
+To import this file, call
+
+>>> import doc_processing.keyword_matcher as km
+>>> matcher = km.get_matcher(['Tc', 'Curie temperature', 'transition temperature AND ferromagnet'])
+>>> matcher.match('The ferromagnetic transition temperature Tc is 29 K.')
+OUT: ['Tc', 'transition temperature AND ferromagnet']
+"""
+
+import collections
+import functools
+import re
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        """
+        Compile a list of keywords into an automaton
+        :param keywords: list of strings. A keyword containing AND matches only if all of its terms are found
+        """
+        self.keywords = list(keywords)
+        self.terms = []  # the distinct terms of all the keywords
+        self.keyword_terms = []  # for each keyword, the indices of its terms
+        self.term_keywords = []  # for each term, the indices of the keywords using it
+        self.always = []  # indices of keywords without any term, which match every sentence
+
+        term_index = {}
+        for k, keyword in enumerate(self.keywords):
+            indices = set()
+            for term in re.split('[ ]?AND[ ]?', keyword):
+                if term == '':
+                    continue
+                if term not in term_index:
+                    term_index[term] = len(self.terms)
+                    self.terms.append(term)
+                    self.term_keywords.append([])
+                indices.add(term_index[term])
+                self.term_keywords[term_index[term]].append(k)
+            self.keyword_terms.append(frozenset(indices))
+            if not indices:
+                self.always.append(k)
+
+        # Trie of the terms: goto[state][character] = next state, output[state] = terms ending at state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [frozenset()]
+        for i, term in enumerate(self.terms):
+            state = 0
+            for character in term:
+                if character not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(frozenset())
+                    self.goto[state][character] = len(self.goto) - 1
+                state = self.goto[state][character]
+            self.output[state] = self.output[state] | {i}
+
+        # Failure links, in breadth-first order: fail[state] is the longest proper suffix of state in the trie
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self.goto[state].items():
+                queue.append(next_state)
+                f = self.fail[state]
+                while f != 0 and character not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[next_state] = self.goto[f].get(character, 0)
+                self.output[next_state] = self.output[next_state] | self.output[self.fail[next_state]]
+
+    def find_terms(self, sentence):
+        """
+        :param sentence: str
+        :return: set of the indices (in self.terms) of the terms found in sentence
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for character in sentence:
+            while state != 0 and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def match(self, sentence):
+        """
+        :param sentence: str
+        :return: list of the keywords found in sentence, in the order they were given
+
+        Example:
+        >>> KeywordMatcher(['skyrmion AND size', 'helical pitch']).match('The skyrmion size is 18 nm.')
+        OUT: ['skyrmion AND size']
+        """
+        found = self.find_terms(sentence)
+        candidates = set(self.always)
+        for i in found:
+            candidates.update(self.term_keywords[i])
+        return [self.keywords[k] for k in sorted(candidates) if self.keyword_terms[k] <= found]
+
+    def find(self, sentences):
+        """
+        :param sentences: list of str
+        :return: list of (sentence, keywords) for each sentence containing at least one keyword.
+                 Each sentence appears once, however many keywords it contains.
+        """
+        result = []
+        for sentence in sentences:
+            matched = self.match(sentence)
+            if matched:
+                result.append((sentence, matched))
+        return result
+
+
+@functools.lru_cache(maxsize=64)
+def compile_keywords(keywords):
+    return KeywordMatcher(keywords)
+
+
+def get_matcher(keywords):
+    """
+    :param keywords: list of strings
+    :return: KeywordMatcher. Matchers are compiled once for each list of keywords and reused afterwards
+    """
+    return compile_keywords(tuple(keywords))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lexicon of the chemical element symbols, the units and the other words that are not chemical formulae.
+
+The lists are turned once, when this file is imported, into frozensets (so that looking up a token takes constant
+time, whatever the length of the lists) and into a prefix trie of the element symbols (so that a formula can be
+split into its element symbols by taking the longest symbol at each position, e.g. 'Uue' rather than 'U').
+
+Units and exclusions can be added at run time with register_units and register_exclusions. The functions below
+always look up the current sets, so the code using them does not need to be changed or reloaded.
+Chemicals already recognised (e.g. in the feature cache, see feature_cache.py) are not recognised again.
+
+To import this file, call
+
+>>> import doc_processing.lexicon as lex
+>>> lex.is_element('Fe'), lex.is_excluded('GPa')
+OUT: (True, True)
+>>> lex.split_elements('Cu2OSeO3')
+OUT: ['Cu', 'O', 'Se', 'O']
+"""
+
+# The following units are not accepted as chemical formulae
+NOT_CHEMICALS = ["K", "h", "V", "wt", "wt.", "MHz", "kHz", "GHz", "Hz", "days", "weeks",
+                 "T", "MPa", "GPa", "N", "A", "kOe", "Oe", "h.", "mWcm−2", "keV", "MeV", "meV",
+                 "mAcm−2", "mA", "mK", "mT", "s-1", "dB",
+                 "Ag-1", "mAg-1", "mAg−1", "mAg", "mAh", "mAhg−1", "m-2", "mJ", "kJ",
+                 "m2g−1", "THz", "KHz", "kJmol−1", "Torr", "gL-1", "Vcm−1", "mVs−1",
+                 "J", "GJ", "mTorr", "bar", "cm2", "mbar", "kbar", "mmol", "mol", "molL−1",
+                 "MΩ", "Ω", "kΩ", "mΩ", "mgL−1", "moldm−3", "m2", "m3", "cm-1", "cm",
+                 "Scm−1", "Acm−1", "eV−1cm−2", "cm-2", "sccm", "cm−2eV−1", "cm−3eV−1",
+                 "kA", "s−1", "emu", "L", "cmHz1", "gmol−1", "kVcm−1", "MPam1",
+                 "cm2V−1s−1", "Acm−2", "cm−2s−1", "MV", "ionscm−2", "Jcm−2", "ncm−2",
+                 "Jcm−2", "Wcm−2", "GWcm−2", "Acm−2K−2", "gcm−3", "cm3g−1", "mgl−1",
+                 "mgml−1", "mgcm−2", "mΩcm", "cm−2s−1", "cm−2", "ions", "moll−1",
+                 "nmol", "psi", "mol·L−1", "Jkg−1K−1", "km", "Wm−2", "mass", "mmHg",
+                 "mmmin−1", "GeV", "m−2", "m−2s−1", "Kmin−1", "gL−1", "ng", "hr", "w",
+                 "mN", "kN", "Mrad", "rad", "arcsec", "Ag−1", "dpa", "cdm−2",
+                 "mHz", "mL", "ML", "mlmin−1", "MWm−2",
+                 "Wm−1K−1", "Wm−1K−1", "kWh", "Wkg−1", "Jm−3", "m-3", "gl−1", "A−1",
+                 "Ks−1", "mgdm−3", "mms−1", "ks", "appm", "ºC", "HV", "kDa", "Da", "kG",
+                 "kGy", "MGy", "Gy", "mGy", "Gbps", "μB", "μL", "μF", "nF", "pF", "mF",
+                 "A", "Å", "A˚", "μgL−1", "MGOe", "AMFs", "TC", "Tc", "TN", "Tn"]
+
+ELEMENTS = ["H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar", "K",
+            "Ca", "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn", "Ga", "Ge", "As", "Se", "Br", "Kr",
+            "Rb", "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn", "Sb", "Te", "I",
+            "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb",
+            "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr",
+            "Ra", "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr", "Rf",
+            "Db", "Sg", "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og", "Uue"]
+
+# Units of measurement (words that may be written just after a number)
+SPLIT_UNITS = ["K", "h", "V", "wt", "wt.", "MHz", "kHz", "GHz", "Hz", "days", "weeks",
+               "hours", "minutes", "seconds", "T", "MPa", "GPa", "at.", "mol.",
+               "at", "m", "N", "s-1", "vol.", "vol", "eV", "A", "atm", "bar",
+               "kOe", "Oe", "h.", "mWcm−2", "keV", "MeV", "meV", "day", "week", "hour",
+               "minute", "month", "months", "year", "cycles", "years", "fs", "ns",
+               "ps", "rpm", "g", "mg", "mAcm−2", "mA", "mK", "mT", "s-1", "dB",
+               "Ag-1", "mAg-1", "mAg−1", "mAg", "mAh", "mAhg−1", "m-2", "mJ", "kJ",
+               "m2g−1", "THz", "KHz", "kJmol−1", "Torr", "gL-1", "Vcm−1", "mVs−1",
+               "J", "GJ", "mTorr", "bar", "cm2", "mbar", "kbar", "mmol", "mol", "molL−1",
+               "MΩ", "Ω", "kΩ", "mΩ", "mgL−1", "moldm−3", "m2", "m3", "cm-1", "cm",
+               "Scm−1", "Acm−1", "eV−1cm−2", "cm-2", "sccm", "cm−2eV−1", "cm−3eV−1",
+               "kA", "s−1", "emu", "L", "cmHz1", "gmol−1", "kVcm−1", "MPam1",
+               "cm2V−1s−1", "Acm−2", "cm−2s−1", "MV", "ionscm−2", "Jcm−2", "ncm−2",
+               "Jcm−2", "Wcm−2", "GWcm−2", "Acm−2K−2", "gcm−3", "cm3g−1", "mgl−1",
+               "mgml−1", "mgcm−2", "mΩcm", "cm−2s−1", "cm−2", "ions", "moll−1",
+               "nmol", "psi", "mol·L−1", "Jkg−1K−1", "km", "Wm−2", "mass", "mmHg",
+               "mmmin−1", "GeV", "m−2", "m−2s−1", "Kmin−1", "gL−1", "ng", "hr", "w",
+               "mN", "kN", "Mrad", "rad", "arcsec", "Ag−1", "dpa", "cdm−2",
+               "cd", "mcd", "mHz", "m−3", "ppm", "phr", "mL", "ML", "mlmin−1", "MWm−2",
+               "Wm−1K−1", "Wm−1K−1", "kWh", "Wkg−1", "Jm−3", "m-3", "gl−1", "A−1",
+               "Ks−1", "mgdm−3", "mms−1", "ks", "appm", "ºC", "HV", "kDa", "Da", "kG",
+               "kGy", "MGy", "Gy", "mGy", "Gbps", "μB", "μL", "μF", "nF", "pF", "mF",
+               "A", "Å", "A˚", "μgL−1", "MGOe", "AMFs"]
+
+# Hash sets of the lists above, so that token classification is a constant-time lookup
+ELEMENT_SET = frozenset(ELEMENTS)
+NOT_CHEMICAL_SET = frozenset(NOT_CHEMICALS)
+UNIT_SET = frozenset(SPLIT_UNITS)
+
+
+def build_trie(words):
+    """
+    :param words: list of str
+    :return: dictionary, the root of the trie. Each node maps a character to the next node;
+             the key None is in the nodes where a word ends
+    """
+    root = {}
+    for word in words:
+        node = root
+        for character in word:
+            node = node.setdefault(character, {})
+        node[None] = word
+    return root
+
+
+ELEMENT_TRIE = build_trie(ELEMENTS)
+
+
+def is_element(symbol):
+    """
+    :param symbol: str
+    :return: boolean, whether or not symbol is the symbol of a chemical element
+    """
+    return symbol in ELEMENT_SET
+
+
+def is_unit(token):
+    """
+    :param token: str
+    :return: boolean, whether or not token is a unit of measurement
+    """
+    return token in UNIT_SET
+
+
+def is_excluded(token):
+    """
+    :param token: str
+    :return: boolean, whether or not token is a word that is not accepted as a chemical formula
+    """
+    return token in NOT_CHEMICAL_SET
+
+
+def longest_element(text, start=0):
+    """
+    :param text: str
+    :param start: int, the position in text the symbol starts at
+    :return: str, the longest element symbol starting at text[start], or None
+
+    Example:
+    >>> longest_element('MnSi', 2)
+    OUT: 'Si'
+    >>> longest_element('Uue')
+    OUT: 'Uue'
+    """
+    node = ELEMENT_TRIE
+    result = None
+    for character in text[start:start + 3]:
+        if character not in node:
+            break
+        node = node[character]
+        if None in node:
+            result = node[None]
+    return result
+
+
+def split_elements(formula):
+    """
+    Split a formula into its element symbols, taking the longest symbol at each position.
+    The other characters (numbers, brackets, spaces, ...) are skipped.
+    :param formula: str
+    :return: list of str, the element symbols in the order they are written (with repetitions)
+
+    Example:
+    >>> split_elements('(Fe1-xCox)Si')
+    OUT: ['Fe', 'Co', 'Si']
+    """
+    result = []
+    i = 0
+    while i < len(formula):
+        symbol = longest_element(formula, i)
+        if symbol is None:
+            i += 1
+        else:
+            result.append(symbol)
+            i += len(symbol)
+    return result
+
+
+def register_units(units):
+    """
+    Add units of measurement. Units are not accepted as chemical formulae either
+    :param units: list of str
+
+    Example:
+    >>> register_units(['mSv'])
+    """
+    global UNIT_SET, NOT_CHEMICAL_SET
+    UNIT_SET = UNIT_SET | frozenset(units)
+    NOT_CHEMICAL_SET = NOT_CHEMICAL_SET | frozenset(units)
+
+
+def register_exclusions(tokens):
+    """
+    Add words that are not accepted as chemical formulae (e.g. abbreviations such as 'TC')
+    :param tokens: list of str
+
+    Example:
+    >>> register_exclusions(['LSMO'])
+    """
+    global NOT_CHEMICAL_SET
+    NOT_CHEMICAL_SET = NOT_CHEMICAL_SET | frozenset(tokens)
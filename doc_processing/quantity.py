@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Finding quantities (a number or a range of numbers followed by a unit) in text, and converting them between units.
+temperature.py and skyrmion_size.py use this module for temperatures and lengths.
+
+The units are kept in a registry (UNITS). Each unit belongs to a quantity (e.g. 'temperature' or 'length')
+and is converted to the base unit of the quantity by base = (value + shift) * scale + offset.
+Other units can be added with register_unit.
+
+The regular expression of a list of units is compiled once and reused afterwards. It is written for the regex
+package with possessive quantifiers, so that the time taken is linear in the length of the text, even for long
+runs of digits (see regex_benchmark.py).
+
+Lists of mentions can be parsed in one go (parse_batch) into a numpy structured array with one row per number,
+which can then be converted to another unit with vectorized operations (convert_batch).
+Whole columns of sentences (e.g. the Sentence column of the files written by Doc.extract_all) can be parsed
+again with extract_series, without reading the articles.
+
+To import this file, call
+
+>>> import doc_processing.quantity as qty
+>>> qty.find_quantities('The Curie temperature of the material is between 400 and 410 K.', ['K', 'C', 'F'])
+OUT: [Quantity(text=' 400 and 410 K.', start=48, end=63, values=array([400., 410.]), unit='K',
+               is_range=True, has_error=False)]
+>>> qty.convert(np.array([100.]), 'C', 'K')
+OUT: array([373.15])
+"""
+
+import collections
+import fractions
+import functools
+import itertools
+import re
+
+import numpy as np
+import pandas as pd
+import regex
+
+Unit = collections.namedtuple('Unit', ['symbol', 'quantity', 'base', 'scale', 'shift', 'offset'])
+
+# A mention of a quantity found in a text
+Quantity = collections.namedtuple('Quantity', ['text', 'start', 'end', 'values', 'unit', 'is_range', 'has_error'])
+
+# Registry of the units, in the order they were registered
+UNITS = collections.OrderedDict()
+
+# A number, followed by an optional range (e.g. 10 to 20) or error (e.g. 10 ± 2), then possibly a separator.
+# This used to be
+#   '\W\d*[.]?\d*(?:[ ]?and[ ]?|[ ]?to[ ]?|[ ]?±[ ]?|[ ]?-[ ]?|[ ]?–[ ]?|)?\d+[.]?\d*[^A-Za-z0-9μ]?'
+# which splits a run of digits between its three \d quantifiers in every possible way before failing
+# (a run of 250 digits took 15 s). The pattern below matches exactly the same mentions: a number is either
+# two numbers joined by a separator, or one number with at most two dots (with a digit between them).
+# Runs of digits are possessive (\d++), since giving back a digit can never lead to a match.
+SEPARATOR_PATTERN = '(?:[ ]?and[ ]?|[ ]?to[ ]?|[ ]?±[ ]?|[ ]?-[ ]?|[ ]?–[ ]?)'
+NUMBER_PATTERN = ('(?:\d*+(?:[.]\d*+)?' + SEPARATOR_PATTERN + '\d++(?:[.]\d*+)?'
+                  '|\d++(?:[.](?:\d++(?:[.]\d*+)?)?)?'
+                  '|[.]\d++(?:[.]\d*+)?)')
+BASE_PATTERN = '\W' + NUMBER_PATTERN + '[^A-Za-z0-9μ]?'
+
+# One row per number of a list of mentions: the number, the code of its unit (see unit_code; -1 if the unit is
+# not found) and the position in the list of the mention it was found in
+RECORD_DTYPE = np.dtype([('value', 'f8'), ('unit', 'i2'), ('source', 'i4')])
+
+_NUMBER = re.compile('\d+[.,]?\d*')
+
+
+def register_unit(symbol, quantity, base, scale=1, shift=0, offset=0):
+    """
+    Add a unit to the registry, or replace it
+    :param symbol: str, the unit as it is written in text (e.g. 'nm')
+    :param quantity: str, what the unit measures (e.g. 'length')
+    :param base: str, the symbol of the unit the quantity is converted to (e.g. 'nm')
+    :param scale: int, float or fractions.Fraction
+    :param shift: int or float
+    :param offset: int or float. A value in this unit is (value + shift) * scale + offset in the base unit
+
+    Example:
+    >>> register_unit('mm', 'length', 'nm', scale=1000000)
+    """
+    UNITS[symbol] = Unit(symbol, quantity, base, fractions.Fraction(scale), shift, offset)
+
+
+def unit_code(symbol):
+    """
+    :param symbol: str or None
+    :return: int, the position of the unit in the registry, or -1 if it is not registered
+    """
+    for i, u in enumerate(UNITS):
+        if u == symbol:
+            return i
+    return -1
+
+
+def unit_symbol(code):
+    """
+    :param code: int, as returned by unit_code
+    :return: str, the symbol of the unit
+    """
+    return list(UNITS.keys())[code]
+
+
+def get_units(quantity):
+    """
+    :param quantity: str
+    :return: list of the symbols of the units of the quantity, in the order they were registered
+    """
+    return [u.symbol for u in UNITS.values() if u.quantity == quantity]
+
+
+register_unit('K', 'temperature', 'K')
+register_unit('C', 'temperature', 'K', offset=273.15)
+register_unit('F', 'temperature', 'K', scale=fractions.Fraction(5, 9), shift=-32, offset=273.15)
+
+register_unit('Å', 'length', 'nm', scale=fractions.Fraction(1, 10))
+register_unit('Angstrom', 'length', 'nm', scale=fractions.Fraction(1, 10))
+register_unit('nm', 'length', 'nm')
+register_unit('μm', 'length', 'nm', scale=1000)
+register_unit('um', 'length', 'nm', scale=1000)
+register_unit('μ m', 'length', 'nm', scale=1000)
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(units):
+    """
+    :param units: tuple of str
+    :return: compiled regular expression (regex package) matching a quantity in one of the units;
+             the unit is the group 'unit'
+    """
+    return regex.compile(BASE_PATTERN + '(?P<unit>' + '|'.join(re.escape(u) for u in units) + ')\W')
+
+
+@functools.lru_cache(maxsize=64)
+def compile_unit_pattern(units, boundary=False):
+    """
+    :param units: tuple of str
+    :param boundary: bool, whether or not the unit must be followed by a non-word character or the end of the text
+    :return: compiled regular expression matching one of the units; the unit is the group 'unit'
+    """
+    pattern = '(?P<unit>' + '|'.join(re.escape(u) for u in units) + ')'
+    if boundary:
+        pattern = pattern + '(?:\W|\Z)'
+    return re.compile(pattern)
+
+
+def as_tuple(units):
+    if type(units) == str:
+        return (units,)
+    return tuple(units)
+
+
+def pattern(units):
+    """
+    :param units: str or list of str
+    :return: str, the regular expression matching a quantity in one of the units
+    """
+    return compile_pattern(as_tuple(units)).pattern
+
+
+def find_mentions(text, units):
+    """
+    :param text: str
+    :param units: str or list of str
+    :return: list of (mention, start, end) of the quantities in one of the units mentioned in text, sorted by start
+    """
+    return [(m.group(), m.start(), m.end()) for m in compile_pattern(as_tuple(units)).finditer(text)]
+
+
+def find_quantities(text, units):
+    """
+    Find all the quantities in one of the units mentioned in text, in a single scan of the text
+    :param text: str
+    :param units: str or list of str
+    :return: list of Quantity, sorted by start. values is the numpy array of the numbers of the mention
+             (see parse_numbers), is_range is True for ranges (e.g. 10 to 20 K) and has_error is True
+             for values with an error (e.g. 10 ± 2 K)
+    """
+    result = []
+    for m in compile_pattern(as_tuple(units)).finditer(text):
+        result.append(make_quantity(m.group(), m.start(), m.end(), m.group('unit')))
+    return result
+
+
+def parse_quantity(text, units):
+    """
+    :param text: str, the mention of one quantity (e.g. ' 100 to 200 nm')
+    :param units: str or list of str
+    :return: Quantity, with start 0 and end len(text). unit is the first of the units found in text, or None
+    """
+    return make_quantity(text, 0, len(text), find_unit(text, units))
+
+
+def make_quantity(text, start, end, unit):
+    return Quantity(text, start, end, parse_numbers(text), unit,
+                    any(s in text for s in ('and', 'to', '-', '–')), '±' in text)
+
+
+def find_unit(text, units, boundary=False):
+    """
+    :param text: str
+    :param units: str or list of str
+    :param boundary: bool, whether or not the unit must be followed by a non-word character or the end of the text
+    :return: str, the first of the units mentioned in text, or None
+    """
+    m = compile_unit_pattern(as_tuple(units), boundary).search(text)
+    if m:
+        return m.group('unit')
+    return None
+
+
+def parse_numbers(text):
+    """
+    Get numbers in a body of text
+    :param text: string
+    :return: numpy array of floats, or None if there is no number in text.
+             If the text contains ±, only the first number (the value, without its error) is returned
+
+    Example:
+    >>> parse_numbers(' 100 to 200 K ')
+    Out: array([100., 200.])
+    >>> parse_numbers(' 100 ± 2 K ')
+    Out: array([100.])
+    """
+    numbers = find_numbers(text)
+    if not numbers:
+        return None
+    return np.array(numbers)
+
+
+def find_numbers(text):
+    """
+    Same as parse_numbers, but the numbers are returned as a list (empty if there is no number in text)
+    """
+    numbers = _NUMBER.findall(text.replace(',', '.'))
+    if '±' in text:
+        numbers = numbers[:1]
+    return [float(f) for f in numbers]
+
+
+def parse_batch(mentions, units, boundary=False):
+    """
+    Parse a list of mentions of quantities at once
+    :param mentions: list of str or pandas Series of str
+    :param units: str or list of str, the units looked for in each mention (see find_unit)
+    :param boundary: bool, whether or not the unit must be followed by a non-word character or the end of the text
+    :return: numpy array of RECORD_DTYPE, with one row for each number of each mention, in order.
+             source is the position of the mention in mentions (for a Series, its label is mentions.index[source])
+
+    Example:
+    >>> parse_batch([' 50 K ', ' 100 to 200°C '], ['K', 'C', 'F'])
+    Out: array([( 50., 0, 0), (100., 1, 1), (200., 1, 1)],
+               dtype=[('value', '<f8'), ('unit', '<i2'), ('source', '<i4')])
+    """
+    units = as_tuple(units)
+    codes = {u: unit_code(u) for u in units}
+    numbers = []
+    counts = np.empty(len(mentions), dtype=np.int64)
+    unit_codes = np.empty(len(mentions), dtype=np.int16)
+    for i, text in enumerate(mentions):
+        found = find_numbers(text)
+        numbers.append(found)
+        counts[i] = len(found)
+        unit_codes[i] = codes.get(find_unit(text, units, boundary), -1)
+
+    records = np.empty(int(counts.sum()), dtype=RECORD_DTYPE)
+    records['value'] = list(itertools.chain.from_iterable(numbers))
+    records['unit'] = np.repeat(unit_codes, counts)
+    records['source'] = np.repeat(np.arange(len(mentions)), counts)
+    return records
+
+
+def convert_batch(records, target):
+    """
+    Convert the values of records (as returned by parse_batch) to one unit
+    :param records: numpy array of RECORD_DTYPE
+    :param target: str, the unit the values are converted to
+    :return: numpy array of floats, one for each record
+
+    Example:
+    >>> convert_batch(parse_batch([' 50 K ', ' 100 to 200°C '], ['K', 'C', 'F']), 'K')
+    Out: array([ 50.  , 373.15, 473.15])
+    """
+    result = np.empty(len(records))
+    for code in np.unique(records['unit']):
+        mask = records['unit'] == code
+        if code < 0:
+            raise ValueError('The unit of mention ' + str(records['source'][mask][0]) + ' is not recognised. '
+                             'The recognised units are ' + ', '.join(UNITS.keys()))
+        result[mask] = convert(records['value'][mask], unit_symbol(code), target)
+    return result
+
+
+def extract_series(series, units, normalized_unit=None):
+    """
+    Find and parse the quantities of a whole column of texts at once
+    :param series: pandas Series of str (other values, e.g. NaN, are ignored)
+    :param units: str or list of str
+    :param normalized_unit: None or str, the unit all the values are converted to (e.g. 'K' or 'nm')
+    :return: pandas DataFrame in long format, with one row for each number of each mention.
+             Its index is the index of series, followed by 'match' (the position of the mention in its text)
+             and 'number' (the position of the number in the mention). Its columns are 'mention', 'unit',
+             'value' and, if normalized_unit is specified, 'normalized' (the value in normalized_unit)
+
+    Example:
+    >>> sentences = pd.Series(['MnSi orders below T c =29.6K [11] helimagnetically.',
+                               'FeGe orders between 270 and 280 K, whereas Cu2OSeO3 orders at 58 K.'])
+    >>> extract_series(sentences, ['K', 'C', 'F'])
+    Out:
+                            mention unit  value
+          match number
+        0 0     0            =29.6K     K   29.6
+        1 0     0       270 and 280 K,    K  270.0
+                1       270 and 280 K,    K  280.0
+          1     0                58 K.    K   58.0
+    """
+    columns = ['mention', 'unit', 'value']
+    if normalized_unit is not None:
+        columns.append('normalized')
+
+    # The mentions are found with the regex package (pandas str.extractall only takes patterns of the re module).
+    # The texts are found by position, since the index of series may contain duplicates
+    found = compile_pattern(as_tuple(units))
+    rows = [(i, j, m.group(), m.group('unit'))
+            for i, text in enumerate(series.values) if isinstance(text, str)
+            for j, m in enumerate(found.finditer(text))]
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+    mentions = pd.DataFrame(rows, columns=['position', 'match', 'mention', 'unit']).set_index(['position', 'match'])
+
+    numbers = mentions['mention'].str.replace(',', '.', regex=False).str.extractall('(?P<value>\d+[.]?\d*)')
+    result = mentions.reindex(numbers.index.droplevel(-1))
+    result['value'] = numbers['value'].astype(float).values
+
+    # If the mention contains ±, only the first number is the value; the other one is its error
+    position, match, number = [numbers.index.get_level_values(i).values for i in range(3)]
+    keep = ~result['mention'].str.contains('±', regex=False).values | (number == 0)
+    result = pd.DataFrame({c: result[c].values[keep] for c in ['mention', 'unit', 'value']})
+
+    labels = series.index.take(position[keep])
+    arrays = [labels.get_level_values(i) for i in range(labels.nlevels)] + [match[keep], number[keep]]
+    result.index = pd.MultiIndex.from_arrays(arrays, names=list(series.index.names) + ['match', 'number'])
+
+    if normalized_unit is not None:
+        values, units = result['value'].values, result['unit'].values
+        normalized = np.empty(len(result))
+        for unit in pd.unique(units):
+            normalized[units == unit] = convert(values[units == unit], unit, normalized_unit)
+        result['normalized'] = normalized
+    return result[columns]
+
+
+def convert(values, unit, target):
+    """
+    Convert values between two units of the same quantity
+    :param values: numpy array of floats
+    :param unit: str, the unit of the values
+    :param target: str, the unit the values are converted to
+    :return: numpy array of floats
+
+    Example:
+    >>> convert(np.array([50., 100.]), 'C', 'K')
+    Out: array([323.15, 373.15])
+    >>> convert(np.array([100.]), 'nm', 'Å')
+    Out: array([1000.])
+    """
+    for u in (unit, target):
+        if u not in UNITS:
+            raise ValueError('Unit \'' + str(u) + '\' is not recognised. The recognised units are '
+                             + ', '.join(UNITS.keys()))
+    unit, target = UNITS[unit], UNITS[target]
+    if unit.quantity != target.quantity:
+        raise ValueError('Cannot convert ' + unit.quantity + ' (' + unit.symbol + ') to '
+                         + target.quantity + ' (' + target.symbol + ').')
+
+    if unit.symbol == target.symbol:
+        return values
+    if unit.shift == target.shift == 0 and unit.offset == target.offset == 0:
+        return values * float(unit.scale / target.scale)
+
+    base = (values + unit.shift) * float(unit.scale) + unit.offset
+    if target.symbol == unit.base:
+        return base
+    return (base - target.offset) / float(target.scale) - target.shift
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recognisers of the chemicals mentioned in a text, so that each run can choose between speed and accuracy:
+    'regex'     the regular expressions of chemicals.py (fast, only formulae of 2 or more elements)
+    'mat2vec'   the MaterialsTextProcessor of mat2vec (slower, more general)
+
+Every recogniser returns the chemicals of a text with their positions, as chemicals.find_chemical_spans does,
+and can be given a batch of sentences at once. Recognisers are created once per process (see get_recognizer).
+
+To import this file, call
+
+>>> import doc_processing.recognizers as rec
+>>> recognizer = rec.get_recognizer('mat2vec')
+>>> recognizer.find_spans_batch(['MnSi orders below T c =29.6K [11] helimagnetically.', 'No chemical here.'])
+OUT: [[('MnSi', 0, 4)], []]
+>>> rec.compare(els_doc.find_sentences(['Tc']), ['regex', 'mat2vec'])
+"""
+
+from abc import ABC, abstractmethod
+import collections
+import time
+
+from mat2vec.processing.process import MaterialsTextProcessor
+
+import chemicals as chem
+
+# Maximum number of sentences whose chemicals are remembered by a (slow) recogniser
+MEMO_SIZE = 100000
+
+
+class Recognizer(ABC):
+    """
+    Interface of the recognisers. Subclasses implement find_spans; find_spans_batch can be
+    overridden if a batch of sentences can be processed faster than one sentence at a time.
+    """
+    name = None
+
+    @abstractmethod
+    def find_spans(self, text):
+        """
+        :param text: str
+        :return: list of (chemical, start, end): chemicals recognised from text, with their positions in text
+        """
+        pass
+
+    def find_spans_batch(self, texts):
+        """
+        :param texts: list of str
+        :return: list of lists of (chemical, start, end), one for each text
+        """
+        return [self.find_spans(text) for text in texts]
+
+    def config(self):
+        """
+        The settings that change the chemicals found by the recogniser, so that runs can be compared
+        (see corpus.fingerprint). Subclasses with such settings add them
+        :return: dictionary
+        """
+        return {'name': self.name}
+
+
+class RegexRecognizer(Recognizer):
+    name = 'regex'
+
+    def find_spans(self, text):
+        return chem.find_chemical_spans(text)
+
+
+class Mat2vecRecognizer(Recognizer):
+    name = 'mat2vec'
+
+    def __init__(self, memo_size=MEMO_SIZE):
+        """
+        The MaterialsTextProcessor is created once, and the chemicals of each sentence are remembered
+        (up to memo_size sentences, the least recently used one being dropped first)
+        :param memo_size: int
+        """
+        self.processor = MaterialsTextProcessor()
+        self.memo = collections.OrderedDict()
+        self.memo_size = memo_size
+
+    def process(self, text):
+        """
+        :param text: str
+        :return: list of (chemical, start, end). The chemicals are the materials found by mat2vec, as written in text.
+                 Materials that cannot be found in text (e.g. after accents are removed) are left out
+        """
+        result = []
+        position = 0
+        for material, _ in self.processor.process(text)[1]:
+            start = text.find(material, position)
+            if start == -1:
+                start = text.find(material)
+            if start == -1:
+                continue
+            result.append((material, start, start + len(material)))
+            position = start + len(material)
+        return result
+
+    def find_spans(self, text):
+        return self.find_spans_batch([text])[0]
+
+    def find_spans_batch(self, texts):
+        """
+        Each distinct text of the batch that has not been seen before is processed once
+        """
+        for text in texts:
+            if text in self.memo:
+                self.memo.move_to_end(text)
+            else:
+                self.memo[text] = self.process(text)
+        result = [self.memo[text] for text in texts]
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return result
+
+
+RECOGNIZERS = {'regex': RegexRecognizer, 'mat2vec': Mat2vecRecognizer}
+
+# Recognisers already created in this process, keyed on their names
+_instances = {}
+
+
+def get_recognizer(recognizer=None):
+    """
+    :param recognizer: None, str (a key of RECOGNIZERS) or Recognizer. If None, 'regex' is used
+    :return: Recognizer. The recogniser of a given name is created only the first time it is asked for
+    """
+    if isinstance(recognizer, Recognizer):
+        return recognizer
+    if recognizer is None:
+        recognizer = 'regex'
+    if recognizer not in RECOGNIZERS:
+        raise ValueError('Recognizer \'' + str(recognizer) + '\' is not recognised. The only recognised recognizers are '
+                         + ', '.join(RECOGNIZERS.keys()))
+    if recognizer not in _instances:
+        _instances[recognizer] = RECOGNIZERS[recognizer]()
+    return _instances[recognizer]
+
+
+def compare(sentences, recognizers=None):
+    """
+    Measure the time taken by several recognisers on the same sentences, and how much their results agree
+    :param sentences: list of str
+    :param recognizers: None or list of recognisers (see get_recognizer). If None, all of RECOGNIZERS are compared
+    :return: list of (recognizer, seconds, number of chemicals found, number of sentences where the chemicals found
+             are the same as with the first recogniser)
+    """
+    if recognizers is None:
+        recognizers = list(RECOGNIZERS.keys())
+
+    rows = []
+    reference = None
+    for r in recognizers:
+        recognizer = get_recognizer(r)
+        start = time.perf_counter()
+        spans = recognizer.find_spans_batch(list(sentences))
+        seconds = time.perf_counter() - start
+
+        found = [sorted(chemical for chemical, _, _ in s) for s in spans]
+        if reference is None:
+            reference = found
+        rows.append((recognizer.name, seconds, sum(len(f) for f in found),
+                     sum(1 for f, g in zip(found, reference) if f == g)))
+    return rows
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worst-case benchmark of the regular expressions used to find temperatures, lengths and chemicals.
+
+Each recogniser is run on adversarial texts (long runs of digits, numeric tables, lists of references, runs of
+capital letters and brackets, ...) of increasing sizes. The time taken per kilobyte of text must stay below
+MAX_MS_PER_KB whatever the size of the text, i.e. the time taken must be linear in the length of the text.
+
+To run the benchmark, call (from the doc_processing folder)
+
+>>> python regex_benchmark.py
+OUT: text            size (KB)  find_temperature  find_size  find_chemical   (ms per KB)
+     digits                  1              0.02       0.02           0.47
+     ...
+
+or, from Python
+
+>>> import doc_processing.regex_benchmark as rb
+>>> rows = rb.run()
+>>> rb.check(rows)
+"""
+
+import sys
+import time
+
+import chemicals as chem
+import skyrmion_size as sks
+import temperature as tmp
+
+# Maximum time taken per kilobyte of text, in milliseconds
+MAX_MS_PER_KB = 50
+
+# Sizes of the texts, in kilobytes
+SIZES = [1, 4, 16, 64]
+
+RECOGNISERS = [('find_temperature', tmp.find_temperature),
+               ('find_size', sks.find_size),
+               ('find_chemical', chem.find_chemical)]
+
+
+def repeat(unit, size):
+    """
+    :param unit: str
+    :param size: int, in kilobytes
+    :return: str, unit repeated to (about) size kilobytes
+    """
+    return (unit * (size * 1024 // len(unit) + 1))[:size * 1024]
+
+
+# Each function returns an adversarial text of the given size (in kilobytes)
+ADVERSARIAL = {
+    # A long run of digits that is not followed by a unit
+    'digits': lambda size: ' ' + repeat('1', size) + 'x',
+    # Digits separated by dots, as in version numbers or badly extracted tables
+    'dotted digits': lambda size: ' ' + repeat('1.', size) + 'x',
+    # Numbers separated by range separators, without a unit at the end
+    'ranges': lambda size: ' ' + repeat('1 to 2 and 3 - ', size) + 'x',
+    # A numeric table, as found in Elsevier originalText
+    'table': lambda size: repeat(' 12.5 0.31 (2) 300 ± 4', size),
+    # A long list of references
+    'references': lambda size: '[' + repeat('12,', size) + ']',
+    # Runs of capital letters and digits, which look like long chemical formulae
+    'formula': lambda size: repeat('Fe2Ge3Mn', size),
+    # Nested brackets around formulae
+    'brackets': lambda size: repeat('((Fe', size) + repeat(')2', size // 4 + 1),
+    # Units without numbers and numbers without units
+    'units': lambda size: repeat(' K nm Å . 5 ', size),
+}
+
+
+def time_function(function, text, repeats=3):
+    """
+    :param function: function taking a text as its only argument
+    :param text: str
+    :param repeats: int, the number of runs; the fastest one is kept
+    :return: float, the time taken in milliseconds
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(text)
+        elapsed = (time.perf_counter() - start) * 1000
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run(sizes=None, texts=None):
+    """
+    Time every recogniser on every adversarial text
+    :param sizes: None or list of int, the sizes of the texts in kilobytes. If not specified, SIZES is used
+    :param texts: None or list of str, keys of ADVERSARIAL. If not specified, all the texts are used
+    :return: list of (text, size, recogniser, milliseconds per kilobyte)
+    """
+    if sizes is None:
+        sizes = SIZES
+    if texts is None:
+        texts = list(ADVERSARIAL.keys())
+
+    rows = []
+    for name in texts:
+        for size in sizes:
+            text = ADVERSARIAL[name](size)
+            for recogniser, function in RECOGNISERS:
+                rows.append((name, size, recogniser, time_function(function, text) / (len(text) / 1024)))
+    return rows
+
+
+def check(rows, max_ms_per_kb=MAX_MS_PER_KB):
+    """
+    :param rows: list of (text, size, recogniser, milliseconds per kilobyte), as returned by run
+    :param max_ms_per_kb: float
+    :return: list of the rows taking longer than max_ms_per_kb per kilobyte (empty if the benchmark passed)
+    """
+    return [row for row in rows if row[3] > max_ms_per_kb]
+
+
+def print_rows(rows):
+    recognisers = [r for r, _ in RECOGNISERS]
+    print('{:<15}{:>10}'.format('text', 'size (KB)') + ''.join('{:>18}'.format(r) for r in recognisers)
+          + '   (ms per KB)')
+    table = {}
+    for name, size, recogniser, ms in rows:
+        table.setdefault((name, size), {})[recogniser] = ms
+    for (name, size), times in table.items():
+        print('{:<15}{:>10}'.format(name, size) + ''.join('{:>18.3f}'.format(times[r]) for r in recognisers))
+
+
+if __name__ == '__main__':
+    rows = run()
+    print_rows(rows)
+    slow = check(rows)
+    if slow:
+        print('\nSlower than ' + str(MAX_MS_PER_KB) + ' ms per KB:')
+        for name, size, recogniser, ms in slow:
+            print('  ' + recogniser + ' on ' + name + ' (' + str(size) + ' KB): ' + '{:.1f}'.format(ms) + ' ms per KB')
+        sys.exit(1)
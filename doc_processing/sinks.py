@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Result sinks: where the extracted records are written to.
+
+A sink opens its output once, keeps the rows it is given in a buffer and writes them in batches.
+The buffer is written out by flush() and the output is closed by close(); a sink can also be used
+in a with statement, which closes it at the end. The rows that were in the output before it was opened
+can be deleted by delete_previous() (e.g. the old records of a document that is extracted again).
+
+Three kinds of output are supported: CSV (CSVSink), SQLite (SQLiteSink) and Parquet (ParquetSink,
+requires pyarrow).
+
+To import this file, call
+
+>>> import doc_processing.sinks as sinks
+>>> with sinks.open_sink('Data/records.csv', ['Compound', 'Extracted Temperature (K)']) as sink:
+...     sink.write(['MnSi', 29.5])
+"""
+
+from abc import ABC, abstractmethod
+import csv
+import numbers
+import os
+import sqlite3
+
+import numpy as np
+
+# Extension of the files written by each kind of sink
+EXTENSIONS = {'csv': '.csv', 'sqlite': '.sqlite', 'parquet': '.parquet'}
+
+
+class ResultSink(ABC):
+    def __init__(self, path, columns, rewrite='n', batch_size=1000):
+        """
+        :param path: str, the file the records are written to
+        :param columns: list of str, the names of the columns
+        :param rewrite: str type, whether or not existing records in the file should be deleted
+                        If not specified, rewrite is 'n' and the records are added to the file
+        :param batch_size: int, the number of rows kept in memory before they are written out
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.rewrite = rewrite
+        self.batch_size = batch_size
+        self.buffer = []
+        self.rows_written = 0
+        self.closed = False
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.open()
+
+    @abstractmethod
+    def open(self):
+        pass
+
+    @abstractmethod
+    def write_batch(self, rows):
+        """
+        Write a list of rows to the output
+        """
+        pass
+
+    @abstractmethod
+    def close_output(self):
+        pass
+
+    @abstractmethod
+    def delete_previous(self, matches):
+        """
+        Delete the rows that were in the output before the sink was opened and match one of matches.
+        The rows written through the sink are kept
+        :param matches: list of dictionaries, keys are columns and values are the values of the rows to delete
+                        (e.g. [{'DOI': '10.1016/j.jmmm.2019.01.001'}])
+        """
+        pass
+
+    def write(self, row):
+        """
+        :param row: list of values, in the same order as self.columns
+        """
+        if self.closed:
+            raise ValueError('Cannot write to ' + self.path + ': the sink is closed.')
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """
+        Write out the rows kept in memory
+        """
+        if self.buffer:
+            self.write_batch(self.buffer)
+            self.rows_written += len(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        if not self.closed:
+            # The output is closed even if the last rows cannot be written
+            self.closed = True
+            try:
+                self.flush()
+            finally:
+                self.close_output()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CSVSink(ResultSink):
+    def open(self):
+        new_file = not os.path.exists(self.path) or self.rewrite == 'y'
+        self.file = open(self.path, 'w' if new_file else 'a', newline='')
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(self.columns)
+
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close_output(self):
+        self.file.close()
+
+    def delete_previous(self, matches):
+        if not matches:
+            return
+        self.flush()
+        self.file.close()
+        with open(self.path, newline='') as f:
+            rows = list(csv.reader(f))
+        header, rows = rows[0], rows[1:]
+        # The rows written through the sink are the last ones of the file
+        previous = len(rows) - self.rows_written
+        keys = [[(header.index(c), to_text(v)) for c, v in match.items()] for match in matches]
+        kept = [row for row in rows[:previous]
+                if not any(all(i < len(row) and row[i] == v for i, v in key) for key in keys)]
+
+        temporary = self.path + '.' + str(os.getpid())
+        with open(temporary, 'w', newline='') as f:
+            csv.writer(f).writerows([header] + kept + rows[previous:])
+        os.replace(temporary, self.path)
+        self.file = open(self.path, 'a', newline='')
+        self.writer = csv.writer(self.file)
+
+
+class SQLiteSink(ResultSink):
+    def __init__(self, path, columns, rewrite='n', batch_size=1000, table='records'):
+        """
+        :param table: str, the name of the table the records are written to
+        See ResultSink for the other parameters
+        """
+        self.table = table
+        super().__init__(path, columns, rewrite=rewrite, batch_size=batch_size)
+
+    def open(self):
+        self.connection = sqlite3.connect(self.path)
+        if self.rewrite == 'y':
+            self.connection.execute('DROP TABLE IF EXISTS ' + quote_name(self.table))
+        self.connection.execute('CREATE TABLE IF NOT EXISTS ' + quote_name(self.table) + ' ('
+                                + ', '.join(quote_name(c) for c in self.columns) + ')')
+        self.insert = ('INSERT INTO ' + quote_name(self.table) + ' VALUES ('
+                       + ', '.join('?' for _ in self.columns) + ')')
+        # Rows are numbered in the order they are inserted: the rows written through the sink come after this one
+        self.last_previous_row = self.connection.execute('SELECT MAX(rowid) FROM '
+                                                         + quote_name(self.table)).fetchone()[0] or 0
+
+    def write_batch(self, rows):
+        self.connection.executemany(self.insert, [[to_value(x) for x in row] for row in rows])
+        self.connection.commit()
+
+    def close_output(self):
+        self.connection.close()
+
+    def delete_previous(self, matches):
+        for match in matches:
+            self.connection.execute('DELETE FROM ' + quote_name(self.table) + ' WHERE rowid <= ?'
+                                    + ''.join(' AND ' + quote_name(c) + ' IS ?' for c in match),
+                                    [self.last_previous_row] + [to_value(v) for v in match.values()])
+        self.connection.commit()
+
+
+class ParquetSink(ResultSink):
+    """
+    Parquet files cannot be added to, so an existing file is only written to if rewrite is 'y'
+    (a ValueError is raised otherwise). To write the records of many documents to one Parquet file,
+    open a single sink and pass it to Doc.extract_all (see the sinks argument).
+    Columns whose values in the first batch are all numbers are stored as floats, the others as strings.
+    A later value that is not a number in a float column raises a ValueError instead of being lost.
+    """
+
+    def open(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('pyarrow is needed to write Parquet files. It can be installed with pip install pyarrow')
+        if os.path.exists(self.path) and self.rewrite != 'y':
+            raise ValueError('Cannot add records to the Parquet file ' + self.path + ': open the sink with '
+                             'rewrite=\'y\' to replace it, or write all the records through a single sink.')
+        self.pyarrow = pyarrow
+        self.writer = None
+        self.schema = None
+
+    def write_batch(self, rows):
+        pa = self.pyarrow
+        values = [[to_value(x) for x in row] for row in rows]
+
+        if self.schema is None:
+            fields = []
+            for i, c in enumerate(self.columns):
+                column = [row[i] for row in values if row[i] is not None]
+                if column and all(is_number(x) for x in column):
+                    fields.append(pa.field(c, pa.float64()))
+                else:
+                    fields.append(pa.field(c, pa.string()))
+            self.schema = pa.schema(fields)
+            self.writer = pa.parquet.ParquetWriter(self.path, self.schema)
+
+        arrays = []
+        for i, field in enumerate(self.schema):
+            if field.type == pa.float64():
+                for row in values:
+                    if row[i] is not None and not is_number(row[i]):
+                        raise ValueError('Column \'' + field.name + '\' of ' + self.path + ' is stored as numbers, '
+                                         'but ' + repr(row[i]) + ' is not a number.')
+                column = [float(row[i]) if row[i] is not None else None for row in values]
+            else:
+                column = [str(row[i]) if row[i] is not None else None for row in values]
+            arrays.append(pa.array(column, type=field.type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close_output(self):
+        if self.writer is None:
+            # Nothing was written: still create a file with the columns
+            pa = self.pyarrow
+            self.schema = pa.schema([pa.field(c, pa.string()) for c in self.columns])
+            self.writer = pa.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.close()
+
+    def delete_previous(self, matches):
+        # A Parquet file is always written from scratch (see open), so it has no previous rows
+        pass
+
+
+SINKS = {'csv': CSVSink, 'sqlite': SQLiteSink, 'parquet': ParquetSink}
+
+
+def open_sink(path, columns, rewrite='n', output_format=None, **kwargs):
+    """
+    Open a sink of the right kind for a file
+    :param path: str, the file the records are written to
+    :param columns: list of str, the names of the columns
+    :param rewrite: str type, whether or not existing records in the file should be deleted
+    :param output_format: None, 'csv', 'sqlite' or 'parquet'
+                          If not specified, the format is found from the extension of path (CSV by default)
+    :return: ResultSink
+    """
+    if output_format is None:
+        output_format = 'csv'
+        for f, extension in EXTENSIONS.items():
+            if path.endswith(extension) or (f == 'sqlite' and path.endswith('.db')):
+                output_format = f
+
+    if output_format not in SINKS:
+        raise ValueError('Output format \'' + str(output_format) + '\' is not recognised. '
+                         'The only recognised formats are ' + ', '.join(SINKS.keys()))
+
+    return SINKS[output_format](path, columns, rewrite=rewrite, **kwargs)
+
+
+def quote_name(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def is_number(x):
+    return isinstance(x, numbers.Number) and not isinstance(x, bool)
+
+
+def to_text(x):
+    """
+    :return: str, a value of a record as it is written in a CSV file
+    """
+    x = to_value(x)
+    return '' if x is None else str(x)
+
+
+def to_value(x):
+    """
+    Convert a value of a record to a type that can be stored in a database
+    (numbers, strings or None; everything else, e.g. lists of authors or arrays, is written as a string)
+    """
+    if x is None or isinstance(x, (str, int, float)):
+        return x
+    if isinstance(x, np.generic):
+        return x.item()
+    if isinstance(x, np.ndarray) and x.size == 1:
+        return x.item()
+    return str(x)
@@ -19,14 +19,29 @@ import re
 
 import numpy as np
 
-SKYRMION_SIZE_UNITS = ['Å', 'Angstrom', 'nm', 'μm', 'um', 'μ m']
+import quantity as qty
+
+
+def skyrmion_size_units():
+    """
+    :return: list of str, the units of length of the registry (['Å', 'Angstrom', 'nm', 'μm', 'um', 'μ m'] and those
+             added with quantity.register_unit). They are read at every call, so that units registered later are found
+    """
+    return qty.get_units('length')
+
+
+def __getattr__(name):
+    # SKYRMION_SIZE_UNITS is kept as a name of the module, read from the registry as skyrmion_size_units()
+    if name == 'SKYRMION_SIZE_UNITS':
+        return skyrmion_size_units()
+    raise AttributeError('module \'' + __name__ + '\' has no attribute \'' + name + '\'')
 
 
 def find_size(text, units=None):
     """
     :param: text (string)
     :param: units (None or list of strings): units that are used for skyrmion size
-                  If not specified, units is set to SKYRMION_SIZE_UNITS
+                  If not specified, units is set to skyrmion_size_units()
     :return: list of strings: the mentions of size in text
 
     >>> from doc_processing.skyrmion_size import find_size
@@ -34,17 +49,76 @@ def find_size(text, units=None):
     OUT: [' 50 and 100 nm.']
     """
 
+    return [size for size, _, _ in find_size_spans(text, units)]
+
+
+def find_size_spans(text, units=None):
+    """
+    Same as find_size, but each mention is returned with its position in text
+    :param: text (string)
+    :param: units (None or list of strings)
+    :return: list of (mention, start, end), sorted by start
+
+    >>> from doc_processing.skyrmion_size import find_size_spans
+    >>> find_size_spans('The skyrmion size in the material is between 50 and 100 nm.')
+    OUT: [(' 50 and 100 nm.', 44, 59)]
+    """
     if units is None:
-        units = SKYRMION_SIZE_UNITS
+        units = skyrmion_size_units()
+    return qty.find_mentions(text, units)
+
+
+def find_size_quantities(text, units=None):
+    """
+    Same as find_size, but each mention is returned with its numbers, unit and position
+    :param: text (string)
+    :param: units (None or list of strings)
+    :return: list of quantity.Quantity
+
+    >>> from doc_processing.skyrmion_size import find_size_quantities
+    >>> find_size_quantities('The skyrmion size in the material is between 50 and 100 nm.')
+    OUT: [Quantity(text=' 50 and 100 nm.', start=44, end=59, values=array([ 50., 100.]), unit='nm',
+                   is_range=True, has_error=False)]
+    """
+    if units is None:
+        units = skyrmion_size_units()
+    return qty.find_quantities(text, units)
 
-    base_pattern = '\W\d*[.]?\d*(?:[ ]?and[ ]?|[ ]?to[ ]?|[ ]?±[ ]?|[ ]?-[ ]?|[ ]?–[ ]?|)?\d+[.]?\d*[^A-Za-z0-9μ]?'
-    pattern = u''
-    for i in range(len(units)):
-        if i < len(units) - 1:
-            pattern = pattern + base_pattern + units[i] + '\W|'
-        else:
-            pattern = pattern + base_pattern + units[i] + '\W'
-    return re.findall(pattern, text)
+
+def find_size_series(series, units=None, normalized_unit=None):
+    """
+    Find and parse the lengths of a whole column of sentences at once
+    (e.g. the Sentence column of the files written by Doc.get_skyrmion_size)
+    :param series: pandas Series of strings
+    :param units: None or list of strings
+    :param normalized_unit: None, nm, A, Å or Angstrom. If specified, the converted lengths are in the column 'normalized'
+    :return: pandas DataFrame with one row for each number of each mention (see quantity.extract_series)
+
+    >>> import pandas as pd
+    >>> from doc_processing.skyrmion_size import find_size_series
+    >>> data = pd.read_csv('Data/Skyrmion_Size/skyrmion_size_records2019-08-01.csv')
+    >>> find_size_series(data['Sentence'], normalized_unit='nm')
+    """
+    if units is None:
+        units = skyrmion_size_units()
+    if normalized_unit == 'A' or normalized_unit == 'Angstrom':
+        normalized_unit = 'Å'
+    if normalized_unit is not None and normalized_unit not in ('nm', 'Å'):
+        raise ValueError('Unit \'' + normalized_unit + '\' is not recognised. The only recognised inputs '
+                                                       'for normalized_unit are \'nm\', \'A\', '
+                                                       '\'Å\' and \'Angstrom\'.')
+    return qty.extract_series(series, units, normalized_unit=normalized_unit)
+
+
+def size_pattern(units=None):
+    """
+    :param: units (None or list of strings)
+                  If not specified, units is set to skyrmion_size_units()
+    :return: string, the regular expression matching a length in one of the units
+    """
+    if units is None:
+        units = skyrmion_size_units()
+    return qty.pattern(units)
 
 
 def get_number(text):
@@ -58,22 +132,13 @@ def get_number(text):
     >>> get_number(' 100 to 200 nm')
     Out: array([100., 200.])
     """
-    if len(re.findall('\d+[.,]?\d*', text)) > 0:
-        text = text.replace(',', '.')
-        if '±' in text:
-            return np.array([float(''.join(re.findall('\d+[.,]?\d*', text)[0]))])
-        elif 'and' in text or 'to' in text or '-' in text:
-            return np.array([float(f.replace(',', '.')) for f in re.findall('\d+[.,]?\d*', text)])
-        else:
-            return np.array([float(f.replace(',', '.')) for f in re.findall('\d+[.,]?\d*', text)])
-    else:
-        return None
+    return qty.parse_numbers(text)
 
 
 def get_number_from_list(alist, normalized_unit=None, roundto=None):
     """
-    Return an array of numbers from a list of strings
-    :param alist: list of strings
+    Return an array of numbers from a list of strings (see get_records)
+    :param alist: list of strings or pandas Series
     :param normalized_unit: None or str
                             Allowed input: None, nm, A, Å, Angstrom
                             If not specified, normalized_unit is set to None
@@ -99,19 +164,40 @@ def get_number_from_list(alist, normalized_unit=None, roundto=None):
     ValueError: Unit 'km' is not recognised. The only recognised inputs for normalized_unit are 'nm', 'A', 'Å' and
                'Angstrom'.
     """
-    result = np.array([])
-    for el in alist:
-        if normalized_unit == 'nm':
-            result = np.append(result, convert_to_nm(el, roundto=roundto))
-        elif normalized_unit == 'A' or normalized_unit == 'Angstrom' or normalized_unit == 'Å':
-            result = np.append(result, convert_to_angstrom(el, roundto=roundto))
-        elif normalized_unit is None:
-            result = np.append(result, get_number(el))
-        else:
-            raise ValueError('Unit \'' + normalized_unit + '\' is not recognised. The only recognised inputs '
-                                                           'for normalized_unit are \'nm\', \'A\', '
-                                                           '\'Å\' and \'Angstrom\'.')
-    return result
+    return np.array(get_records(alist, normalized_unit=normalized_unit, roundto=roundto)['value'])
+
+
+def get_records(alist, normalized_unit=None, roundto=None):
+    """
+    Same as get_number_from_list, but all the strings are parsed at once and the result is a numpy structured array
+    with one row (value, unit, source) for each number: unit is the code of the unit of the value
+    (see quantity.unit_code) and source is the position in alist of the string the number was found in
+    :param alist: list of strings or pandas Series
+    :param normalized_unit: None, nm, A, Å or Angstrom. If specified, all the values are converted together
+    :param roundto: None or int, to what decimal place the converted values are rounded to
+    :return: numpy array of quantity.RECORD_DTYPE
+
+    Example:
+    >>> from doc_processing.skyrmion_size import get_records
+    >>> get_records(['100 to 200 nm', '50 um'], normalized_unit='nm')
+    Out: array([(  100., 5, 0), (  200., 5, 0), (50000., 5, 1)],
+               dtype=[('value', '<f8'), ('unit', '<i2'), ('source', '<i4')])
+    """
+    if normalized_unit == 'A' or normalized_unit == 'Angstrom':
+        normalized_unit = 'Å'
+    if normalized_unit is not None and normalized_unit not in ('nm', 'Å'):
+        raise ValueError('Unit \'' + normalized_unit + '\' is not recognised. The only recognised inputs '
+                                                       'for normalized_unit are \'nm\', \'A\', '
+                                                       '\'Å\' and \'Angstrom\'.')
+
+    records = qty.parse_batch(alist, skyrmion_size_units())
+    if normalized_unit is not None:
+        values = qty.convert_batch(records, normalized_unit)
+        if roundto is not None:
+            values = np.round(values, roundto)
+        records['value'] = values
+        records['unit'] = qty.unit_code(normalized_unit)
+    return records
 
 
 def get_unit(text, units=None):
@@ -120,7 +206,7 @@ def get_unit(text, units=None):
     :param text: string
     :param units: None or list of string
                   units to look from.
-                  If not specified, the units are set to those in SKYRMION_SIZE_UNITS list on top of this file
+                  If not specified, the units are set to skyrmion_size_units()
                   If the string does not contain any unit specified, it will make a guess of the unit
     :return: string, which should be the unit
 
@@ -133,17 +219,11 @@ def get_unit(text, units=None):
     """
 
     if units is None:
-        units = SKYRMION_SIZE_UNITS
-
-    pattern = ''
-    for u in units:
-        if u == units[0]:
-            pattern = pattern + u
-        else:
-            pattern = pattern + '|' + u
+        units = skyrmion_size_units()
 
-    if re.findall(pattern, text):
-        return re.findall(pattern, text)[0]
+    unit = qty.find_unit(text, units)
+    if unit is not None:
+        return unit
     else:
         if re.findall('\d', text) and re.findall('\D+\Z', text):
             return ''.join([x[:-1] for x in re.findall('\D+\Z', text)][0].split())
@@ -175,15 +255,13 @@ def convert_to_nm(text, roundto=None):
     OUT: ValueError: ('Initial unit  km is not recognised',
                       'SKYRMION_SIZE_UNITS', ['Å', 'Angstrom', 'nm', 'μm', 'um', 'μ m'])
     """
-    if get_unit(text) == 'nm':
-        number = get_number(text)  # 1 nm = 1 nm
-    elif get_unit(text) == 'μm' or get_unit(text) == 'um' or get_unit(text) == 'μ m':
-        number = get_number(text) * 1000  ## 1 micron = 1000 nm
-    elif get_unit(text) == 'Å' or get_unit(text) == 'Angstrom':
-        number = get_number(text) * 0.1  ## 1 Angstrom = 0.1 nm
+    unit = get_unit(text)
+    units = skyrmion_size_units()
+    if unit in units:
+        number = qty.convert(get_number(text), unit, 'nm')
     else:
-        raise ValueError('Initial unit  ' + get_unit(text) + ' is not recognised',
-                         'SKYRMION_SIZE_UNITS', SKYRMION_SIZE_UNITS)
+        raise ValueError('Initial unit  ' + str(unit) + ' is not recognised',
+                         'SKYRMION_SIZE_UNITS', units)
 
     if roundto is None:
         return number
@@ -206,14 +284,12 @@ def convert_to_angstrom(text, roundto=None):
     OUT: ValueError: ('Initial unit is not recognised.
                        SKYRMION_SIZE_UNITS = ', ['Å', 'Angstrom', 'nm', 'μm', 'um', 'μ m'])
     """
-    if get_unit(text) == 'Å':
-        number = get_number(text)
-    elif get_unit(text) == 'nm':
-        number = get_number(text) * 10  ## 1 nm = 10 Angstrom
-    elif get_unit(text) == 'um' or get_unit(text) == 'μm' or get_unit(text) == 'μ m':
-        number = get_number(text) * 10000  ## 1 um = 10,000 Angstrom
+    unit = get_unit(text)
+    units = skyrmion_size_units()
+    if unit in units:
+        number = qty.convert(get_number(text), unit, 'Å')
     else:
-        raise ValueError('Initial unit is not recognised. SKYRMION_SIZE_UNITS = ', SKYRMION_SIZE_UNITS)
+        raise ValueError('Initial unit is not recognised. SKYRMION_SIZE_UNITS = ', units)
 
     if roundto is None:
         return number
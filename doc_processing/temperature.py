@@ -26,18 +26,32 @@ OUT: array([ 17., 320.,   0., 318.])
 """
 
 import collections
-import re
 
 import numpy as np
 
-TEMPERATURE_UNITS = ['K', 'C', 'F']
+import quantity as qty
+
+
+def temperature_units():
+    """
+    :return: list of str, the units of temperature of the registry (['K', 'C', 'F'] and those added with
+             quantity.register_unit). They are read at every call, so that units registered later are found
+    """
+    return qty.get_units('temperature')
+
+
+def __getattr__(name):
+    # TEMPERATURE_UNITS is kept as a name of the module, read from the registry as temperature_units()
+    if name == 'TEMPERATURE_UNITS':
+        return temperature_units()
+    raise AttributeError('module \'' + __name__ + '\' has no attribute \'' + name + '\'')
 
 
 def find_temperature(text, units=None):
     """
     :param: text: string
     :param: unit: None, string or list of string
-                  If not specified, the units is then set to TEMPERATURE_UNITS, specified at the top of this file
+                  If not specified, the units is then set to temperature_units()
     
     :return: list of strings of temperature
 
@@ -54,23 +68,76 @@ def find_temperature(text, units=None):
     OUT: [' 100 K ']
     """
 
+    return [t for t, _, _ in find_temperature_spans(text, units)]
+
+
+def find_temperature_spans(text, units=None):
+    """
+    Same as find_temperature, but each mention is returned with its position in text
+    :param: text: string
+    :param: units: None, string or list of string
+    :return: list of (mention, start, end), sorted by start
+
+    Example:
+    >>> from doc_processing.temperature import find_temperature_spans
+    >>> find_temperature_spans('The Curie temperature of the material is 400 K.')
+    OUT: [(' 400 K.', 40, 47)]
+    """
     if units is None:
-        units = TEMPERATURE_UNITS
+        units = temperature_units()
+    return qty.find_mentions(text, units)
 
-    if type(units) == str:
-        units = [units]
 
-    base_pattern = '\W\d*[.]?\d*(?:[ ]?and[ ]?|[ ]?to[ ]?|[ ]?±[ ]?|[ ]?-[ ]?|[ ]?–[ ]?|)?\d+[.]?\d*[^A-Za-z0-9μ]?'
-    unit_pattern = '(?:'
-    for i in range(len(units)):
-        if i != len(units) - 1:
-            unit_pattern = unit_pattern + units[i] + '\W' + '|'
-        else:
-            unit_pattern = unit_pattern + units[i] + '\W' + ')'
+def find_temperature_quantities(text, units=None):
+    """
+    Same as find_temperature, but each mention is returned with its numbers, unit and position
+    :param: text: string
+    :param: units: None, string or list of string
+    :return: list of quantity.Quantity
 
-    pattern = base_pattern + unit_pattern
+    Example:
+    >>> from doc_processing.temperature import find_temperature_quantities
+    >>> find_temperature_quantities('The Curie temperature of the material is 400 K.')
+    OUT: [Quantity(text=' 400 K.', start=40, end=47, values=array([400.]), unit='K', is_range=False,
+                   has_error=False)]
+    """
+    if units is None:
+        units = temperature_units()
+    return qty.find_quantities(text, units)
 
-    return re.findall(pattern, text)
+
+def find_temperature_series(series, units=None, normalized_unit=None):
+    """
+    Find and parse the temperatures of a whole column of sentences at once
+    (e.g. the Sentence column of the files written by Doc.get_curie_temperatures)
+    :param series: pandas Series of strings
+    :param units: None, string or list of string
+    :param normalized_unit: None or 'K'. If 'K', the temperatures converted to kelvin are in the column 'normalized'
+    :return: pandas DataFrame with one row for each number of each mention (see quantity.extract_series)
+
+    Example:
+    >>> import pandas as pd
+    >>> from doc_processing.temperature import find_temperature_series
+    >>> data = pd.read_csv('Data/Curie Temperature/Curie_temperature_records2019-08-01.csv')
+    >>> find_temperature_series(data['Sentence'], normalized_unit='K')
+    """
+    if units is None:
+        units = temperature_units()
+    if normalized_unit is not None and normalized_unit != 'K':
+        raise ValueError('normalized_unit \'' + normalized_unit + '\' is not recognised.'
+                                                                  'The only recognised values are None or \'K\'')
+    return qty.extract_series(series, units, normalized_unit=normalized_unit)
+
+
+def temperature_pattern(units=None):
+    """
+    :param: units: None, string or list of string
+                  If not specified, the units is then set to temperature_units()
+    :return: string, the regular expression matching a temperature in one of the units
+    """
+    if units is None:
+        units = temperature_units()
+    return qty.pattern(units)
 
 
 def get_number(text):
@@ -86,22 +153,13 @@ def get_number(text):
 
 
     """
-    if len(re.findall('\d+[.,]?\d*', text)) > 0:
-        text = text.replace(',', '.')
-        if '±' in text:
-            return np.array([float(''.join(re.findall('\d+[.,]?\d*', text)[0]))])
-        elif 'and' in text or 'to' in text or '-' in text:
-            return np.array([float(f.replace(',', '.')) for f in re.findall('\d+[.,]?\d*', text)])
-        else:
-            return np.array([float(f.replace(',', '.')) for f in re.findall('\d+[.,]?\d*', text)])
-    else:
-        return None
+    return qty.parse_numbers(text)
 
 
 def get_number_from_list(alist, normalized_unit=None):
     """
-    Return an array of numbers from a list of strings
-    :param alist: list of strings
+    Return an array of numbers from a list of strings (see get_records)
+    :param alist: list of strings or pandas Series
     :param normalized_unit: None or string
                             If not specified, it will be set to None
                             If normalized_unit == None, the temperatures will be extracted as they are
@@ -120,16 +178,33 @@ def get_number_from_list(alist, normalized_unit=None):
     >>> get_number_from_list([' 50 K ', '100 to 200°C'], normalized_unit='C')
     ValueError: normalized_unit 'C' is not recognised.The only recognised values are None or 'K'
     """
-    result = np.array([])
-    for el in alist:
-        if normalized_unit is None:
-            result = np.append(result, get_number(el))
-        elif normalized_unit == 'K':
-            result = np.append(result, convert_to_kelvin(el))
-        else:
-            raise ValueError('normalized_unit \'' + normalized_unit + '\' is not recognised.'
-                                                                      'The only recognised values are None or \'K\'')
-    return result
+    return np.array(get_records(alist, normalized_unit=normalized_unit)['value'])
+
+
+def get_records(alist, normalized_unit=None):
+    """
+    Same as get_number_from_list, but all the strings are parsed at once and the result is a numpy structured array
+    with one row (value, unit, source) for each number: unit is the code of the unit of the value
+    (see quantity.unit_code) and source is the position in alist of the string the number was found in
+    :param alist: list of strings or pandas Series
+    :param normalized_unit: None or 'K'. If 'K', all the values are converted to kelvin together
+    :return: numpy array of quantity.RECORD_DTYPE
+
+    Example:
+    >>> from doc_processing.temperature import get_records
+    >>> get_records([' 50 K ', '100 to 200°C'], normalized_unit='K')
+    Out: array([( 50.  , 0, 0), (373.15, 0, 1), (473.15, 0, 1)],
+               dtype=[('value', '<f8'), ('unit', '<i2'), ('source', '<i4')])
+    """
+    if normalized_unit is not None and normalized_unit != 'K':
+        raise ValueError('normalized_unit \'' + normalized_unit + '\' is not recognised.'
+                                                                  'The only recognised values are None or \'K\'')
+
+    records = qty.parse_batch(alist, temperature_units(), boundary=True)
+    if normalized_unit is not None:
+        records['value'] = qty.convert_batch(records, normalized_unit)
+        records['unit'] = qty.unit_code(normalized_unit)
+    return records
 
 
 def get_unit(text):
@@ -141,17 +216,9 @@ def get_unit(text):
              The unit ('C', 'F' or 'K')
              If the unit is not found, an empty list will be returned.
     """
-    pattern = '(?:'
-    for i in range(len(TEMPERATURE_UNITS)):
-        if i != len(TEMPERATURE_UNITS) - 1:
-            pattern = pattern + TEMPERATURE_UNITS[i] + '|'
-        else:
-            pattern = pattern + TEMPERATURE_UNITS[i] + ')'
-
-    pattern = pattern + '(?:\W|\Z)'
-
-    if re.findall(pattern, text):
-        return re.findall('[CFK]', re.findall(pattern, text)[0])[0]
+    unit = qty.find_unit(text, temperature_units(), boundary=True)
+    if unit is not None:
+        return unit
     else:
         return []
 
@@ -189,12 +256,10 @@ def convert_to_kelvin(text):
     >>> convert_to_kelvin(' 50 to 100°C ')
     Out: array([323.15, 373.15])
     """
-    if get_unit(text) == 'K':
-        return get_number(text)  # 1 K = 1 K
-    elif get_unit(text) == 'C':
-        return get_number(text) + 273.15
-    elif get_unit(text) == 'F':
-        return (get_number(text) - 32) * (5 / 9) + 273.15
+    unit = get_unit(text)
+    units = temperature_units()
+    if unit in units:
+        return qty.convert(get_number(text), unit, 'K')
     else:
-        raise ValueError(get_unit(text) + ' is not a recognised unit. The only units '
-                                          'recognised are K, C and F.')
+        raise ValueError(str(unit) + ' is not a recognised unit. The only units '
+                                     'recognised are ' + ', '.join(units) + '.')
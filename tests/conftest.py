@@ -0,0 +1,46 @@
+# The modules of doc_processing and utility import each other by their file names (e.g. import chemicals),
+# so their folders are added to the path, as well as the root of the repository (for import doc_processing....)
+import os
+import re
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ['', 'doc_processing', 'utility']:
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+
+ROWS = [
+    # Point group, SG #, Space Group, Compound, Magnet in Title, skyrmions, reference, title, temperature
+    ['23', 198, 'P 21 3', 'Fe Ge', 'Y', 'Bloch', 'a', 'Magnetic structures of cubic Fe Ge', 100],
+    ['23', 198, 'P 21 3', 'Mn Si', 'N', 'Bloch', 'b', 'Helical order in Mn Si', 300],
+    ['1', 1, 'P 1', '(Pr0.33 Mn0.67)', 'Y', None, 'c', 'Pr Mn', None],
+    ['23', 198, 'P 21 3', 'Fe Ge', 'N', 'Bloch', 'd', 'Magnetic properties of Cr1-x Fex Ge', 10],
+    ['-43m', 216, 'F -4 3 m', 'Zn S', 'N', 'None', 'e', 'Zinc blende', 20],
+    ['23', 198, 'P 21 3', 'Mn0.9 Fe0.1 Si', 'Y', 'Bloch', 'f', 'Doped Mn Si', 30],
+    ['422', 92, 'P 41 21 2', 'Sn Se', 'N', 'Unknown', 'g', 'Tin selenide', 40],
+]
+COLUMNS = ['Point group', 'SG #', 'Space Group', 'Compound', 'Magnet in Title',
+           'Skyrmions? Bloch/Neel/Anti/None/Unknown', 'Reference', 'Structural Paper Title',
+           'Structural measurement temperature/K']
+
+
+@pytest.fixture
+def materials(tmp_path):
+    """A small 'materials.csv', written the way the database is (with an unnamed index column)"""
+    path = str(tmp_path / 'materials.csv')
+    pd.DataFrame(ROWS, columns=COLUMNS).to_csv(path)
+    return path
+
+
+@pytest.fixture
+def tokenizers(monkeypatch):
+    """Sentences and words split by regular expressions if the punkt models of nltk are not installed"""
+    nltk = pytest.importorskip('nltk')
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        monkeypatch.setattr(nltk, 'sent_tokenize', lambda text: re.split(r'(?<=[.!?])\s+(?=[A-Z])', text))
+        monkeypatch.setattr(nltk, 'word_tokenize', lambda sentence: re.findall(r'\w+|[^\w\s]', sentence))
@@ -0,0 +1,104 @@
+import random
+import re
+
+import pytest
+
+pytest.importorskip('mat2vec')
+
+import chemicals as ch
+from pymatgen.core.composition import Composition
+
+SENTENCES = [
+    'MnSi orders below T c =29.6K [11] helimagnetically.',
+    'The Curie temperature of FeGe is 278 K, whereas Cu2OSeO3 orders at 58 K.',
+    'Cu 2 OSeO 3 is a multiferroic insulator with T C = 58 K.',
+    'In (Fe1-xCox)Si the Tc varies between 10 and 50 K depending on x.',
+    'La0.7Sr0.3MnO3 (LSMO) has a Tc of 370 K.',
+    'Fe3Sn2, Mn3Sn and Co3Sn2S2 are kagome magnets.',
+    'For x=0.1, Mn1-xFexSi has T c of 20.5K whereas for x=0.2 it is 10.2K.',
+    'The (Pr0.33 Mn0.67) sample was studied by X-ray diffraction (XRD).',
+    'Pressure of 2 GPa suppresses the order in MnSi, see Ref. [12].',
+    ' Mn. Mn. Mn. MnSi ',
+]
+
+
+def old_find_chemical(text):
+    # find_chemical before find_chemical_spans: the phrases of the scanner, cleaned one by one
+    return [ch.clean_phrase(p) for p, _, _ in ch.scan_phrases(text) if ch.clean_phrase(p) is not None]
+
+
+@pytest.mark.parametrize('text', SENTENCES)
+def test_find_chemical_spans_matches_find_chemical(text):
+    spans = ch.find_chemical_spans(text)
+    assert [c for c, _, _ in spans] == old_find_chemical(text) == ch.find_chemical(text)
+    assert [start for _, start, _ in spans] == sorted(start for _, start, _ in spans)
+    for chemical, start, end in spans:
+        # The span is the chemical as it is written in the text, without the spaces around it
+        assert ch.clean_phrase(text[start:end]) == chemical
+        assert text[start:end] == text[start:end].strip()
+
+
+def test_find_chemical_spans_keeps_the_written_form():
+    text = 'Cu 2 OSeO 3 is a multiferroic insulator with T C = 58 K.'
+    assert [(c, text[s:e]) for c, s, e in ch.find_chemical_spans(text)] == [('Cu2OSeO3', 'Cu 2 OSeO 3')]
+
+
+# The patterns of chemicals.py before the possessive quantifiers
+OLD_TOKEN_PATTERN = re.compile('[ ]?[(]?[A-Z][a-z()]*[ ]?|(?:\\d+[.]?\\d*[)]?|[-+]?[xy])')
+OLD_BRACKET_FOLLOWED_BY_NUMBER = re.compile('[(][A-Za-z0-9.]+[)]\\d')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_possessive_patterns_find_the_old_tokens(seed):
+    rnd = random.Random(seed)
+    for _ in range(1000):
+        text = ''.join(rnd.choice('  ()ABFMa.bex-+y0123') for _ in range(rnd.randint(1, 30)))
+        assert ch.TOKEN_PATTERN.findall(text) == OLD_TOKEN_PATTERN.findall(text)
+        assert ch._BRACKET_FOLLOWED_BY_NUMBER.findall(text) == OLD_BRACKET_FOLLOWED_BY_NUMBER.findall(text)
+
+
+FORMULAE = ['FeGe', 'GeFe', 'Fe2Ge2', 'Fe0.5Ge0.5', 'Fe Ge', 'MnSi', 'Mn0.9Fe0.1Si', 'Mn9FeSi10', 'Cu2OSeO3',
+            'Cu4O2Se2O6', 'Fe3Sn2', 'Co8Zn8Mn4', 'CoZnMn0.5', '(Pr0.33 Mn0.67)', 'PrMn2']
+
+
+def same_composition(a, b):
+    # The comparison before the composition keys: both formulae parsed by pymatgen, as fractions of atoms
+    return Composition(a).fractional_composition.almost_equals(Composition(b).fractional_composition,
+                                                               rtol=0, atol=1e-6)
+
+
+def test_composition_keys_are_equal_for_the_same_composition():
+    for a in FORMULAE:
+        for b in FORMULAE:
+            assert (ch.composition_key(a) == ch.composition_key(b)) == same_composition(a, b), (a, b)
+    assert ch.composition_key('Cu2OSeO3') == (('Cu', 0.285714), ('O', 0.571429), ('Se', 0.142857))
+
+
+@pytest.mark.parametrize('formula', ['', 'GPa', 'the', 'Xx2', None, 12])
+def test_invalid_formulae_have_no_key(formula):
+    assert ch.composition_key(formula) is None
+
+
+def test_formulae_are_parsed_once():
+    ch.parse_composition.cache_clear()
+    ch.composition_key.cache_clear()
+    keys = ch.normalize_many(FORMULAE * 3)
+    assert keys == [ch.composition_key(f) for f in FORMULAE * 3]
+    assert ch.parse_composition.cache_info().misses == len(set(FORMULAE))
+    groups = ch.group_by_composition(FORMULAE + ['GPa'])
+    assert groups[ch.composition_key('FeGe')] == ['FeGe', 'GeFe', 'Fe2Ge2', 'Fe0.5Ge0.5', 'Fe Ge']
+    assert sum(len(g) for g in groups.values()) == len(FORMULAE)
+
+
+def test_materials_compare_by_composition(tmp_path, monkeypatch):
+    # Materials write their folders in the current directory, named by write_chemical (which cannot join the
+    # amounts of dict_repr, as they are floats); only the comparisons are tested here
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ch.Material, 'write_chemical', lambda self: ''.join(sorted(self.dict_repr)))
+    material = ch.Material('Fe2Ge2')
+    assert material.dict_repr == Composition('Fe2Ge2').get_el_amt_dict()
+    assert material.isequal('GeFe') and material.isequal(ch.Material('Fe0.5Ge0.5'))
+    assert not material.isequal('MnSi')
+    assert material == ch.Material('FeGe') and len({material, ch.Material('FeGe')}) == 1
+    with pytest.raises(ValueError):
+        ch.Material('the')
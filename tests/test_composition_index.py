@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip('mat2vec')
+
+import database as dbm
+from composition_index import CompositionIndex
+from pymatgen.core.composition import Composition
+
+COMPOUNDS = ['Mn Si', 'Fe Ge', 'Mn0.95 Fe0.05 Si', 'Mn0.9 Fe0.1 Si', 'Mn0.9 Co0.1 Si', 'Cu2 O Se O3', 'Fe Si',
+             'Co Si', 'Fe3 Sn2', 'Co8 Zn8 Mn4', 'Co10 Zn10', 'Fe Ge', 'Ge Fe', 'GPa', 'the']
+QUERIES = ['MnSi', 'Mn0.97Fe0.03Si', 'FeGe', 'Cu2OSeO3', 'Nd2Fe14B', 'Co9Zn9Mn2', 'Au', 'Fe0.5Co0.5Si']
+
+
+def old_distance(a, b):
+    # The L1 distance between the fractions of atoms of both formulae, computed with pymatgen for each pair
+    fa = Composition(a).fractional_composition.get_el_amt_dict()
+    fb = Composition(b).fractional_composition.get_el_amt_dict()
+    return sum(abs(fa.get(e, 0) - fb.get(e, 0)) for e in set(fa) | set(fb))
+
+
+@pytest.fixture
+def index():
+    return CompositionIndex(COMPOUNDS)
+
+
+def test_invalid_and_repeated_formulae_are_left_out(index):
+    assert index.formulae.tolist() == COMPOUNDS[:11] + ['Ge Fe']
+    assert len(index) == 12
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_distances_are_those_of_each_pair(index, query):
+    np.testing.assert_allclose(index.distances(query), [old_distance(query, c) for c in index.formulae], atol=1e-5)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_nearest_and_within_are_those_of_a_full_sort(index, query):
+    expected = sorted(((c, old_distance(query, c)) for c in index.formulae), key=lambda cd: round(cd[1], 5))
+    for k in [1, 3, len(index), len(index) + 5]:
+        nearest = index.nearest(query, k=k)
+        assert [round(d, 5) for _, d in nearest] == [round(d, 5) for _, d in expected[:k]]
+        assert all(abs(old_distance(query, c) - d) < 1e-5 for c, d in nearest)
+    for radius in [0, 0.05, 0.2, 1]:
+        assert sorted(c for c, _ in index.within(query, radius)) == \
+            sorted(c for c, d in expected if d <= radius + 1e-9)
+
+
+def test_random_compositions(index):
+    rnd = random.Random(0)
+    for _ in range(100):
+        elements = rnd.sample(['Mn', 'Fe', 'Co', 'Si', 'Ge', 'Zn', 'Cu', 'O'], rnd.randint(1, 4))
+        query = ''.join(e + str(rnd.randint(1, 20)) for e in elements)
+        np.testing.assert_allclose(index.distances(query), [old_distance(query, c) for c in index.formulae],
+                                   atol=1e-5)
+
+
+def test_match(index):
+    assert index.match(['MnSi', 'Mn0.97Fe0.03Si', 'Nd2Fe14B', 'the', 'MnSi'], max_distance=0.05) == \
+        [('Mn Si', 0.0), ('Mn0.95 Fe0.05 Si', 0.02), None, None, ('Mn Si', 0.0)]
+    assert CompositionIndex([]).match(['MnSi']) == [None]
+    with pytest.raises(ValueError):
+        index.nearest('the')
+
+
+def test_index_of_the_database(materials):
+    database = dbm.Database_reader(materials)
+    assert database.composition_index is database.composition_index
+    assert database.composition_index.within('Mn0.95Fe0.05Si', 0.05) == [('Mn Si', 0.05), ('Mn0.9 Fe0.1 Si', 0.05)]
@@ -0,0 +1,163 @@
+import csv
+import json
+import os
+
+import pytest
+
+pytest.importorskip('mat2vec')
+pytest.importorskip('tqdm')
+
+import recognizers as rec
+from doc_processing import corpus as cp
+
+RECORDS = os.path.join('Data', 'Curie Temperature', 'Curie_temperature_records.csv')
+
+
+def write_document(directory, name, doi, text, title='Magnetic order'):
+    folder = os.path.join(str(directory), cp.ELSEVIER_FOLDER, 'MnSi Curie')
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, name + '.json'), 'w', encoding='utf-8') as f:
+        json.dump({'originalText': text, 'coredata': {'dc:title': title, 'prism:doi': doi}}, f)
+
+
+def read_records(directory):
+    with open(os.path.join(str(directory), RECORDS), newline='') as f:
+        return sorted((row['DOI'], row['Compound'], row['Extracted Temperature (K)']) for row in csv.DictReader(f))
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch, tokenizers):
+    # The records are written to Data/... in the current directory
+    monkeypatch.chdir(tmp_path)
+    write_document(tmp_path, 'a', '10.1/a', 'The Curie temperature of MnSi is Tc = 29.5 K.')
+    write_document(tmp_path, 'b', '10.1/b', 'The Curie temperature of FeGe is Tc = 278 K.')
+    return cp.Corpus(str(tmp_path), processes=1)
+
+
+class Configured(rec.RegexRecognizer):
+    def __init__(self, strict):
+        self.strict = strict
+
+    def config(self):
+        return {'name': self.name, 'strict': self.strict}
+
+
+def test_fingerprint_is_stable_for_objects():
+    first = cp.fingerprint(['curie_temperature'], {'recognizer': rec.RegexRecognizer()})
+    assert cp.fingerprint(['curie_temperature'], {'recognizer': rec.RegexRecognizer()}) == first
+    assert cp.fingerprint(['curie_temperature'], {'recognizer': 'regex'}) != first
+    assert cp.fingerprint(['curie_temperature'], {'recognizer': Configured(True)}) == \
+        cp.fingerprint(['curie_temperature'], {'recognizer': Configured(True)})
+    assert cp.fingerprint(['curie_temperature'], {'recognizer': Configured(True)}) != \
+        cp.fingerprint(['curie_temperature'], {'recognizer': Configured(False)})
+    with pytest.raises(ValueError):
+        cp.fingerprint(['curie_temperature'], {'recognizer': object()})
+
+
+def test_modified_document_replaces_its_records(corpus, tmp_path):
+    corpus.run(['curie_temperature'], progress=False)
+    assert read_records(tmp_path) == [('10.1/a', 'MnSi', '29.5'), ('10.1/b', 'FeGe', '278.0')]
+
+    # Same files at every run: b is unchanged and keeps its records, a is extracted again
+    write_document(tmp_path, 'a', '10.1/a', 'The Curie temperature of MnSi is Tc = 30 K.')
+    corpus.run(['curie_temperature'], progress=False)
+    assert corpus.unchanged == [os.path.join(cp.ELSEVIER_FOLDER, 'MnSi Curie', 'b.json')]
+    assert read_records(tmp_path) == [('10.1/a', 'MnSi', '30.0'), ('10.1/b', 'FeGe', '278.0')]
+    assert os.listdir(os.path.dirname(os.path.join(str(tmp_path), RECORDS))) == ['Curie_temperature_records.csv']
+
+
+def test_checkpoint_of_another_extraction_is_discarded(corpus, tmp_path):
+    document = os.path.join(cp.ELSEVIER_FOLDER, 'MnSi Curie', 'a.json')
+    with open(corpus.checkpoint, 'w', encoding='utf-8') as f:
+        f.write(cp.CHECKPOINT_HEADER + 'another extraction\n' + document + '\n')
+    records = corpus.run(['curie_temperature'], progress=False)
+    assert sorted(r[0] for r in records['curie_temperature']) == ['FeGe', 'MnSi']
+
+
+def test_checkpoint_of_the_same_extraction_is_resumed(corpus, tmp_path):
+    document = os.path.join(cp.ELSEVIER_FOLDER, 'MnSi Curie', 'a.json')
+    config = cp.fingerprint(['curie_temperature'], {})
+    with open(corpus.checkpoint, 'w', encoding='utf-8') as f:
+        f.write(cp.CHECKPOINT_HEADER + config + '\n' + document + '\n')
+    records = corpus.run(['curie_temperature'], progress=False)
+    assert [r[0] for r in records['curie_temperature']] == ['FeGe']
+    # The run is complete
+    assert not os.path.exists(corpus.checkpoint)
+
+
+TEXTS = {
+    'c': 'The Curie temperature of FeGe is 278 K, whereas Cu2OSeO3 orders at 58 K.',
+    'd': 'MnSi orders below T c =29.6K [11] helimagnetically. The Tc of MnSi is 29 K.',
+    'e': 'Tc=29K for MnSi; TN=40 K for Cr.',
+}
+
+
+def old_records(directory):
+    # The documents extracted one by one, the way the scripts did before the corpus runner
+    from doc_processing.elsevier_doc import ElsevierDoc
+    records = []
+    for _, _, path, _ in cp.Corpus(str(directory)).documents():
+        with open(path, encoding='utf-8') as f:
+            records.extend(ElsevierDoc(json.load(f)).get_curie_temperatures(write='n'))
+    return records
+
+
+def comparable(records):
+    # The access date and the arrays are left out
+    return sorted((r[0], float(r[1]), r[2], r[3], r[4]) for r in records)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_records_are_those_of_each_document(corpus, tmp_path, processes):
+    for name, text in TEXTS.items():
+        write_document(tmp_path, name, '10.1/' + name, text)
+    corpus.processes = processes
+    corpus.chunksize = 2
+    records = corpus.run(['curie_temperature'], output_format=None, progress=False)
+    assert comparable(records['curie_temperature']) == comparable(old_records(tmp_path))
+    assert len(records['curie_temperature']) == 8
+    assert corpus.errors == {}
+
+
+def test_documents_with_errors_are_not_checkpointed(corpus, tmp_path):
+    folder = os.path.join(str(tmp_path), cp.ELSEVIER_FOLDER, 'MnSi Curie')
+    with open(os.path.join(folder, 'broken.json'), 'w', encoding='utf-8') as f:
+        f.write('{')
+    records = corpus.run(['curie_temperature'], progress=False)
+    assert sorted(r[0] for r in records['curie_temperature']) == ['FeGe', 'MnSi']
+    assert list(corpus.errors) == [os.path.join(cp.ELSEVIER_FOLDER, 'MnSi Curie', 'broken.json')]
+    # The checkpoint is kept for the next run, which only processes the broken document again
+    assert corpus.completed() == {os.path.join(cp.ELSEVIER_FOLDER, 'MnSi Curie', name + '.json')
+                                  for name in ['a', 'b']}
+    os.remove(os.path.join(folder, 'broken.json'))
+    assert corpus.run(['curie_temperature'], progress=False) == {'curie_temperature': []}
+    assert not os.path.exists(corpus.checkpoint)
+    assert read_records(tmp_path) == [('10.1/a', 'MnSi', '29.5'), ('10.1/b', 'FeGe', '278.0')]
+
+
+def test_only_new_documents_are_extracted(corpus, tmp_path):
+    corpus.run(['curie_temperature'], progress=False)
+    write_document(tmp_path, 'c', '10.1/c', 'The Tc of Fe3Sn2 is 640 K.')
+    records = corpus.run(['curie_temperature'], progress=False)
+    assert [(r[0], r[4]) for r in records['curie_temperature']] == [('Fe3Sn2', '10.1/c')]
+    assert len(corpus.unchanged) == 2
+    assert read_records(tmp_path) == [('10.1/a', 'MnSi', '29.5'), ('10.1/b', 'FeGe', '278.0'),
+                                      ('10.1/c', 'Fe3Sn2', '640.0')]
+
+
+def test_other_keywords_extract_every_document_again(corpus, tmp_path):
+    corpus.run(['curie_temperature'], progress=False)
+    records = corpus.run(['curie_temperature'], keywords={'curie_temperature': ['Curie temperature']},
+                         progress=False)
+    assert len(records['curie_temperature']) == 2
+    assert corpus.unchanged == []
+    assert read_records(tmp_path) == [('10.1/a', 'MnSi', '29.5'), ('10.1/b', 'FeGe', '278.0')]
+
+
+def test_documents_without_doi_are_replaced_by_title(corpus, tmp_path):
+    write_document(tmp_path, 'c', '', 'The Tc of Fe3Sn2 is 640 K.', title='No DOI')
+    corpus.run(['curie_temperature'], progress=False)
+    write_document(tmp_path, 'c', '', 'The Tc of Fe3Sn2 is 650 K.', title='No DOI')
+    corpus.run(['curie_temperature'], progress=False)
+    assert read_records(tmp_path) == [('', 'Fe3Sn2', '650.0'), ('10.1/a', 'MnSi', '29.5'),
+                                      ('10.1/b', 'FeGe', '278.0')]
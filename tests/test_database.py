@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import database as dbm
+
+UTILITY = os.path.dirname(os.path.abspath(dbm.__file__))
+DOC_PROCESSING = os.path.join(os.path.dirname(UTILITY), 'doc_processing')
+
+
+def test_cache_keeps_the_index(materials):
+    pytest.importorskip('pyarrow')
+    index_col = 'Structural measurement temperature/K'
+    first = dbm.Database_reader(materials, cache='y', index_col=index_col)
+    assert os.path.exists(materials + dbm.CACHE_EXTENSION)
+    second = dbm.Database_reader(materials, cache='y', index_col=index_col)
+    pd.testing.assert_frame_equal(first.get, second.get)
+    assert second.find_articles(['Mn Si']) == {'Mn Si': [[300.0, 'Helical order in Mn Si', 'b']]}
+
+
+def test_cache_is_the_same_as_the_csv(materials):
+    pytest.importorskip('pyarrow')
+    dbm.Database_reader(materials, cache='y')
+    pd.testing.assert_frame_equal(dbm.Database_reader(materials).get, dbm.Database_reader(materials, cache='y').get)
+
+
+def test_cache_is_skipped_for_columns_of_mixed_types(materials):
+    pytest.importorskip('pyarrow')
+    converters = {'Reference': lambda v: 1 if v == 'a' else v}
+    database = dbm.Database_reader(materials, cache='y', converters=converters)
+    assert not os.path.exists(materials + dbm.CACHE_EXTENSION)
+    assert database.get['Reference'].tolist() == [1, 'b', 'c', 'd', 'e', 'f', 'g']
+
+
+def test_reader_does_not_import_the_natural_language_processing_modules(materials):
+    # In a new interpreter, since the other tests may have imported them already. contain reads lexicon.py only
+    script = ('import sys, database; database.Database_reader(sys.argv[1]).contain([\'Mn\']); '
+              'print(sorted({\'chemicals\', \'mat2vec\', \'pymatgen\'} & set(sys.modules)))')
+    output = subprocess.run([sys.executable, '-c', script, materials], cwd=UTILITY, check=True,
+                            capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=UTILITY + os.pathsep + DOC_PROCESSING))
+    assert output.stdout.strip() == '[]'
+
+
+def test_lookups_accept_generators(materials):
+    database = dbm.Database_reader(materials)
+    compounds = ['Fe Ge', 'Zn S', 'Cu2 O Se O3']
+    assert database.find_articles(c for c in compounds) == database.find_articles(compounds)
+    assert database.get_spacegroup(c for c in compounds) == \
+        {'Fe Ge': ('P 21 3', 198), 'Zn S': ('F -4 3 m', 216), 'Cu2 O Se O3': dbm.MISSING_SPACEGROUP}
+    assert database.find_articles(iter(['Mn Si'])) == {'Mn Si': [[1, 'Helical order in Mn Si', 'b']]}
+
+
+# The lookups of the compounds by scanning the database, as they were before the compound row index
+def baseline_find_articles(database, compounds):
+    frame = database.get
+    return {c: [[i, frame['Structural Paper Title'][i], frame['Reference'][i]]
+                for i in frame.index[frame['Compound'] == c].tolist()] for c in compounds}
+
+
+def baseline_get_spacegroup(database, compounds):
+    frame = database.get
+    return {c: (frame[frame.Compound == c]['Space Group'].iloc[0], frame[frame.Compound == c]['SG #'].iloc[0])
+            for c in compounds}
+
+
+@pytest.mark.parametrize('index_col', [None, 0])
+def test_lookups_as_baseline(materials, index_col):
+    database = dbm.Database_reader(materials, index_col=index_col)
+    compounds = ['Fe Ge', 'Mn Si', '(Pr0.33 Mn0.67)', 'Zn S', 'Sn Se', 'Fe Ge']
+    assert database.find_articles(compounds + ['Cu2 O Se O3']) == \
+        baseline_find_articles(database, compounds + ['Cu2 O Se O3'])
+    assert database.get_spacegroup(compounds) == baseline_get_spacegroup(database, compounds)
+
+
+SIZE_COLUMNS = ['Compound', 'Original Skyrmion Size', 'Original Unit', 'Skyrmion Size (nm)', 'Sentence']
+SIZE_RECORDS = [['Mn Si', np.array([180.]), 'Å', np.array([18.]), 'a'],
+                ['MnSi', np.array([10., 20.]), 'nm', np.array([10., 20.]), 'b'],
+                ['FeGe', np.array([70.]), 'nm', np.array([70.]), 'c'],
+                ['Nd2Fe14B', np.array([100.]), 'nm', np.array([100.]), 'd']]
+
+
+def statistics(joined, column):
+    return {c: tuple(row) for c, row in joined.groupby('Compound', sort=True)[
+        [column + ' count', column + ' mean', column + ' min', column + ' max']].first().iterrows()}
+
+
+def test_join_temperature_records(materials):
+    pytest.importorskip('mat2vec')
+    records = pd.DataFrame([['FeGe', 278, 'a'], ['Fe Ge', '280', 'b'], ['SiMn', 'n/a', 'c'], ['MnSi', 29.5, 'd']],
+                           columns=['Compound', 'Extracted Temperature (K)', 'Sentence'])
+    joined = dbm.Database_reader(materials).join_records(records)
+    assert joined['Compound'].tolist() == ['Fe Ge', 'Mn Si', 'Fe Ge']
+    assert statistics(joined, 'Extracted Temperature (K)') == {'Fe Ge': (2, 279., 278., 280.),
+                                                               'Mn Si': (1, 29.5, 29.5, 29.5)}
+
+
+def test_join_size_records(materials, tmp_path):
+    pytest.importorskip('mat2vec')
+    import sinks
+
+    database = dbm.Database_reader(materials)
+    joined = database.join_records(SIZE_RECORDS, columns=SIZE_COLUMNS)
+    # The value column is the size in nm, and both ends of a range are counted
+    assert statistics(joined, 'Skyrmion Size (nm)') == {'Fe Ge': (1, 70., 70., 70.), 'Mn Si': (3, 16., 10., 20.)}
+
+    # The same, once written to a csv file
+    path = str(tmp_path / 'skyrmion_size_records.csv')
+    with sinks.open_sink(path, SIZE_COLUMNS) as sink:
+        sink.write_rows(SIZE_RECORDS)
+    from_csv = database.join_records(pd.read_csv(path))
+    assert statistics(from_csv, 'Skyrmion Size (nm)') == statistics(joined, 'Skyrmion Size (nm)')
+
+
+def test_join_records_needs_a_value_column(materials):
+    records = pd.DataFrame([['MnSi', 18.]], columns=['Compound', 'Size'])
+    with pytest.raises(ValueError):
+        dbm.Database_reader(materials).join_records(records)
+
+
+@pytest.mark.parametrize('value, expected', [(29.5, [29.5]), ('29.5', [29.5]), (np.array([18.]), [18.]),
+                                             (np.array([10., 20.]), [10., 20.]), ('[10. 20.]', [10., 20.]),
+                                             ('[10, 20]', [10., 20.]), ('n/a', []), (None, []), (np.nan, [])])
+def test_record_values(value, expected):
+    assert dbm.record_values(value) == expected
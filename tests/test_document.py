@@ -0,0 +1,293 @@
+import random
+import re
+
+import pytest
+
+pytest.importorskip('mat2vec')
+pytest.importorskip('nltk')
+
+import nltk
+
+import chemicals as ch
+import document
+import skyrmion_size as sks
+import temperature as tmp
+
+
+class RecordingSink:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FakeDoc(document.Doc):
+    def __init__(self, text):
+        self.text = text
+
+    def is_elsevier(self):
+        return False
+
+
+def test_extract_all_closes_its_sinks_when_extraction_fails(monkeypatch):
+    opened = []
+
+    def open_sink(prop, filename=None, rewrite='n', output_format='csv'):
+        opened.append(RecordingSink())
+        return opened[-1]
+
+    def temperature_records(self, sentence, keywords, default=None):
+        raise RuntimeError('extraction failed')
+
+    doc = FakeDoc('MnSi orders below Tc = 29.5 K.')
+    monkeypatch.setattr(document.Doc, 'open_sink', staticmethod(open_sink))
+    monkeypatch.setattr(document.Doc, 'find_sentences_with_keywords',
+                        lambda self, keywords, **kwargs: [('MnSi orders below Tc = 29.5 K.', ['Tc'])])
+    monkeypatch.setattr(document.Doc, 'temperature_records', temperature_records)
+
+    with pytest.raises(RuntimeError):
+        doc.extract_all(['curie_temperature', 'neel_temperature'], write='y')
+    assert len(opened) == 2
+    assert all(sink.closed for sink in opened)
+
+
+def old_pairs(quantity_spans, chemical_spans):
+    # Each quantity with the closest chemical, comparing it with all the chemicals (the earlier one if tied)
+    def distance(c, q):
+        return max(q[1] - c[2], c[1] - q[2], 0)
+    return [(q, min(chemical_spans, key=lambda c: (distance(c, q), c[1]))[0] if chemical_spans else None)
+            for q in quantity_spans]
+
+
+def random_spans(rnd, n):
+    spans, position = [], 0
+    for i in range(n):
+        position += rnd.randint(1, 20)
+        length = rnd.randint(1, 10)
+        spans.append((str(i), position, position + length))
+        position += length
+    return spans
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_pair_by_offset_pairs_the_closest_chemical(seed):
+    rnd = random.Random(seed)
+    spans = random_spans(rnd, rnd.randint(0, 12))
+    rnd.shuffle(spans)
+    quantities = sorted(spans[:len(spans) // 2], key=lambda s: s[1])
+    chemicals = sorted(spans[len(spans) // 2:], key=lambda s: s[1])
+    assert document.pair_by_offset(quantities, chemicals) == old_pairs(quantities, chemicals)
+
+
+def old_temperature_records(doc, sentence, keywords):
+    # get_curie_temperatures before the chemicals were paired by offset: the sentence was split after each
+    # temperature and each fragment was given the chemical mentioned most in it
+    chemicals = ch.find_chemical(sentence)
+    temperatures = tmp.get_number_from_list(tmp.find_temperature(sentence))
+    if len(chemicals) == len(temperatures):
+        return [[c, t] for c, t in zip(chemicals, temperatures)]
+    result = []
+    for fragment in re.findall('.*?[K]{1}\\W', sentence):
+        if doc.has_keywords(sentence=fragment, keywords=keywords):
+            found = ch.find_chemical(fragment)
+            for t in tmp.get_number_from_list(tmp.find_temperature(fragment, 'K')):
+                result.append([max(set(found), key=found.count) if found else None, t])
+    return result
+
+
+@pytest.mark.parametrize('sentence', [
+    'The Curie temperature of FeGe is 278 K, whereas Cu2OSeO3 orders at 58 K.',
+    'MnSi has Tc = 29 K, while MnSi on FeGe has MnSi like Tc = 30 K.',
+    'The Tc of MnSi is 29 K, the Tc of FeGe is 278 K and for Cu2OSeO3 and Cu2OSeO3 films the Tc is 58 K.',
+    'Tc=29K for MnSi; TN=40 K for Cr.',
+    'For x=0.1, Mn1-xFexSi has T c of 20.5K whereas for x=0.2 it is 10.2K.',
+])
+def test_temperature_records_match_the_fragments(sentence):
+    doc = FakeDoc(sentence)
+    keywords = ['Tc', 'T c', 'TN']
+    assert doc.temperature_records(sentence, keywords) == old_temperature_records(doc, sentence, keywords)
+
+
+SENTENCES = [
+    'MnSi orders below T c =29.6K [11] helimagnetically.',
+    'The Curie temperature of FeGe is 278 K, whereas Cu2OSeO3 orders at 58 K.',
+    'The helical period of MnSi is 18 nm and of FeGe is 70 nm.',
+    'Si addition decreases Tc by 17K) to that of Tc from 320K for x=0 to 318K for x=1 of Mn4FeGe3-x Si x in Ref.',
+    'The samples (Mn,Fe)Si were annealed at 1000°C for 24 h in Ar.',
+    'Fe3Sn2, Mn3Sn and Co3Sn2S2 are kagome magnets.',
+]
+
+
+def test_cached_recognition_matches_the_functions():
+    doc = FakeDoc(' '.join(SENTENCES))
+    for _ in range(2):
+        for sentence in SENTENCES:
+            assert doc.find_chemical(sentence) == ch.find_chemical(sentence)
+            assert doc.find_chemical(sentence, sorted=True) == ch.find_chemical(sentence, sorted_dict=True)
+            assert doc.find_temperatures(sentence).tolist() == \
+                tmp.get_number_from_list(tmp.find_temperature(sentence)).tolist()
+            assert doc.find_sizes(sentence) == sks.find_size(sentence)
+    # Each sentence is recognised once for each kind, the second pass reads the cache
+    misses = doc.cache_misses
+    assert misses == 4 * len(SENTENCES)
+    assert doc.cache_hits > misses
+    doc.find_chemical(SENTENCES[0])
+    assert doc.cache_misses == misses
+
+
+def test_cache_keeps_the_most_recently_used_results(monkeypatch):
+    monkeypatch.setattr(document, 'SENTENCE_CACHE_SIZE', 2)
+    doc = FakeDoc(' '.join(SENTENCES))
+    for sentence in SENTENCES[:3]:
+        doc.find_chemical(sentence)
+    assert doc.cache_misses == 3
+    assert len(doc.sentence_cache) == 2
+    doc.find_chemical(SENTENCES[2])
+    assert doc.cache_misses == 3
+    doc.find_chemical(SENTENCES[0])
+    assert doc.cache_misses == 4
+
+
+def test_new_text_clears_the_cache():
+    doc = FakeDoc(None)
+    doc.add_text(SENTENCES[0])
+    doc.find_chemical()
+    doc.add_text(SENTENCES[0])
+    assert len(doc.sentence_cache) == 1
+    doc.add_text(SENTENCES[1])
+    assert len(doc.sentence_cache) == 0 and doc.cache_misses == 0
+    assert doc.find_chemical() == ch.find_chemical(SENTENCES[1])
+
+
+def test_sentences_are_segmented_once(tokenizers, monkeypatch):
+    text = ' '.join(SENTENCES)
+    expected = nltk.sent_tokenize(text)
+    calls = []
+    sent_tokenize = nltk.sent_tokenize
+    monkeypatch.setattr(nltk, 'sent_tokenize', lambda t: calls.append(t) or sent_tokenize(t))
+
+    doc = FakeDoc(text)
+    table = doc.get_sentences()
+    assert [sentence for sentence, _, _ in table] == expected
+    assert all(text[start:end] == sentence for sentence, start, end in table)
+    doc.get_sentences()
+    doc.find_sentences(['Tc', 'T c'])
+    doc.ie_preprocess(pos_tagging='n')
+    assert len(calls) == 1
+
+    start = table[1][1]
+    assert doc.sentence_at(start + 3) == table[1]
+    assert doc.sentence_at(len(text) + 1) is None
+
+
+def test_ie_preprocess_matches_nltk(tokenizers):
+    # ie_preprocess before the sentences and tokens were cached
+    text = ' '.join(SENTENCES)
+    doc = FakeDoc(text)
+    assert doc.ie_preprocess(tokenization='n') == nltk.sent_tokenize(text)
+    assert doc.ie_preprocess(pos_tagging='n') == [nltk.word_tokenize(s) for s in nltk.sent_tokenize(text)]
+    assert doc.ie_preprocess(pos_tagging='n') == [nltk.word_tokenize(s) for s in nltk.sent_tokenize(text)]
+
+
+def old_find_sentences(doc, keywords, material=None, quantitative=True, material_in_sentence=True):
+    # find_sentences before the keywords were compiled: one pass over the sentences for each keyword
+    result = []
+    for k in keywords:
+        keys = re.split('[ ]?AND[ ]?', k)
+        if material is not None:
+            keys.append(material)
+        for sent in nltk.sent_tokenize(doc.text):
+            if len(sent) < 1500 and all(word in sent for word in keys) and \
+                    (not quantitative or re.search('\\d', sent)) and \
+                    (not material_in_sentence or ch.find_chemical(sent)):
+                result.append(sent)
+    return result
+
+
+@pytest.mark.parametrize('options', [{}, {'material': 'MnSi'}, {'quantitative': False},
+                                     {'material_in_sentence': False}])
+def test_find_sentences_matches_one_pass_per_keyword(tokenizers, options):
+    text = ' '.join(SENTENCES + ['Tc and the skyrmion size are unknown.', 'Their size AND Tc are given in nm.'])
+    doc = FakeDoc(text)
+    keywords = ['Tc', 'T c', 'skyrmion AND size', 'helical period', 'kagome']
+    old = old_find_sentences(doc, keywords, **options)
+    # Each sentence is now returned once, in the order of the text
+    expected = [s for s in nltk.sent_tokenize(text) if s in old]
+    assert doc.find_sentences(keywords, **options) == expected
+    assert len(expected) > 1
+
+
+TEXT = ' '.join(SENTENCES + [
+    'The skyrmion size in MnSi is 18 nm and in Fe0.5Co0.5Si it is 90 nm.',
+    'The helical period of FeGe films is 70 nm.',
+    'The Néel temperature TN = 525 K of BiFeO3 was confirmed.',
+    'Tc=29K for MnSi; TN=40 K for Cr.',
+])
+
+
+def old_skyrmion_size(doc, material):
+    # get_skyrmion_size before the extraction of all the properties was fused
+    result = []
+    for sent in old_find_sentences(doc, document.PROPERTIES['skyrmion_size']['keywords'], material=material):
+        if any(word in sent for word in ['nanostruct', 'wire', 'film', 'quantum dot', 'nanoparticle',
+                                         'grain size', 'particle size', 'cell size', 'nanodisk']):
+            continue
+        chemicals = ch.find_chemical(sent)
+        for size in sks.find_size(sent):
+            compound = max(set(chemicals), key=chemicals.count) if chemicals else material
+            result.append([compound, sks.get_number(size).tolist(), sks.get_unit(size),
+                           sks.convert_to_nm(size).tolist(), sent])
+    return result
+
+
+def old_curie_temperatures(doc):
+    # get_curie_temperatures before the fusion (the temperatures of a sentence already paired by offset)
+    result = []
+    keywords = document.PROPERTIES['curie_temperature']['keywords']
+    for sent in old_find_sentences(doc, keywords):
+        if any(word in sent for word in ['nanostruct', 'wire', 'film', 'quantum dot', 'substrate']):
+            continue
+        result.extend(row + [sent] for row in doc.temperature_records(sent, keywords))
+    return result
+
+
+def in_text_order(records):
+    # The old methods returned the records keyword by keyword, those of a sentence once for each of its keywords
+    result = []
+    for r in records:
+        if r not in result:
+            result.append(r)
+    sentences = nltk.sent_tokenize(TEXT)
+    return sorted(result, key=lambda r: sentences.index(r[-1]))
+
+
+def test_extract_all_matches_each_property_on_its_own(tokenizers):
+    doc = FakeDoc(TEXT)
+    records = doc.extract_all()
+    assert list(records) == list(document.PROPERTIES)
+    for p in document.PROPERTIES:
+        assert records[p] == FakeDoc(TEXT).extract_all([p])[p]
+        assert records[p]
+    assert doc.get_curie_temperatures(write='n') == records['curie_temperature']
+    assert doc.get_skyrmion_size(write='n') == records['skyrmion_size']
+
+
+def test_extract_all_matches_the_old_extractors(tokenizers):
+    doc = FakeDoc(TEXT)
+    records = doc.extract_all(['curie_temperature', 'skyrmion_size'])
+    assert [[r[0], float(r[1]), r[2]] for r in records['curie_temperature']] == \
+        [[c, float(t), s] for c, t, s in in_text_order(old_curie_temperatures(doc))]
+    # The material is the chemical mentioned most in the text
+    assert [[r[0], r[1].tolist(), r[2], r[3].tolist(), r[4]] for r in records['skyrmion_size']] == \
+        in_text_order(old_skyrmion_size(doc, 'MnSi'))
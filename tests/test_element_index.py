@@ -0,0 +1,63 @@
+import itertools
+import re
+
+import pytest
+
+from element_index import ElementIndex
+
+COMPOUNDS = ['Fe Ge', 'Mn Si', 'Zn S', 'Mn Fe (P0.63 Si0.26 Ge0.11)', 'Cu2 O Se O3', 'Sn Se', 'Co S2', 'Os Si',
+             '(Fe1-x Cox) Si', 'Mn Si']
+
+
+def test_element_is_not_found_in_a_longer_symbol():
+    index = ElementIndex(COMPOUNDS)
+    assert index.contain(['S']) == ['Zn S', 'Co S2']
+    assert index.contain(['O']) == ['Cu2 O Se O3']
+    assert index.contain(['Si']) == ['Mn Si', 'Mn Fe (P0.63 Si0.26 Ge0.11)', 'Os Si', '(Fe1-x Cox) Si']
+    assert index.contain(['Sn']) == ['Sn Se']
+
+
+def test_and_or():
+    index = ElementIndex(COMPOUNDS)
+    assert index.contain(['Fe', 'Ge', 'Si']) == ['Mn Fe (P0.63 Si0.26 Ge0.11)']
+    assert index.contain(['Fe', 'Si'], 'and') == ['Mn Fe (P0.63 Si0.26 Ge0.11)', '(Fe1-x Cox) Si']
+    assert index.contain(['Zn', 'Sn'], 'or') == ['Zn S', 'Sn Se']
+    assert index.contain(['Au'], 'or') == []
+    assert index.contain([], 'and') == index.compounds.tolist()
+    assert index.contain([], 'or') == []
+
+
+def test_with_count():
+    index = ElementIndex(COMPOUNDS)
+    assert index.with_count(2) == ['Fe Ge', 'Mn Si', 'Zn S', 'Sn Se', 'Co S2', 'Os Si']
+    assert index.with_count(3) == ['Cu2 O Se O3', '(Fe1-x Cox) Si']
+    assert index.with_count(5) == ['Mn Fe (P0.63 Si0.26 Ge0.11)']
+    assert index.with_count(7) == []
+
+
+def test_errors():
+    index = ElementIndex(COMPOUNDS)
+    with pytest.raises(ValueError):
+        index.contain(['Xx'])
+    with pytest.raises(ValueError):
+        index.contain(['Fe'], relation='xor')
+
+
+def test_same_as_scanning_the_compounds():
+    # More than 64 compounds, so that the bitsets have several words
+    elements = ['Mn', 'Fe', 'Co', 'Si', 'S', 'Ge', 'O', 'Sn']
+    compounds = [' '.join(c) for n in [1, 2, 3] for c in itertools.permutations(elements, n)]
+    compounds.append(float('nan'))
+    index = ElementIndex(compounds)
+    assert len(index) == len(compounds)
+
+    def scan(query, relation):
+        found = [c for c in compounds if type(c) == str and
+                 (all if relation == 'and' else any)(q in re.findall('[A-Z][a-z]?', c) for q in query)]
+        return found
+
+    for query in [['S'], ['Si', 'S'], ['Mn', 'Fe', 'O'], ['Sn', 'Ge']]:
+        for relation in ['and', 'or']:
+            assert index.contain(query, relation) == scan(query, relation)
+    for number in [1, 2, 3]:
+        assert index.with_count(number) == [c for c in compounds if type(c) == str and len(c.split()) == number]
@@ -0,0 +1,79 @@
+import collections
+
+import numpy as np
+import pytest
+
+pytest.importorskip('mat2vec')
+
+import lexicon as lex
+import quantity as qty
+from doc_processing.feature_cache import FeatureCache
+
+
+@pytest.fixture
+def registries(monkeypatch):
+    # Restored after each test, since the registries are global
+    monkeypatch.setattr(lex, 'UNIT_SET', lex.UNIT_SET)
+    monkeypatch.setattr(lex, 'NOT_CHEMICAL_SET', lex.NOT_CHEMICAL_SET)
+    monkeypatch.setattr(qty, 'UNITS', collections.OrderedDict(qty.UNITS))
+
+
+def test_path_depends_on_the_text(tmp_path):
+    cache = FeatureCache(str(tmp_path))
+    assert cache.path('Mn Si') == cache.path('Mn Si')
+    assert cache.path('Mn Si') != cache.path('Fe Ge')
+
+
+@pytest.mark.parametrize('register', [lambda: lex.register_exclusions(['LSMO']),
+                                      lambda: lex.register_units(['mSv']),
+                                      lambda: qty.register_unit('mm', 'length', 'nm', scale=1000000)])
+def test_path_depends_on_the_registries(tmp_path, registries, register):
+    cache = FeatureCache(str(tmp_path))
+    before = cache.path('LSMO films of 10 mm')
+    register()
+    assert cache.path('LSMO films of 10 mm') != before
+
+
+TEXT = ' '.join([
+    'MnSi orders below T c =29.6K [11] helimagnetically.',
+    'The Curie temperature of FeGe is 278 K, whereas Cu2OSeO3 orders at 58 K.',
+    'In (Fe1-xCox)Si the Tc varies between 10 and 50 K depending on x.',
+    'The Néel temperature TN = 525 K of BiFeO3 was confirmed.',
+    'The helical period of MnSi is 18 nm and of FeGe is 70 nm.',
+    'The skyrmion size in MnSi is 18 nm and in Fe0.5Co0.5Si it is 90 nm.',
+    'We measured GdFeCo films on Si substrates at 5 K and 300 K.',
+    'For x=0.1, Mn1-xFexSi has T c of 20.5K whereas for x=0.2 it is 10.2K.',
+    'Tc=29K for MnSi; TN=40 K for Cr.',
+    'No temperature is given for Nd2Fe14B here.',
+])
+
+
+def make_doc():
+    from doc_processing.elsevier_doc import ElsevierDoc
+    return ElsevierDoc({'originalText': TEXT, 'coredata': {'dc:title': 'Helimagnets', 'prism:doi': '10.1/a'}})
+
+
+def test_extract_all_is_the_same_with_the_cache(tmp_path, tokenizers):
+    expected = make_doc().extract_all(write='n')
+    assert any(expected.values())
+
+    cache = FeatureCache(str(tmp_path))
+    cold, warm = make_doc(), make_doc()
+    cache.attach(cold)
+    features = cache.attach(warm)
+    # Read from the files written for the first document
+    assert isinstance(features.spans, np.memmap)
+    assert cold.extract_all(write='n') == expected
+    assert warm.extract_all(write='n') == expected
+
+
+def test_features_are_those_of_the_document(tmp_path, tokenizers):
+    doc = make_doc()
+    features = FeatureCache(str(tmp_path)).attach(make_doc())
+    assert features.sentences() == doc.get_sentences()
+    for sentence, _, _ in doc.get_sentences():
+        assert features.get('chemicals', sentence) == doc.find_chemical_spans(sentence, recognizer='regex')
+        assert features.get('temperature_spans', sentence) == doc.find_temperature_spans(sentence)
+        assert features.get('size_spans', sentence) == doc.find_size_spans(sentence)
+    assert features.get('chemicals', TEXT) == doc.find_chemical_spans(TEXT, recognizer='regex')
+    assert features.get('chemicals', 'A sentence of another document.') is None
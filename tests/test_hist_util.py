@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('mat2vec')
+
+import hist_util as hu
+
+
+# The list versions of remove_single_mentions and remove_outliers, that the numpy versions should agree with
+def baseline_remove_single_mentions(alist, bins='auto'):
+    hist, bin_edges = np.histogram(alist, bins=bins)
+    if len(alist) == 1:
+        return alist
+    temp = []
+    for i in range(len(hist)):
+        if hist[i] > 1:
+            temp = temp + [x for x in alist if bin_edges[i] < x < bin_edges[i + 1]]
+    return temp
+
+
+def baseline_remove_outliers(all_num, method='std'):
+    if len(all_num) == 1:
+        return all_num
+    if method == 'std':
+        mean, std = np.mean(all_num), np.std(all_num)
+        return [x for x in all_num if mean - 2 * std < x < mean + 2 * std]
+    q1, q3 = np.percentile(all_num, [25, 75])
+    iqr = q3 - q1
+    return [x for x in all_num if q1 - 1.5 * iqr < x < q3 + 1.5 * iqr]
+
+
+def samples():
+    random = np.random.RandomState(0)
+    yield [29.5]
+    yield [1, 1, 2, 2, 3, 50]
+    for size in [2, 5, 20, 200]:
+        yield random.normal(30, 5, size).round(1).tolist()
+        yield random.randint(0, 10, size).tolist()
+        yield (random.normal(30, 1, size).tolist() + [300.])
+
+
+@pytest.mark.parametrize('values', list(samples()))
+def test_remove_single_mentions_as_baseline(values):
+    assert hu.remove_single_mentions(values) == baseline_remove_single_mentions(values)
+    assert hu.remove_single_mentions(values, bins=5) == baseline_remove_single_mentions(values, bins=5)
+
+
+@pytest.mark.parametrize('values', list(samples()))
+@pytest.mark.parametrize('method', ['std', 'iqr'])
+def test_remove_outliers_as_baseline(values, method):
+    assert hu.remove_outliers(values, method) == baseline_remove_outliers(values, method)
+
+
+@pytest.mark.parametrize('method', ['std', 'iqr'])
+def test_outlier_mask_as_remove_outliers(method):
+    frame = pd.DataFrame([(str(i), v) for i, values in enumerate(samples()) for v in values],
+                         columns=['Compound', 'Value'])
+    kept = frame[hu.outlier_mask(frame, method=method)]
+    for i, values in enumerate(samples()):
+        assert kept['Value'][kept['Compound'] == str(i)].tolist() == baseline_remove_outliers(values, method)
+
+
+def test_outlier_mask_does_not_count_values_that_are_not_numbers():
+    frame = pd.DataFrame({'Compound': ['MnSi', 'MnSi', 'FeGe', 'FeGe', 'FeGe'],
+                          'Value': [29, 'n/a', 278, 280, None]})
+    assert hu.outlier_mask(frame).tolist() == [True, False, True, True, False]
+    statistics = hu.grouped_statistics(frame, outliers='std')
+    assert statistics.loc['MnSi', 'count'] == 1
+    assert statistics.loc['MnSi', 'mean'] == 29
+
+
+def test_grouped_statistics_as_mean_and_median():
+    frame = pd.DataFrame([(str(i), v) for i, values in enumerate(samples()) for v in values],
+                         columns=['Compound', 'Value'])
+    statistics = hu.grouped_statistics(frame)
+    for i, values in enumerate(samples()):
+        row = statistics.loc[str(i)]
+        assert row['count'] == len(values)
+        assert row['mean'] == pytest.approx(hu.mean(values)[0])
+        assert row['mean error'] == pytest.approx(hu.mean(values)[1])
+        assert row['median'] == pytest.approx(hu.median(values)[0])
+        assert row['median error'] == pytest.approx(hu.median(values)[1])
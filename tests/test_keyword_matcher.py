@@ -0,0 +1,54 @@
+import random
+import re
+
+import pytest
+
+import keyword_matcher as km
+
+KEYWORDS = ['Tc', 'T_c', 'T c', 'TC', 'T_C', 'T C', 'Curie temperature', 'transition temperature AND ferromagnet',
+            ' ferromagnetic order', ' FM order', 'skyrmion AND size', 'helical period', 'size', 'c']
+WORDS = ['Tc', 'T', 'c', 'C', '_', 'Curie', 'temperature', 'transition', 'ferromagnet', 'ferromagnetic', 'order',
+         'FM', 'skyrmion', 'size', 'helical', 'period', 'MnSi', '29', 'K']
+
+
+def old_match(sentence, keywords):
+    # find_sentences before the keywords were compiled: each keyword is looked for in the sentence on its own
+    return [k for k in keywords if all(term in sentence for term in re.split('[ ]?AND[ ]?', k))]
+
+
+def random_sentence(rnd):
+    words = [rnd.choice(WORDS) for _ in range(rnd.randint(0, 12))]
+    return ''.join(w + rnd.choice([' ', ' ', '', '_']) for w in words)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_match_is_the_same_as_looking_for_each_keyword(seed):
+    rnd = random.Random(seed)
+    keywords = rnd.sample(KEYWORDS, rnd.randint(1, len(KEYWORDS)))
+    matcher = km.KeywordMatcher(keywords)
+    for _ in range(200):
+        sentence = random_sentence(rnd)
+        assert matcher.match(sentence) == old_match(sentence, keywords)
+
+
+def test_terms_are_found_inside_other_terms():
+    # 'T c' ends inside 'T cC' and 'c' inside every other term; failure links must report all of them
+    matcher = km.KeywordMatcher(['T cC', 'T c', ' c', 'c'])
+    assert matcher.match('a T cC') == ['T cC', 'T c', ' c', 'c']
+    assert matcher.match('a T cD') == ['T c', ' c', 'c']
+    assert matcher.match('T') == []
+
+
+def test_keywords_without_terms_match_every_sentence():
+    assert km.KeywordMatcher(['', 'Tc']).match('no keyword') == ['']
+
+
+def test_find_keeps_each_sentence_once():
+    sentences = ['The Tc of MnSi is 29 K.', 'No keyword here.', 'The skyrmion size and Tc.']
+    assert km.KeywordMatcher(['Tc', 'skyrmion AND size']).find(sentences) == \
+        [('The Tc of MnSi is 29 K.', ['Tc']), ('The skyrmion size and Tc.', ['Tc', 'skyrmion AND size'])]
+
+
+def test_matchers_are_compiled_once():
+    assert km.get_matcher(['Tc', 'T c']) is km.get_matcher(['Tc', 'T c'])
+    assert km.get_matcher(['Tc', 'T c']) is not km.get_matcher(['T c', 'Tc'])
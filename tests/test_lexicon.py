@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+import lexicon as lex
+
+TOKENS = sorted(set(lex.ELEMENTS + lex.NOT_CHEMICALS + lex.SPLIT_UNITS)) + \
+    ['', 'Fa', 'fe', 'FE', 'Uu', 'Uuo', 'Fe ', 'GPa.', 'mSv', 'LSMO', 'μ', 'nm']
+
+
+@pytest.fixture
+def registries(monkeypatch):
+    # Restored after each test, since the registries are global
+    monkeypatch.setattr(lex, 'UNIT_SET', lex.UNIT_SET)
+    monkeypatch.setattr(lex, 'NOT_CHEMICAL_SET', lex.NOT_CHEMICAL_SET)
+
+
+def test_lookups_are_those_of_the_lists():
+    for token in TOKENS:
+        assert lex.is_element(token) == (token in lex.ELEMENTS)
+        assert lex.is_unit(token) == (token in lex.SPLIT_UNITS)
+        assert lex.is_excluded(token) == (token in lex.NOT_CHEMICALS)
+
+
+def old_split_elements(formula):
+    # The longest symbol of the list of elements at each position, looking up each length in the list
+    result = []
+    i = 0
+    while i < len(formula):
+        for length in (3, 2, 1):
+            if formula[i:i + length] in lex.ELEMENTS:
+                result.append(formula[i:i + length])
+                i += length
+                break
+        else:
+            i += 1
+    return result
+
+
+def test_split_elements_takes_the_longest_symbols():
+    assert lex.split_elements('(Fe1-xCox)Si') == ['Fe', 'Co', 'Si']
+    assert lex.split_elements('Cu2OSeO3') == ['Cu', 'O', 'Se', 'O']
+    assert lex.split_elements('Uue') == ['Uue']
+    rnd = random.Random(0)
+    for _ in range(2000):
+        formula = ''.join(rnd.choice(['Fe', 'Co', 'Si', 'C', 'O', 'Os', 'S', 'Sn', 'N', 'Nb', 'Uue', 'U', 'e', 'x',
+                                      '1', '0.5', '(', ')', ' ', '-']) for _ in range(rnd.randint(0, 10)))
+        assert lex.split_elements(formula) == old_split_elements(formula)
+        first = next((formula[:n] for n in (3, 2, 1) if formula[:n] in lex.ELEMENTS), None)
+        assert lex.longest_element(formula) == first
+
+
+def test_registered_words_are_looked_up(registries):
+    assert not lex.is_unit('mSv') and not lex.is_excluded('mSv') and not lex.is_excluded('LSMO')
+    lex.register_units(['mSv'])
+    lex.register_exclusions(['LSMO'])
+    assert lex.is_unit('mSv') and lex.is_excluded('mSv')
+    assert lex.is_excluded('LSMO') and not lex.is_unit('LSMO')
@@ -0,0 +1,207 @@
+import random
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import quantity as qty
+import skyrmion_size as sks
+import temperature as tmp
+
+SENTENCES = [
+    'MnSi orders below T c =29.6K [11] helimagnetically.',
+    'Si addition decreases Tc by 17K) to that of Tc from 320K for x=0 to 318K for x=1 of Mn4FeGe3-x Si x in Ref.',
+    'The Curie temperature of FeGe is 278 K, whereas Cu2OSeO3 orders at 58 K.',
+    'In (Fe1-xCox)Si the Tc varies between 10 and 50 K depending on x.',
+    'The samples (Mn,Fe)Si were annealed at 1000°C for 24 h in Ar.',
+    'The sample was heated to 100 to 200°F and kept at 25 ± 2 C.',
+    'The helical period of MnSi is 18 nm and of FeGe is 70 nm.',
+    'The skyrmion size in MnSi is 18 nm and in Fe0.5Co0.5Si it is 90 nm.',
+    'Skyrmions of 1.5 μm, 2-3 um and 4 μ m were seen in films of 50 Å and 100 Angstrom.',
+    'The lattice constant is 4.56 Å.',
+]
+WORDS = ['the', 'of', 'MnSi', 'Tc', 'x', '0.5', '(', ')', '2', '10', '300', '1.5', 'K', 'K.', 'C', 'F', '°C', 'nm',
+         'Å', 'μm', 'um', 'μ m', 'Angstrom', 'and', 'to', '±', '-', '–', 'at', ',', 'x=0.1', 'GPa']
+
+# The patterns of temperature.py and skyrmion_size.py before the quantity engine
+OLD_BASE_PATTERN = '\\W\\d*[.]?\\d*(?:[ ]?and[ ]?|[ ]?to[ ]?|[ ]?±[ ]?|[ ]?-[ ]?|[ ]?–[ ]?|)?\\d+[.]?\\d*[^A-Za-z0-9μ]?'
+OLD_TEMPERATURE_UNITS = ['K', 'C', 'F']
+OLD_SIZE_UNITS = ['Å', 'Angstrom', 'nm', 'μm', 'um', 'μ m']
+OLD_NANOMETRES = {'nm': 1, 'μm': 1000, 'um': 1000, 'μ m': 1000, 'Å': 0.1, 'Angstrom': 0.1}
+
+
+def old_find_temperature(text, units=OLD_TEMPERATURE_UNITS):
+    return re.findall(OLD_BASE_PATTERN + '(?:' + '|'.join(u + '\\W' for u in units) + ')', text)
+
+
+def old_find_size(text):
+    return re.findall('|'.join(OLD_BASE_PATTERN + u + '\\W' for u in OLD_SIZE_UNITS), text)
+
+
+def old_get_number(text):
+    numbers = re.findall('\\d+[.,]?\\d*', text.replace(',', '.'))
+    if '±' in text:
+        numbers = numbers[:1]
+    return np.array([float(n) for n in numbers])
+
+
+def old_kelvin(text):
+    unit = re.findall('[CFK]', re.findall('(?:K|C|F)(?:\\W|\\Z)', text)[0])[0]
+    number = old_get_number(text)
+    return {'K': number, 'C': number + 273.15, 'F': (number - 32) * (5 / 9) + 273.15}[unit]
+
+
+def old_nanometres(text):
+    return old_get_number(text) * OLD_NANOMETRES[re.findall('|'.join(OLD_SIZE_UNITS), text)[0]]
+
+
+def random_sentences(n, seed=0):
+    rnd = random.Random(seed)
+    result = []
+    for _ in range(n):
+        words = [rnd.choice(WORDS) for _ in range(rnd.randint(1, 20))]
+        result.append(''.join(w + rnd.choice([' ', ' ', '', ', ']) for w in words))
+    return result
+
+
+TEXTS = SENTENCES + random_sentences(500)
+
+
+def test_mentions_are_those_of_the_old_patterns():
+    for text in TEXTS:
+        assert tmp.find_temperature(text) == old_find_temperature(text)
+        assert tmp.find_temperature(text, 'K') == old_find_temperature(text, ['K'])
+        assert sks.find_size(text) == old_find_size(text)
+        assert [t for t, _, _ in tmp.find_temperature_spans(text)] == old_find_temperature(text)
+        for mention, start, end in tmp.find_temperature_spans(text) + sks.find_size_spans(text):
+            assert text[start:end] == mention
+
+
+def test_numbers_are_those_of_the_old_functions():
+    temperatures = [t for text in TEXTS for t in old_find_temperature(text)]
+    sizes = [s for text in TEXTS for s in old_find_size(text)]
+    assert len(temperatures) > 50 and len(sizes) > 50
+    for t in temperatures:
+        assert tmp.get_number(t).tolist() == old_get_number(t).tolist()
+        np.testing.assert_allclose(tmp.convert_to_kelvin(t), old_kelvin(t))
+    for s in sizes:
+        assert sks.get_number(s).tolist() == old_get_number(s).tolist()
+        np.testing.assert_allclose(sks.convert_to_nm(s), old_nanometres(s))
+        np.testing.assert_allclose(sks.convert_to_angstrom(s), old_nanometres(s) * 10)
+
+
+def test_quantities_keep_the_unit_and_the_kind_of_mention():
+    quantities = tmp.find_temperature_quantities('The sample was heated to 100 to 200°F and kept at 25 ± 2 C.')
+    assert [(q.values.tolist(), q.unit, q.is_range, q.has_error) for q in quantities] == \
+        [([100.0, 200.0], 'F', True, False), ([25.0], 'C', False, True)]
+
+
+def test_conversions_between_units():
+    np.testing.assert_allclose(qty.convert(np.array([100.0]), 'F', 'K'), [310.92777778])
+    np.testing.assert_allclose(qty.convert(np.array([10.0]), 'Å', 'nm'), [1.0])
+    np.testing.assert_allclose(qty.convert(np.array([1.0]), 'μm', 'Å'), [10000.0])
+    with pytest.raises(ValueError):
+        qty.convert(np.array([1.0]), 'K', 'nm')
+
+
+def old_number_from_list(mentions, function):
+    # get_number_from_list before the records: the numbers of each mention appended one array at a time
+    result = np.array([])
+    for m in mentions:
+        result = np.append(result, function(m))
+    return result
+
+
+def test_number_from_list_is_that_of_each_mention():
+    temperatures = [t for text in TEXTS for t in old_find_temperature(text)]
+    sizes = [s for text in TEXTS for s in old_find_size(text)]
+    np.testing.assert_array_equal(tmp.get_number_from_list(temperatures),
+                                  old_number_from_list(temperatures, old_get_number))
+    np.testing.assert_allclose(tmp.get_number_from_list(temperatures, normalized_unit='K'),
+                               old_number_from_list(temperatures, old_kelvin))
+    np.testing.assert_array_equal(sks.get_number_from_list(sizes), old_number_from_list(sizes, old_get_number))
+    np.testing.assert_allclose(sks.get_number_from_list(sizes, normalized_unit='nm', roundto=2),
+                               np.round(old_number_from_list(sizes, old_nanometres), 2))
+    np.testing.assert_allclose(sks.get_number_from_list(sizes, normalized_unit='A'),
+                               old_number_from_list(sizes, old_nanometres) * 10)
+
+
+def test_records_keep_the_unit_and_the_source_of_each_number():
+    mentions = [' 50 K ', '100 to 200°C', ' 25 ± 2 F ']
+    records = tmp.get_records(mentions)
+    assert records.dtype == qty.RECORD_DTYPE
+    assert records['value'].tolist() == [50.0, 100.0, 200.0, 25.0]
+    assert [qty.unit_symbol(u) for u in records['unit']] == ['K', 'C', 'C', 'F']
+    assert records['source'].tolist() == [0, 1, 1, 2]
+    converted = tmp.get_records(mentions, normalized_unit='K')
+    np.testing.assert_allclose(converted['value'], old_number_from_list(mentions, old_kelvin))
+    assert set(converted['unit']) == {qty.unit_code('K')}
+    assert converted['source'].tolist() == [0, 1, 1, 2]
+
+
+def test_unknown_units_are_rejected():
+    with pytest.raises(ValueError):
+        sks.get_number_from_list(['100 to 200 nm', '50 km'], normalized_unit='nm')
+    with pytest.raises(ValueError):
+        sks.get_number_from_list(['100 to 200 nm'], normalized_unit='km')
+    with pytest.raises(ValueError):
+        tmp.get_number_from_list([' 50 K '], normalized_unit='C')
+    assert tmp.get_records([]).shape == (0,)
+
+
+def old_series(series, find, convert):
+    # Re-parsing a column of sentences before the bulk mode: one row at a time
+    rows = []
+    for label, text in series.items():
+        if not isinstance(text, str):
+            continue
+        for mention in find(text):
+            for value, normalized in zip(old_get_number(mention), convert(mention)):
+                rows.append((label, mention, value, normalized))
+    return rows
+
+
+def test_series_are_parsed_like_each_sentence():
+    series = pd.Series(TEXTS[:100] + [np.nan, None], index=[i // 2 for i in range(102)])
+    result = tmp.find_temperature_series(series, normalized_unit='K')
+    assert list(result.columns) == ['mention', 'unit', 'value', 'normalized']
+    expected = old_series(series, old_find_temperature, old_kelvin)
+    assert len(expected) > 10
+    assert [(i[0], m, v) for i, m, v in zip(result.index, result['mention'], result['value'])] == \
+        [(label, mention, value) for label, mention, value, _ in expected]
+    np.testing.assert_allclose(result['normalized'], [normalized for _, _, _, normalized in expected])
+
+    result = sks.find_size_series(series, normalized_unit='A')
+    expected = old_series(series, old_find_size, lambda m: old_nanometres(m) * 10)
+    assert [(i[0], m, v) for i, m, v in zip(result.index, result['mention'], result['value'])] == \
+        [(label, mention, value) for label, mention, value, _ in expected]
+    np.testing.assert_allclose(result['normalized'], [normalized for _, _, _, normalized in expected])
+
+
+def test_series_without_mentions():
+    result = tmp.find_temperature_series(pd.Series(['No temperature here.', np.nan]))
+    assert len(result) == 0
+    assert list(result.columns) == ['mention', 'unit', 'value']
+
+
+PIECES = ['1', '23', '4.5', '.', '..', '0.', ' ', 'and', 'to', '±', '-', '–', ' - ', 'K', 'C', 'F', 'nm', 'μm', '°',
+          'x', ',', '(', ')']
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_possessive_patterns_find_the_old_mentions(seed):
+    # Texts made of numbers, dots and separators, where the old pattern backtracked the most
+    rnd = random.Random(seed)
+    for _ in range(1000):
+        text = ''.join(rnd.choice(PIECES) for _ in range(rnd.randint(1, 16)))
+        assert tmp.find_temperature(text) == old_find_temperature(text)
+        assert sks.find_size(text) == old_find_size(text)
+
+
+def test_long_runs_of_digits_are_found_in_linear_time():
+    # The old pattern took about 15 s on a run of 250 digits without a unit
+    for text in [' ' + '1' * 5000 + 'x', ' ' + '1.' * 5000 + 'x', ' ' + '1 to ' * 5000 + 'x']:
+        assert tmp.find_temperature(text) == []
+        assert sks.find_size(text) == []
+    assert tmp.find_temperature(' ' + '1' * 5000 + ' K.') == [' ' + '1' * 5000 + ' K.']
@@ -0,0 +1,25 @@
+import pytest
+
+import database as dbm
+
+
+def test_contain_reads_generators_once(materials):
+    database = dbm.Database_reader(materials)
+    query = database.query().contain(e for e in ['Mn', 'Si'])
+    assert query.compounds() == ['Mn Si', 'Mn0.9 Fe0.1 Si']
+    assert query.compounds() == ['Mn Si', 'Mn0.9 Fe0.1 Si']
+
+
+def test_query_combines_filters(materials):
+    database = dbm.Database_reader(materials)
+    query = database.query().contain(['Mn', 'Si']).elements_no(2).spacegroup('P 21 3')
+    assert query.compounds() == ['Mn Si']
+    assert query.count() == 1
+    assert database.query().contain(['S']).compounds() == ['Zn S']
+    assert database.query().magnet_in_title().spacegroup(numbers=198).compounds() == ['Fe Ge', 'Mn0.9 Fe0.1 Si']
+
+
+def test_contain_checks_elements_where_the_query_is_built(materials):
+    database = dbm.Database_reader(materials)
+    with pytest.raises(ValueError):
+        database.query().contain(['Xx'])
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip('mat2vec')
+
+import recognizers as rec
+
+
+def test_recognizer_must_implement_find_spans():
+    class Incomplete(rec.Recognizer):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    with pytest.raises(TypeError):
+        rec.Recognizer()
+
+
+def test_find_spans_batch_is_find_spans_of_each_text():
+    recognizer = rec.RegexRecognizer()
+    texts = ['MnSi orders below 29.6 K.', 'without any chemical.', 'FeGe and MnSi are helimagnets.']
+    assert recognizer.find_spans_batch(texts) == [recognizer.find_spans(t) for t in texts]
+    assert recognizer.find_spans_batch(texts)[1] == []
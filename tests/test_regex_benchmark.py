@@ -0,0 +1,11 @@
+import pytest
+
+pytest.importorskip('mat2vec')
+
+import regex_benchmark as rb
+
+
+def test_recognisers_are_linear_on_adversarial_texts():
+    rows = rb.run(sizes=[1, 8])
+    assert len(rows) == 2 * len(rb.ADVERSARIAL) * len(rb.RECOGNISERS)
+    assert rb.check(rows) == []
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+
+import pytest
+
+import sinks
+
+
+def read_csv_rows(path):
+    with open(path) as f:
+        return [line.strip() for line in f]
+
+
+def test_csv_sink_appends_unless_rewrite(tmp_path):
+    path = str(tmp_path / 'records.csv')
+    with sinks.open_sink(path, ['a', 'b']) as sink:
+        sink.write([1, 'x'])
+    with sinks.open_sink(path, ['a', 'b'], rewrite='n') as sink:
+        sink.write([2, 'y'])
+    assert read_csv_rows(path) == ['a,b', '1,x', '2,y']
+
+    with sinks.open_sink(path, ['a', 'b'], rewrite='y') as sink:
+        sink.write([3, 'z'])
+    assert read_csv_rows(path) == ['a,b', '3,z']
+
+
+def test_sqlite_sink_appends_unless_rewrite(tmp_path):
+    path = str(tmp_path / 'records.sqlite')
+    with sinks.open_sink(path, ['a', 'b']) as sink:
+        sink.write([1, 'x'])
+    with sinks.open_sink(path, ['a', 'b'], rewrite='n') as sink:
+        sink.write([2, 'y'])
+    connection = sqlite3.connect(path)
+    assert connection.execute('SELECT * FROM records').fetchall() == [(1, 'x'), (2, 'y')]
+    connection.close()
+
+    with sinks.open_sink(path, ['a', 'b'], rewrite='y') as sink:
+        sink.write([3, 'z'])
+    connection = sqlite3.connect(path)
+    assert connection.execute('SELECT * FROM records').fetchall() == [(3, 'z')]
+    connection.close()
+
+
+def test_parquet_sink_does_not_silently_replace(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'records.parquet')
+    with sinks.open_sink(path, ['a', 'b']) as sink:
+        sink.write([1, 'x'])
+
+    with pytest.raises(ValueError):
+        sinks.open_sink(path, ['a', 'b'], rewrite='n')
+    assert pq.read_table(path).to_pydict() == {'a': [1.0], 'b': ['x']}
+
+    with sinks.open_sink(path, ['a', 'b'], rewrite='y') as sink:
+        sink.write([2, 'y'])
+    assert pq.read_table(path).to_pydict() == {'a': [2.0], 'b': ['y']}
+
+
+def test_parquet_sink_keeps_mixed_columns_as_strings(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'records.parquet')
+    with sinks.open_sink(path, ['a', 'b']) as sink:
+        sink.write_rows([[1, 'x'], ['12-15', 'y']])
+    assert pq.read_table(path).to_pydict() == {'a': ['1', '12-15'], 'b': ['x', 'y']}
+
+
+def test_parquet_sink_raises_on_type_mismatch(tmp_path):
+    pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'records.parquet')
+    sink = sinks.open_sink(path, ['a', 'b'], batch_size=1)
+    sink.write([1, 'x'])
+    with pytest.raises(ValueError):
+        sink.write(['12-15', 'y'])
+    # The row that could not be written is still in the buffer, so closing raises again, but the file is closed
+    with pytest.raises(ValueError):
+        sink.close()
+    assert sink.closed
+    assert os.path.exists(path)
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'sqlite'])
+def test_delete_previous_keeps_the_new_rows(tmp_path, output_format):
+    path = str(tmp_path / ('records' + sinks.EXTENSIONS[output_format]))
+    columns = ['DOI', 'Title', 'T']
+    with sinks.open_sink(path, columns) as sink:
+        sink.write_rows([['10.1/a', 'A', 1], ['10.1/b', 'B', 2], [None, 'C', 3], [None, 'D', 4]])
+
+    with sinks.open_sink(path, columns, batch_size=1) as sink:
+        sink.write(['10.1/a', 'A', 10])
+        sink.delete_previous([{'DOI': '10.1/a'}, {'DOI': None, 'Title': 'C'}])
+        sink.write([None, 'C', 30])
+
+    if output_format == 'csv':
+        assert read_csv_rows(path) == ['DOI,Title,T', '10.1/b,B,2', ',D,4', '10.1/a,A,10', ',C,30']
+    else:
+        connection = sqlite3.connect(path)
+        assert connection.execute('SELECT * FROM records').fetchall() == \
+            [('10.1/b', 'B', 2), (None, 'D', 4), ('10.1/a', 'A', 10), (None, 'C', 30)]
+        connection.close()
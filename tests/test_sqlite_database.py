@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import database as dbm
+import sqlite_database as sdb
+
+COMPOUNDS = ['Fe Ge', 'Mn Si', '(Pr0.33 Mn0.67)', 'Zn S', 'Mn0.9 Fe0.1 Si', 'Sn Se', 'Cu2 O Se O3']
+
+
+@pytest.fixture
+def readers(materials):
+    sqlite = sdb.SQLiteDatabase_reader(materials)
+    yield dbm.Database_reader(materials), sqlite
+    sqlite.close()
+
+
+def test_same_compounds_as_pandas(readers):
+    pandas, sqlite = readers
+    # Database_reader.get_compounds is in no particular order
+    assert sorted(sqlite.get_compounds) == sorted(pandas.get_compounds)
+    assert len(sqlite.get_compounds) == len(pandas.get_compounds)
+    assert list(sqlite.get_columns) == list(pandas.get_columns)
+
+
+@pytest.mark.parametrize('elements', [['Mn'], ['S'], ['Si'], ['Mn', 'Si'], ['Fe', 'Si'], ['Se', 'Sn'], ['O'], []])
+@pytest.mark.parametrize('relation', ['and', 'or'])
+def test_same_contain_as_pandas(readers, elements, relation):
+    pandas, sqlite = readers
+    assert sqlite.contain(elements, relation) == list(pandas.contain(elements, relation))
+
+
+@pytest.mark.parametrize('number', [1, 2, 3, 4])
+def test_same_elements_no_as_pandas(readers, number):
+    pandas, sqlite = readers
+    assert sqlite.elements_no(number) == list(pandas.elements_no(number))
+
+
+def test_same_articles_and_spacegroups_as_pandas(readers):
+    pandas, sqlite = readers
+    assert sqlite.find_articles(COMPOUNDS) == pandas.find_articles(COMPOUNDS)
+    assert sqlite.get_spacegroup(COMPOUNDS) == pandas.get_spacegroup(COMPOUNDS)
+
+
+def test_failed_import_leaves_no_file(materials):
+    def fail(value):
+        raise RuntimeError('cannot read ' + value)
+
+    with pytest.raises(RuntimeError):
+        sdb.SQLiteDatabase_reader(materials, converters={'Compound': fail})
+    assert os.listdir(os.path.dirname(materials)) == ['materials.csv']
@@ -0,0 +1,45 @@
+import collections
+import fractions
+
+import numpy as np
+import pytest
+
+import quantity as qty
+import skyrmion_size as sks
+import temperature as tmp
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Restored after each test, since the registry is global
+    monkeypatch.setattr(qty, 'UNITS', collections.OrderedDict(qty.UNITS))
+
+
+def test_units_are_those_of_the_registry():
+    assert tmp.temperature_units() == ['K', 'C', 'F']
+    assert sks.skyrmion_size_units() == ['Å', 'Angstrom', 'nm', 'μm', 'um', 'μ m']
+    assert tmp.TEMPERATURE_UNITS == tmp.temperature_units()
+    assert sks.SKYRMION_SIZE_UNITS == sks.skyrmion_size_units()
+    with pytest.raises(AttributeError):
+        tmp.UNITS
+
+
+def test_temperature_units_registered_later_are_found(registry):
+    text = 'The sample was measured at 300 mK.'
+    assert tmp.find_temperature(text) == []
+    qty.register_unit('mK', 'temperature', 'K', scale=fractions.Fraction(1, 1000))
+    assert 'mK' in tmp.TEMPERATURE_UNITS
+    assert tmp.find_temperature(text) == [' 300 mK.']
+    records = tmp.get_records([text], normalized_unit='K')
+    np.testing.assert_allclose(records['value'], [0.3])
+    np.testing.assert_allclose(tmp.convert_to_kelvin(' 300 mK '), [0.3])
+
+
+def test_size_units_registered_later_are_found(registry):
+    text = 'The skyrmions have a diameter of 2 mm.'
+    assert sks.find_size(text) == []
+    qty.register_unit('mm', 'length', 'nm', scale=1000000)
+    assert 'mm' in sks.SKYRMION_SIZE_UNITS
+    assert sks.find_size(text) == [' 2 mm.']
+    np.testing.assert_allclose(sks.get_number_from_list([text], normalized_unit='nm'), [2000000.])
+    np.testing.assert_allclose(sks.convert_to_nm(' 2 mm '), [2000000.])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index of compounds by composition, to find the compounds nearest to a formula (e.g. the doped variants
+Mn0.95Fe0.05Si and Mn0.9Co0.1Si of MnSi), or to match extracted formulae to the compounds of the database.
+
+Each compound is a vector of atomic fractions (one column per element found in the compounds), kept in a dense
+numpy matrix. The distance between two compositions is the L1 distance between their vectors (from 0 for the
+same composition to 2 for compositions without any element in common), e.g. 0.05 between MnSi and
+Mn0.95Fe0.05Si. Since the fractions of a compound sum to 1, the distance to a formula only needs the columns
+of the elements of the formula:
+    |m - q|_1 = 1 + sum over the elements e of q of (|m_e - q_e| - m_e)
+so each query reads a few columns of the matrix, whatever the number of elements.
+
+The formulae are read by chemicals.py, which is only imported when an index is built, so that database.py can be
+imported without the natural language processing modules.
+
+To import this file, call
+
+>>> from composition_index import CompositionIndex
+>>> index = CompositionIndex(['Mn Si', 'Fe Ge', 'Mn0.95 Fe0.05 Si', 'Cu2 O Se O3'])
+>>> index.nearest('MnSi', k=2)
+OUT: [('Mn Si', 0.0), ('Mn0.95 Fe0.05 Si', 0.05)]
+>>> index.within('Mn0.9Fe0.1Si', 0.1)
+OUT: [('Mn0.95 Fe0.05 Si', 0.05), ('Mn Si', 0.1)]
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class CompositionIndex:
+    def __init__(self, formulae):
+        """
+        :param formulae: list of str. Formulae that are not valid formulae (see chemicals.composition_key) are left out
+        """
+        import chemicals as chem
+        formulae = pd.unique(pd.Series(list(formulae), dtype=object))
+        keys = chem.normalize_many(formulae)
+        self.formulae = np.array([f for f, key in zip(formulae, keys) if key is not None], dtype=object)
+        keys = [key for key in keys if key is not None]
+
+        self.elements = sorted(set(element for key in keys for element, _ in key))
+        self.columns = {element: i for i, element in enumerate(self.elements)}
+        # Column-major, so that the column of an element is contiguous
+        self.matrix = np.zeros((len(keys), len(self.elements)), dtype=np.float64, order='F')
+        for row, key in enumerate(keys):
+            for element, fraction in key:
+                self.matrix[row, self.columns[element]] = fraction
+
+    def __len__(self):
+        return len(self.formulae)
+
+    def distances(self, formula):
+        """
+        :param formula: str
+        :return: numpy array, the distance from formula to each compound of the index
+        """
+        import chemicals as chem
+        key = chem.composition_key(formula)
+        if key is None:
+            raise ValueError('\'' + str(formula) + '\' is not a valid formula')
+
+        distances = np.ones(len(self.formulae))
+        for element, fraction in key:
+            if element in self.columns:
+                column = self.matrix[:, self.columns[element]]
+                distances += np.abs(column - fraction) - column
+            else:
+                distances += fraction
+        # Rounded, so that the distances are not affected by the rounding of the fractions of the keys
+        return np.round(distances, chem.KEY_DECIMALS)
+
+    def nearest(self, formula, k=1):
+        """
+        :param formula: str
+        :param k: int, the number of compounds
+        :return: list of (compound, distance): the k compounds nearest to formula, nearest first
+        """
+        distances = self.distances(formula)
+        k = min(k, len(distances))
+        if k <= 0:
+            return []
+        rows = np.argpartition(distances, k - 1)[:k]
+        rows = rows[np.argsort(distances[rows], kind='stable')]
+        return [(self.formulae[r], float(distances[r])) for r in rows]
+
+    def within(self, formula, radius):
+        """
+        :param formula: str
+        :param radius: float, the maximum distance
+        :return: list of (compound, distance): the compounds at most radius away from formula, nearest first
+        """
+        distances = self.distances(formula)
+        rows = np.flatnonzero(distances <= radius)
+        rows = rows[np.argsort(distances[rows], kind='stable')]
+        return [(self.formulae[r], float(distances[r])) for r in rows]
+
+    def match(self, formulae, max_distance=0.):
+        """
+        Match formulae (e.g. extracted from articles) to their nearest compound of the index
+        :param formulae: list of str
+        :param max_distance: float, formulae further than max_distance from every compound are not matched
+        :return: list of (compound, distance), or None for the formulae that are not matched (or not valid formulae)
+
+        Example:
+        >>> index.match(['MnSi', 'Mn0.97Fe0.03Si', 'Nd2Fe14B'], max_distance=0.05)
+        OUT: [('Mn Si', 0.0), ('Mn0.95 Fe0.05 Si', 0.02), None]
+        """
+        import chemicals as chem
+        result = []
+        matched = {}
+        for formula in formulae:
+            if formula not in matched:
+                matched[formula] = None
+                if chem.composition_key(formula) is not None and len(self.formulae) > 0:
+                    nearest = self.nearest(formula, k=1)[0]
+                    if nearest[1] <= max_distance:
+                        matched[formula] = nearest
+            result.append(matched[formula])
+        return result
@@ -6,8 +6,128 @@ Created on Tue Jun 25 16:28:28 2019
 @author: thv20
 """
 
+import json
+import os
+
+import numpy as np
 import pandas as pd
-import re
+
+from composition_index import CompositionIndex
+from element_index import ElementIndex
+from query import Query, to_flags
+
+# Space group of the compounds that are not in the database, see Database_reader.get_spacegroup
+MISSING_SPACEGROUP = (None, None)
+
+# Statistics of the extracted values of each compound, see Database_reader.join_records
+STATISTICS = ['count', 'mean', 'std', 'median', 'min', 'max']
+
+# Columns of the values of the records of document.PROPERTIES (in the same unit for all the records),
+# see Database_reader.join_records
+VALUE_COLUMNS = ['Extracted Temperature (K)', 'Skyrmion Size (nm)']
+
+# Types of the columns of the database (the other columns keep the types inferred by pd.read_csv)
+DTYPES = {'Point group': 'category',
+          'Space Group': 'category',
+          'Skyrmions? Bloch/Neel/Anti/None/Unknown': 'category',
+          'SG #': 'int64'}
+
+# Extension of the cache of the database, written next to the csv file (see Database_reader)
+CACHE_EXTENSION = '.feather'
+
+
+def set_dtypes(database):
+    """
+    :param database: pandas DataFrame
+    :return: pandas DataFrame, with the columns in DTYPES converted to their types.
+             Integer columns with missing values are converted to the nullable type 'Int64'
+    """
+    for column, dtype in DTYPES.items():
+        if column not in database.columns:
+            continue
+        if dtype == 'int64':
+            values = pd.to_numeric(database[column], errors='coerce')
+            database[column] = values.astype('Int64' if values.isnull().any() else 'int64')
+        else:
+            database[column] = database[column].astype(dtype)
+    return database
+
+
+def record_values(value):
+    """
+    :param value: the value of a record: a number, an array of numbers (e.g. the two ends of a range of sizes),
+                  or either of them as written in a csv file (e.g. '29.5' or '[10. 20.]')
+    :return: list of floats, empty if value is not a number
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        value = value[1:-1].replace(',', ' ').split() if value.startswith('[') and value.endswith(']') else [value]
+    result = []
+    for v in np.ravel(np.asarray(value, dtype=object)):
+        try:
+            v = float(v)
+        except (TypeError, ValueError):
+            continue
+        if not np.isnan(v):
+            result.append(v)
+    return result
+
+
+def cache_stamp(file_name, args, kwargs):
+    """
+    :param file_name: str, the csv file
+    :param args: list, arguments of pd.read_csv
+    :param kwargs: dictionary, arguments of pd.read_csv
+    :return: str, which changes when the csv file (its size or modification time) or the arguments change
+    """
+    status = os.stat(file_name)
+    return json.dumps({'size': status.st_size, 'mtime': status.st_mtime_ns, 'dtypes': DTYPES,
+                       'args': [repr(a) for a in args], 'kwargs': {k: repr(v) for k, v in kwargs.items()}},
+                      sort_keys=True)
+
+
+def read_cache(file_name, stamp):
+    """
+    :param file_name: str, the csv file
+    :param stamp: str, see cache_stamp
+    :return: pandas DataFrame, or None if there is no cache of file_name or if it is out of date
+    """
+    import pyarrow.feather
+
+    path = file_name + CACHE_EXTENSION
+    if not os.path.exists(path):
+        return None
+    table = pyarrow.feather.read_table(path, memory_map=True)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'materials_database') != stamp.encode('utf-8'):
+        return None
+    return table.to_pandas()
+
+
+def write_cache(database, file_name, stamp):
+    """
+    Write the database next to the csv file. If the folder cannot be written to, or if the database cannot be
+    converted to an Arrow table, nothing is written
+    :param database: pandas DataFrame
+    :param file_name: str, the csv file
+    :param stamp: str, see cache_stamp
+    """
+    import pyarrow
+    import pyarrow.feather
+
+    path = file_name + CACHE_EXTENSION
+    # Written under a temporary name first, so that other processes never read half a file
+    temporary = path + '.' + str(os.getpid())
+    try:
+        # The index is kept (e.g. if index_col is given to pd.read_csv), a RangeIndex being only kept as metadata
+        table = pyarrow.Table.from_pandas(database, preserve_index=None)
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {}, materials_database=stamp))
+        pyarrow.feather.write_feather(table, temporary)
+        os.replace(temporary, path)
+    except (OSError, pyarrow.ArrowException):
+        # e.g. a column of mixed types, which Arrow cannot store: the database is just not cached
+        if os.path.exists(temporary):
+            os.remove(temporary)
 
 
 class Database_reader:
@@ -16,20 +136,50 @@ class Database_reader:
     materials.csv is a file containing non-centrosymmetric compounds structural information
     '''
 
-    def __init__(self, file_name='materials.csv', *args, **kwargs):
+    def __init__(self, file_name='materials.csv', *args, cache='n', **kwargs):
         """
         *args and **kwargs are specific to pd.read_csv function
+        :param cache: str, whether or not the database should be read from (and written to) a Feather file next to
+                      the csv file (file_name + CACHE_EXTENSION), which is much faster to read than the csv file.
+                      The cache is written again when the size or the modification time of the csv file changes.
+                      Requires pyarrow
         :return: None
 
         Example of usage:
 
         >>> database = Database_reader('materials.csv')
+        >>> database = Database_reader('materials.csv', cache='y')
         """
 
-        self.database = pd.read_csv(file_name, *args, **kwargs)
-        for c in self.database.columns:
-            if 'Unnamed:' in c:
-                self.database = self.database.drop(columns=c)
+        self.database = None
+        if cache == 'y':
+            try:
+                import pyarrow
+            except ImportError:
+                raise ImportError('pyarrow is needed to cache the database. It can be installed with pip install pyarrow')
+            stamp = cache_stamp(file_name, args, kwargs)
+            self.database = read_cache(file_name, stamp)
+
+        if self.database is None:
+            self.database = pd.read_csv(file_name, *args, **kwargs)
+            self.database = self.database.drop(columns=[c for c in self.database.columns if 'Unnamed:' in c])
+            self.database = set_dtypes(self.database)
+            if cache == 'y':
+                write_cache(self.database, file_name, stamp)
+
+        # Canonical composition keys of the compounds, see composition_keys
+        self.keys = None
+        # Index of the compounds by composition, see composition_index
+        self.index = None
+        # Inverted index of the elements of the compounds, see element_index
+        self.elements = None
+        # Positions of the rows of each compound, see compound_rows
+        self.rows = None
+        # Position in element_index of the compound of each row, see compound_mask
+        self.codes = None
+        # Columns converted for queries, see column_mask and flag_mask
+        self.factorized = {}
+        self.flags = {}
 
     @property
     def get(self):
@@ -77,6 +227,166 @@ class Database_reader:
         """
         return list(set(self.database['Compound'].tolist()))
 
+    @property
+    def compound_rows(self):
+        """
+        Positions of the rows of each compound in the database, computed the first time they are needed
+        :return: dictionary, keys are the compounds and values are numpy arrays of positions
+        """
+        if self.rows is None:
+            self.rows = self.database.groupby('Compound', sort=False).indices
+        return self.rows
+
+    def take_rows(self, compounds):
+        """
+        Positions of the rows of a list of compounds, looked up in compound_rows
+        :param compounds: list of str
+        :return: (positions, counts): numpy array of the positions of the rows of all the compounds, in the order of
+                 compounds, and numpy array of the number of rows of each compound (0 if it is not in the database)
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        rows = [self.compound_rows.get(c, empty) for c in compounds]
+        counts = np.array([len(r) for r in rows], dtype=np.int64)
+        positions = np.concatenate(rows).astype(np.int64) if rows else empty
+        return positions, counts
+
+    @property
+    def composition_keys(self):
+        """
+        Canonical composition keys of the compounds of the database (see chemicals.composition_key),
+        computed the first time they are needed
+        :return: pandas Series of tuples (None for the compounds that are not valid formulae), indexed like the database
+
+        Example:
+        >>> database = Database_reader('materials.csv')
+        >>> database.composition_keys[database.get.Compound == 'Fe Ge'].iloc[0]
+        Out: (('Fe', 0.5), ('Ge', 0.5))
+        """
+        if self.keys is None:
+            # Imported here, so that the database can be read without the natural language processing modules
+            import chemicals as chem
+            self.keys = pd.Series(chem.normalize_many(self.database['Compound'].tolist()),
+                                  index=self.database.index, dtype=object)
+        return self.keys
+
+    @property
+    def composition_index(self):
+        """
+        Index of the compounds of the database by composition (see composition_index.py), built the first time
+        it is needed
+        :return: CompositionIndex
+
+        Example:
+        >>> database = Database_reader('materials.csv')
+        >>> database.composition_index.within('Mn0.95Fe0.05Si', 0.05)
+        Out: [('Mn0.95 Fe0.05 Si', 0.0), ('Mn Si', 0.05), ('Mn0.9 Fe0.1 Si', 0.05)]
+        """
+        if self.index is None:
+            self.index = CompositionIndex(self.database['Compound'].tolist())
+        return self.index
+
+    @property
+    def element_index(self):
+        """
+        Inverted index of the elements of the compounds of the database (see element_index.py),
+        built the first time it is needed
+        :return: ElementIndex
+        """
+        if self.elements is None:
+            self.elements = ElementIndex(self.database['Compound'].tolist())
+        return self.elements
+
+    def query(self):
+        """
+        Start a query combining several filters (see query.py)
+        :return: Query
+
+        Example:
+        >>> database = Database_reader('materials.csv')
+        >>> database.query().contain(['Mn', 'Si']).elements_no(2).spacegroup('P 21 3').compounds()
+        Out: ['Mn Si']
+        """
+        return Query(self)
+
+    def compound_mask(self, mask):
+        """
+        :param mask: numpy array of booleans, one for each compound of element_index
+        :return: numpy array of booleans, one for each row of the database
+        """
+        if self.codes is None:
+            self.codes = pd.Index(self.element_index.compounds).get_indexer(self.database['Compound'])
+        # Rows without a compound have the code -1, i.e. the False appended at the end
+        return np.append(mask, False)[self.codes]
+
+    def column_mask(self, column, values):
+        """
+        :param column: str
+        :param values: list
+        :return: numpy array of booleans, whether or not the value of column in each row is one of values
+        """
+        if column not in self.factorized:
+            self.factorized[column] = pd.factorize(self.database[column])
+        codes, uniques = self.factorized[column]
+        values = set(str(v) for v in values)
+        matched = np.array([str(u) in values for u in uniques] + [False], dtype=bool)
+        return matched[codes]
+
+    def flag_mask(self, column):
+        """
+        :param column: str, a column of flags (e.g. 'Magnet in Title')
+        :return: numpy array of booleans, the flags of the rows (see query.to_flags)
+        """
+        if column not in self.flags:
+            self.flags[column] = to_flags(self.database[column])
+        return self.flags[column]
+
+    def join_records(self, records, value_column=None, compound_column='Compound', columns=None, how='inner'):
+        """
+        Join extracted records (e.g. Curie temperatures) to the compounds of the database of the same composition,
+        however their formulae are written (e.g. 'FeGe' and 'Fe Ge'). The composition keys of both sides are
+        computed once and the records are joined on them with a hash join.
+        :param records: pandas DataFrame (e.g. read from Curie_temperature_records.csv), or list of records
+                        (e.g. as returned by Doc.extract_all)
+        :param value_column: None or str, the column of the extracted values. Values that are arrays (e.g. the sizes
+                        of ranges, '[10. 20.]' in a csv file) count once for each of their numbers.
+                        If not specified, the first column of VALUE_COLUMNS in records is used
+        :param compound_column: str, the column of the compounds
+        :param columns: None or list of str, the names of the columns if records is a list
+                        (e.g. document.PROPERTIES['curie_temperature']['columns'])
+        :param how: str, 'inner' to keep the compounds of the database with records only, 'left' to keep them all
+        :return: pandas DataFrame: the rows of the database, with a 'Composition key' column and the statistics
+                 (see STATISTICS) of the values extracted for their composition, e.g. 'Extracted Temperature (K) mean'
+
+        Example:
+        >>> database = Database_reader('materials.csv')
+        >>> records = pd.read_csv('Data/Curie Temperature/Curie_temperature_records.csv')
+        >>> database.join_records(records)[['Compound', 'Extracted Temperature (K) mean']].head(1)
+        Out:   Compound  Extracted Temperature (K) mean
+        0    Fe Ge                           278.5
+        """
+        if how not in ['inner', 'left']:
+            raise ValueError('how should only be either \'inner\' or \'left\'.')
+        if not isinstance(records, pd.DataFrame):
+            records = pd.DataFrame(list(records), columns=columns)
+        if value_column is None:
+            found = [c for c in VALUE_COLUMNS if c in records.columns]
+            if not found:
+                raise ValueError('value_column should be given, since the records have none of the columns '
+                                 + ', '.join(VALUE_COLUMNS))
+            value_column = found[0]
+
+        import chemicals as chem
+        values = pd.DataFrame({'Composition key': pd.Series(chem.normalize_many(records[compound_column].tolist()),
+                                                            index=records.index, dtype=object),
+                               'value': records[value_column].map(record_values)}).explode('value')
+        values['value'] = pd.to_numeric(values['value'])
+        values = values.dropna()
+        statistics = values.groupby('Composition key')['value'].agg(STATISTICS)
+        statistics.columns = [str(value_column) + ' ' + s for s in STATISTICS]
+
+        database = self.database.assign(**{'Composition key': self.composition_keys})
+        return database.merge(statistics, left_on='Composition key', right_index=True, how=how)
+
     def find_articles(self, compounds):
         """
         Find structural articles for a given compound name
@@ -95,15 +405,19 @@ class Database_reader:
                'Journal of the Physical Society of Japan (1983) 52, (9) p3163-p3169']]}
 
         """
+        # A list, since compounds is read twice (e.g. if it is a generator)
+        compounds = list(compounds)
+        positions, counts = self.take_rows(compounds)
+        rows = list(zip(self.database.index.take(positions).tolist(),
+                        self.database['Structural Paper Title'].take(positions).tolist(),
+                        self.database['Reference'].take(positions).tolist()))
 
         result = {}
-
-        for compound in compounds:
-            result[compound] = []
-            indexs = self.database['Compound'].index[self.database['Compound'] == compound].tolist()
-            for index in indexs:
-                result[compound].append([index, self.database['Structural Paper Title'][index],
-                                  self.database['Reference'][index]])
+        start = 0
+        for compound, count in zip(compounds, counts):
+            # Compounds that are not in the database have no articles
+            result[compound] = [list(row) for row in rows[start:start + count]]
+            start += count
 
         return result
 
@@ -111,6 +425,7 @@ class Database_reader:
         """
         Return a list of compounds in database that contain the elements
         relation can be specified as 'and' or 'or'
+        The elements are element symbols: 'S' is found in 'Zn S' but not in 'Mn Si' (see element_index.py)
 
         Example:
         >>> database = Database_reader('materials.csv')
@@ -120,13 +435,7 @@ class Database_reader:
              'Mn Fe (P0.671 Si0.219 Ge0.11)',
              'Mn Fe (P0.71 Si0.18 Ge0.11)']
         """
-        all_c = self.get_compounds
-        if relation == 'and':
-            return [c for c in all_c if all(cs in c for cs in elements)]
-        elif relation == 'or':
-            return [c for c in all_c if any(cs in c for cs in elements)]
-        else:
-            raise ValueError('relation should only be either \'and\' or \'or\'.')
+        return self.element_index.contain(elements, relation=relation)
 
     def elements_no(self, number=2):
         """
@@ -142,24 +451,33 @@ class Database_reader:
              'K (Fe1.04 Li0.96) (Si0.4 Al1.6) Si3 O10 (O H)0.46 F1.54']
         """
 
-        return [m for m in self.get_compounds if len(set(re.findall('[A-Z][a-z]?', m))) == number]
+        return self.element_index.with_count(number)
 
     def get_spacegroup(self, compounds):
         """
         Function to get the space groups of a list of compounds
 
-        :param compounds:
+        :param compounds: list of str
         :return: dictionary with keys being the chemical formula and the values
-                is (name of space group, space group number)
+                is (name of space group, space group number) of the first row of the compound,
+                or MISSING_SPACEGROUP if the compound is not in the database
 
         Example:
         >>> database.get_spacegroup(['Fe Ge', 'Mn Si'])
         Out: {'Fe Ge': ('P 21 3', 198), 'Mn Si': ('P 21 3', 198)}
         """
+        # A list, since compounds is read twice (e.g. if it is a generator)
+        compounds = list(compounds)
+        positions, counts = self.take_rows(compounds)
+        # Position of the first row of each compound in positions
+        first = np.cumsum(counts) - counts
+        found = counts > 0
+        rows = positions[first[found]]
+        spacegroups = iter(zip(self.database['Space Group'].take(rows).tolist(),
+                               self.database['SG #'].take(rows).tolist()))
+
         result = {}
-        for c in compounds:
-            #c = ' '.join(re.findall('[A-Z][^A-Z]*', c))
-            result[c] = (list(self.get[self.get.Compound == c]['Space Group'].items())[0][1],
-                          list(self.get[self.get.Compound == c]['SG #'].items())[0][1])
+        for c, f in zip(compounds, found):
+            result[c] = next(spacegroups) if f else MISSING_SPACEGROUP
 
         return result
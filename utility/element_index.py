@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inverted index of the elements of a list of compounds, to find the compounds containing some elements
+(or made of a given number of elements) with bitwise operations instead of scanning the compounds.
+
+Each compound is split into its element symbols (see lexicon.split_elements, so that 'S' is not found in 'Si'),
+and each element is mapped to a bitset of the compounds containing it: bit i is set if compound i contains the
+element. Bitsets are numpy arrays of uint64, so that and/or queries read 1 bit per compound.
+lexicon.py is only imported when an index is built, so that database.py can be imported without doc_processing.
+
+To import this file, call
+
+>>> from element_index import ElementIndex
+>>> index = ElementIndex(['Fe Ge', 'Mn Si', 'Mn Fe (P0.63 Si0.26 Ge0.11)', 'Cu2 O Se O3'])
+>>> index.contain(['Fe', 'Ge', 'Si'])
+OUT: ['Mn Fe (P0.63 Si0.26 Ge0.11)']
+>>> index.with_count(3)
+OUT: ['Cu2 O Se O3']
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class ElementIndex:
+    def __init__(self, compounds):
+        """
+        :param compounds: list of str. Each compound is kept once, in the order it first appears
+        """
+        import lexicon as lex
+        self.compounds = np.array(pd.unique(pd.Series(list(compounds), dtype=object)), dtype=object)
+        self.words = (len(self.compounds) + 63) // 64
+
+        element_rows = {}
+        self.counts = np.zeros(len(self.compounds), dtype=np.int64)
+        for row, compound in enumerate(self.compounds):
+            elements = set(lex.split_elements(compound)) if type(compound) == str else set()
+            self.counts[row] = len(elements)
+            for element in elements:
+                element_rows.setdefault(element, []).append(row)
+
+        self.bitsets = {element: self.to_bitset(rows) for element, rows in element_rows.items()}
+        self.count_bitsets = {int(number): self.to_bitset(np.flatnonzero(self.counts == number))
+                              for number in np.unique(self.counts)}
+
+    def __len__(self):
+        return len(self.compounds)
+
+    def to_bitset(self, rows):
+        """
+        :param rows: list of int, positions of compounds
+        :return: numpy array of uint64 with the bits of rows set
+        """
+        mask = np.zeros(self.words * 64, dtype=bool)
+        mask[np.asarray(rows, dtype=np.int64)] = True
+        return np.packbits(mask, bitorder='little').view(np.uint64)
+
+    def to_mask(self, bitset):
+        """
+        :param bitset: numpy array of uint64
+        :return: numpy array of booleans, one for each compound of the index
+        """
+        return np.unpackbits(bitset.view(np.uint8), bitorder='little')[:len(self.compounds)].astype(bool)
+
+    def to_compounds(self, bitset):
+        """
+        :param bitset: numpy array of uint64
+        :return: list of str, the compounds whose bits are set, in the order of the index
+        """
+        return self.compounds[self.to_mask(bitset)].tolist()
+
+    def get(self, element):
+        """
+        :param element: str, an element symbol
+        :return: numpy array of uint64, the bitset of the compounds containing element
+        """
+        import lexicon as lex
+        if not lex.is_element(element):
+            raise ValueError('\'' + str(element) + '\' is not a chemical element')
+        if element not in self.bitsets:
+            return np.zeros(self.words, dtype=np.uint64)
+        return self.bitsets[element]
+
+    def contain_bitset(self, elements, relation='and'):
+        """
+        :param elements: list of str, element symbols
+        :param relation: str, 'and' for the compounds containing all the elements, 'or' for those containing any
+        :return: numpy array of uint64, the bitset of the compounds containing the elements
+        """
+        if relation == 'and':
+            combine, result = np.bitwise_and, ~np.zeros(self.words, dtype=np.uint64)
+        elif relation == 'or':
+            combine, result = np.bitwise_or, np.zeros(self.words, dtype=np.uint64)
+        else:
+            raise ValueError('relation should only be either \'and\' or \'or\'.')
+
+        for element in elements:
+            result = combine(result, self.get(element))
+        return result
+
+    def contain(self, elements, relation='and'):
+        """
+        :param elements: list of str, element symbols
+        :param relation: str, 'and' for the compounds containing all the elements, 'or' for those containing any
+        :return: list of str, the compounds containing the elements
+        """
+        return self.to_compounds(self.contain_bitset(elements, relation=relation))
+
+    def count_bitset(self, number):
+        """
+        :param number: int
+        :return: numpy array of uint64, the bitset of the compounds made of number different elements
+        """
+        if number not in self.count_bitsets:
+            return np.zeros(self.words, dtype=np.uint64)
+        return self.count_bitsets[number]
+
+    def with_count(self, number):
+        """
+        :param number: int
+        :return: list of str, the compounds made of number different elements
+        """
+        return self.to_compounds(self.count_bitset(number))
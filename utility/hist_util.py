@@ -7,6 +7,7 @@ Created on Fri Jul 12 18:36:39 2019
 """
 
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 import collections
 from chemicals import *
@@ -14,17 +15,36 @@ import math
 from matplotlib import figure
 
 
+def as_result(values, alist):
+    """
+    :param values: numpy array
+    :param alist: the input of a function: list or numpy array
+    :return: values, as a list if alist is a list
+    """
+    if isinstance(alist, np.ndarray):
+        return values
+    return values.tolist()
+
+
 def remove_single_mentions(alist, bins='auto'):
-    hist, bin_edges = np.histogram(alist, bins=bins)
-    temp = []
-    # temp = copy.deepcopy(alist)
+    '''
+    Input: list (or numpy array) of numbers
+    Output: the numbers strictly inside the bins of the histogram containing more than one number, bin by bin
+    '''
     if len(alist) == 1:
         return alist
-    for i in range(len(hist)):
-        if hist[i] > 1:
-            temp = temp + [x for x in alist if x > bin_edges[i] and x < bin_edges[i + 1]]
+    values = np.asarray(alist)
+    hist, bin_edges = np.histogram(values, bins=bins)
+
+    # Bin of each number: bin_edges[i - 1] <= x < bin_edges[i]
+    index = np.digitize(values, bin_edges)
+    inside = (index >= 1) & (index <= len(hist))
+    index = np.where(inside, index, 1)
+    keep = inside & (hist[index - 1] > 1) & (values > bin_edges[index - 1]) & (values < bin_edges[index])
 
-    return temp
+    kept = np.flatnonzero(keep)
+    kept = kept[np.argsort(index[kept], kind='stable')]
+    return as_result(values[kept], alist)
 
 
 def remove_outliers(all_num, method='std'):
@@ -32,25 +52,24 @@ def remove_outliers(all_num, method='std'):
     Input: list of all numbers
     Output: remove the outliers, defined as numbers outside 2 standard deviations of the mean
     '''
-    outliers_removed = []
     if len(all_num) == 1:
         return all_num
 
+    values = np.asarray(all_num)
     if method == 'std':
-        mean = np.mean(all_num)
-        std = np.std(all_num)
-        outliers_removed = [x for x in all_num if x < (mean + 2 * std)]
-        outliers_removed = [x for x in outliers_removed if x > (mean - 2 * std)]
+        mean = np.mean(values)
+        std = np.std(values)
+        keep = (values < mean + 2 * std) & (values > mean - 2 * std)
 
     elif method == 'iqr':
-        q1, q3 = np.percentile(all_num, [25, 75])
+        q1, q3 = np.percentile(values, [25, 75])
         iqr = q3 - q1
-        lower_bound = q1 - (1.5 * iqr)
-        upper_bound = q3 + (1.5 * iqr)
-        outliers_removed = [x for x in all_num if x > lower_bound]
-        outliers_removed = [x for x in outliers_removed if x < upper_bound]
+        keep = (values > q1 - (1.5 * iqr)) & (values < q3 + (1.5 * iqr))
 
-    return outliers_removed
+    else:
+        keep = np.zeros(len(values), dtype=bool)
+
+    return as_result(values[keep], all_num)
 
 
 def mean(nums):
@@ -80,6 +99,69 @@ def median(nums):
     return (median, error)
 
 
+def outlier_mask(frame, compound_column='Compound', value_column=None, method='std'):
+    '''
+    Same as remove_outliers, for every compound of a long DataFrame at once
+    Input: DataFrame with one row per value (e.g. the records of Curie temperatures), the columns of the compounds
+           and of the values (if not specified, the column after compound_column), method 'std' or 'iqr'
+    Output: numpy array of booleans, the rows that are not outliers among the values of their compound
+    '''
+    if value_column is None:
+        value_column = frame.columns[list(frame.columns).index(compound_column) + 1]
+    values = pd.to_numeric(frame[value_column], errors='coerce')
+    groups = values.groupby(frame[compound_column].to_numpy())
+    compounds = frame[compound_column].to_numpy()
+
+    def per_row(statistic):
+        return statistic.reindex(compounds).to_numpy()
+
+    # The values that are not numbers are not counted, so that a single number is still never an outlier
+    size = per_row(groups.count())
+    if method == 'std':
+        mean = per_row(groups.mean())
+        std = per_row(groups.std(ddof=0))
+        keep = (values.to_numpy() < mean + 2 * std) & (values.to_numpy() > mean - 2 * std)
+    elif method == 'iqr':
+        q1 = per_row(groups.quantile(0.25))
+        q3 = per_row(groups.quantile(0.75))
+        iqr = q3 - q1
+        keep = (values.to_numpy() > q1 - (1.5 * iqr)) & (values.to_numpy() < q3 + (1.5 * iqr))
+    else:
+        keep = np.zeros(len(frame), dtype=bool)
+
+    # As in remove_outliers, a single value is never an outlier
+    return (keep | (size == 1)) & values.notnull().to_numpy()
+
+
+def grouped_statistics(frame, compound_column='Compound', value_column=None, outliers=None):
+    '''
+    Same as mean and median, for every compound of a long DataFrame in a single groupby
+    Input: DataFrame with one row per value, the columns of the compounds and of the values (if not specified,
+           the column after compound_column), outliers: None, or 'std' or 'iqr' to remove the outliers of each
+           compound first (see outlier_mask)
+    Output: DataFrame indexed by compound, with the columns 'count', 'mean', 'mean error', 'median', 'median error'
+
+    Example:
+    >>> records = pd.read_csv('Data/Curie Temperature/Curie_temperature_records.csv')
+    >>> grouped_statistics(records, outliers='std').loc['MnSi']
+    Out: count 25, mean 29.9, mean error 0.4, median 29.5, median error 0.5
+    '''
+    if value_column is None:
+        value_column = frame.columns[list(frame.columns).index(compound_column) + 1]
+    values = pd.to_numeric(frame[value_column], errors='coerce')
+    keep = values.notnull().to_numpy()
+    if outliers is not None:
+        keep = keep & outlier_mask(frame, compound_column, value_column, method=outliers)
+
+    groups = values[keep].groupby(frame[compound_column].to_numpy()[keep])
+    result = pd.DataFrame({'count': groups.size(), 'mean': groups.mean(), 'median': groups.median()})
+    # Standard errors as in mean and median (population standard deviation)
+    error = groups.std(ddof=0) / np.sqrt(result['count'])
+    result['mean error'] = error
+    result['median error'] = 1.253 * error
+    return result[['count', 'mean', 'mean error', 'median', 'median error']]
+
+
 def plot_hist(data, expected=None, mode='median', title='', xlabel='', ylabel='', unit='', bins=20):
     if mode == 'median':
         mean_m = median(data)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Queries over the materials database (see database.py) combining several filters, e.g. the compounds of space
+group P 21 3 containing Mn and Si and made of exactly 2 elements.
+
+A query is built by chaining filters; each filter returns a new query, so that queries can be reused and extended.
+The filters are only evaluated when the result is asked for: each filter is a boolean mask over the rows of the
+database, computed from precomputed columns (the element bitsets of Database_reader.element_index, and the columns
+factorized once by Database_reader.column_mask), and the masks are combined with a single logical and.
+
+To import this file, call
+
+>>> database = Database_reader('materials.csv')
+>>> query = database.query().contain(['Mn', 'Si']).elements_no(2).spacegroup('P 21 3')
+>>> query.compounds()
+Out: ['Mn Si']
+>>> query.count()
+Out: 3
+>>> query.get()  # the rows of the database, as a DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns of the database filtered by the query
+POINT_GROUP = 'Point group'
+SPACE_GROUP = 'Space Group'
+SPACE_GROUP_NUMBER = 'SG #'
+SKYRMION = 'Skyrmions? Bloch/Neel/Anti/None/Unknown'
+MAGNET_IN_TITLE = 'Magnet in Title'
+MAGNET_IN_JOURNAL = 'Magnet in Journal'
+MAGNET_IN_TITLE_OR_JOURNAL = 'Magnet in Title or Journal?'
+
+# Values of the flag columns (e.g. MAGNET_IN_TITLE) that are read as true
+TRUE_VALUES = {'y', 'yes', 'true', 't', '1', '1.0'}
+
+
+def to_list(values):
+    """
+    :param values: a value or a list of values
+    :return: list
+    """
+    if isinstance(values, (list, tuple, set, np.ndarray, pd.Series)):
+        return list(values)
+    return [values]
+
+
+def to_flags(column):
+    """
+    :param column: pandas Series, e.g. 'Y'/'N', 'yes'/'no', True/False or 1/0
+    :return: numpy array of booleans
+    """
+    return column.map(lambda v: str(v).strip().lower() in TRUE_VALUES).to_numpy(dtype=bool)
+
+
+class Query:
+    def __init__(self, reader, filters=()):
+        """
+        :param reader: database.Database_reader
+        :param filters: tuple of functions taking the reader and returning a boolean mask over its rows
+        """
+        self.reader = reader
+        self.filters = tuple(filters)
+
+    def add(self, function):
+        """
+        :param function: function taking the reader and returning a boolean mask over its rows
+        :return: Query, this query with one more filter
+        """
+        return Query(self.reader, self.filters + (function,))
+
+    def contain(self, elements, relation='and'):
+        """
+        :param elements: list of str, element symbols
+        :param relation: str, 'and' for the compounds containing all the elements, 'or' for those containing any
+        :return: Query
+        """
+        # A list, so that elements can be read again when the query is evaluated (e.g. if it is a generator)
+        elements = list(elements)
+        # Checked now, so that errors are raised where the query is built
+        self.reader.element_index.contain_bitset(elements, relation=relation)
+        return self.add(lambda reader: reader.compound_mask(
+            reader.element_index.to_mask(reader.element_index.contain_bitset(elements, relation=relation))))
+
+    def elements_no(self, number):
+        """
+        :param number: int, the number of different elements of the compounds
+        :return: Query
+        """
+        return self.add(lambda reader: reader.compound_mask(
+            reader.element_index.to_mask(reader.element_index.count_bitset(number))))
+
+    def where(self, column, values):
+        """
+        :param column: str, a column of the database
+        :param values: a value or a list of values
+        :return: Query, keeping the rows whose value of column is one of values.
+                 Values are compared as strings, so that e.g. 198 and '198' are the same
+        """
+        if column not in self.reader.get_columns:
+            raise ValueError('Column \'' + str(column) + '\' is not in the database')
+        values = to_list(values)
+        return self.add(lambda reader: reader.column_mask(column, values))
+
+    def spacegroup(self, names=None, numbers=None):
+        """
+        :param names: None, str or list of str, the names of the space groups (e.g. 'P 21 3')
+        :param numbers: None, int or list of int, the numbers of the space groups (e.g. 198)
+        :return: Query
+        """
+        query = self
+        if names is not None:
+            query = query.where(SPACE_GROUP, names)
+        if numbers is not None:
+            query = query.where(SPACE_GROUP_NUMBER, numbers)
+        return query
+
+    def point_group(self, groups):
+        """
+        :param groups: str or list of str, e.g. '23'
+        :return: Query
+        """
+        return self.where(POINT_GROUP, groups)
+
+    def skyrmion(self, types):
+        """
+        :param types: str or list of str, e.g. 'Bloch', ['Neel', 'Anti']
+        :return: Query
+        """
+        return self.where(SKYRMION, types)
+
+    def flag(self, column, value=True):
+        """
+        :param column: str, a column of flags (e.g. MAGNET_IN_TITLE)
+        :param value: bool
+        :return: Query, keeping the rows whose flag is value
+        """
+        if column not in self.reader.get_columns:
+            raise ValueError('Column \'' + str(column) + '\' is not in the database')
+        return self.add(lambda reader: reader.flag_mask(column) == bool(value))
+
+    def magnet_in_title(self, value=True):
+        return self.flag(MAGNET_IN_TITLE, value)
+
+    def magnet_in_journal(self, value=True):
+        return self.flag(MAGNET_IN_JOURNAL, value)
+
+    def magnet_in_title_or_journal(self, value=True):
+        return self.flag(MAGNET_IN_TITLE_OR_JOURNAL, value)
+
+    def mask(self):
+        """
+        :return: numpy array of booleans, the rows of the database matching all the filters
+        """
+        masks = [f(self.reader) for f in self.filters]
+        if not masks:
+            return np.ones(len(self.reader.get), dtype=bool)
+        return np.logical_and.reduce(masks)
+
+    def get(self):
+        """
+        :return: pandas DataFrame, the rows of the database matching all the filters
+        """
+        return self.reader.get[self.mask()]
+
+    def compounds(self):
+        """
+        :return: list of str, the compounds matching all the filters, each once, in the order of the database
+        """
+        return pd.unique(self.reader.get['Compound'][self.mask()]).tolist()
+
+    def count(self):
+        """
+        :return: int, the number of rows matching all the filters
+        """
+        return int(self.mask().sum())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reader of 'materials.csv' backed by an SQLite file, for databases too large to be kept in a pandas DataFrame.
+
+The csv file is imported once (in chunks, so that the memory used does not grow with the size of the file)
+into an SQLite file next to it, with the tables
+    materials(row, <the columns of the csv file>)       indexed on Compound and SG #
+    compounds(Compound, first_row, element_count)        one row per compound, indexed on element_count
+    compound_elements(element, Compound)                 the elements of each compound, indexed on element
+The file is imported again when the size or the modification time of the csv file changes.
+
+SQLiteDatabase_reader has the same methods as Database_reader (get_compounds, find_articles, contain,
+elements_no, get_spacegroup), answered by SQL queries. The SQLite file is opened read-only, so that several
+processes can read it at the same time; each process should create its own reader.
+
+To import this file, call
+
+>>> from sqlite_database import SQLiteDatabase_reader
+>>> database = SQLiteDatabase_reader('materials.csv')
+>>> database.get_spacegroup(['Fe Ge', 'Mn Si'])
+Out: {'Fe Ge': ('P 21 3', 198), 'Mn Si': ('P 21 3', 198)}
+"""
+
+import os
+import sqlite3
+
+import pandas as pd
+
+from database import MISSING_SPACEGROUP, cache_stamp, set_dtypes
+
+# Extension of the SQLite file, written next to the csv file
+SQLITE_EXTENSION = '.sqlite'
+
+# Number of rows of the csv file read at once
+CHUNKSIZE = 50000
+
+# Maximum number of values in the IN (...) of a query (SQLite allows 999 variables)
+MAX_VARIABLES = 900
+
+
+def import_csv(file_name, sqlite_file, stamp, chunksize=CHUNKSIZE, *args, **kwargs):
+    """
+    Import a csv file into an SQLite file (see the tables above)
+    :param file_name: str, the csv file
+    :param sqlite_file: str
+    :param stamp: str, see database.cache_stamp
+    :param chunksize: int, the number of rows read at once
+    *args and **kwargs are specific to pd.read_csv function
+    """
+    import lexicon as lex
+    # Written under a temporary name first, so that other processes never read half a file
+    temporary = sqlite_file + '.' + str(os.getpid())
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    try:
+        connection = sqlite3.connect(temporary)
+        try:
+            connection.execute('CREATE TABLE metadata (stamp TEXT)')
+            connection.execute('INSERT INTO metadata VALUES (?)', (stamp,))
+            connection.execute('CREATE TABLE compounds (Compound TEXT PRIMARY KEY, first_row INTEGER, '
+                               'element_count INTEGER)')
+            connection.execute('CREATE TABLE compound_elements (element TEXT, Compound TEXT, '
+                               'PRIMARY KEY (element, Compound))')
+
+            start = 0
+            for chunk in pd.read_csv(file_name, *args, chunksize=chunksize, **kwargs):
+                chunk = chunk.drop(columns=[c for c in chunk.columns if 'Unnamed:' in c])
+                chunk = set_dtypes(chunk)
+                for column in chunk.columns:
+                    if chunk[column].dtype.name == 'category':
+                        chunk[column] = chunk[column].astype(object)
+                chunk.insert(0, 'row', range(start, start + len(chunk)))
+                chunk.to_sql('materials', connection, if_exists='append', index=False)
+
+                compounds = chunk.drop_duplicates('Compound')
+                compounds = compounds[compounds['Compound'].map(lambda c: type(c) == str)]
+                elements = [set(lex.split_elements(c)) for c in compounds['Compound']]
+                # The first row of a compound is the one inserted first
+                connection.executemany('INSERT OR IGNORE INTO compounds VALUES (?, ?, ?)',
+                                       [(c, int(r), len(e)) for c, r, e in
+                                        zip(compounds['Compound'], compounds['row'], elements)])
+                connection.executemany('INSERT OR IGNORE INTO compound_elements VALUES (?, ?)',
+                                       [(element, c) for c, e in zip(compounds['Compound'], elements) for element in e])
+                start += len(chunk)
+
+            connection.execute('CREATE INDEX materials_compound ON materials (Compound, row)')
+            connection.execute('CREATE INDEX materials_sg ON materials ("SG #")')
+            connection.execute('CREATE INDEX compounds_element_count ON compounds (element_count, first_row)')
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(temporary, sqlite_file)
+    except BaseException:
+        # e.g. a row that pd.read_csv cannot read: the temporary file is not left behind
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def read_stamp(sqlite_file):
+    """
+    :param sqlite_file: str
+    :return: str, the stamp of the csv file the SQLite file was imported from, or None if there is no such file
+    """
+    if not os.path.exists(sqlite_file):
+        return None
+    connection = sqlite3.connect('file:' + sqlite_file + '?mode=ro', uri=True)
+    try:
+        return connection.execute('SELECT stamp FROM metadata').fetchone()[0]
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        connection.close()
+
+
+def batches(values, size=MAX_VARIABLES):
+    """
+    :param values: list
+    :param size: int
+    :return: generator of lists of at most size values
+    """
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class SQLiteDatabase_reader:
+    '''
+    Same as Database_reader, with the database kept in an SQLite file instead of memory
+    '''
+
+    def __init__(self, file_name='materials.csv', *args, sqlite_file=None, **kwargs):
+        """
+        *args and **kwargs are specific to pd.read_csv function
+        :param sqlite_file: None or str, the SQLite file. If not specified, file_name + SQLITE_EXTENSION
+        :return: None
+
+        Example of usage:
+
+        >>> database = SQLiteDatabase_reader('materials.csv')
+        """
+        if sqlite_file is None:
+            sqlite_file = file_name + SQLITE_EXTENSION
+        self.sqlite_file = sqlite_file
+
+        stamp = cache_stamp(file_name, args, kwargs)
+        if read_stamp(sqlite_file) != stamp:
+            import_csv(file_name, sqlite_file, stamp, CHUNKSIZE, *args, **kwargs)
+
+        self.connection = sqlite3.connect('file:' + sqlite_file + '?mode=ro', uri=True)
+
+    def close(self):
+        self.connection.close()
+
+    def query(self, sql, parameters=()):
+        """
+        :param sql: str
+        :param parameters: tuple
+        :return: list of tuples, the rows returned by the query
+        """
+        return self.connection.execute(sql, parameters).fetchall()
+
+    @property
+    def get(self):
+        """
+        Getting the full database (the whole database is read into memory)
+        :return: pandas dataframe, indexed by the rows of the csv file
+        """
+        return pd.read_sql_query('SELECT * FROM materials ORDER BY row', self.connection, index_col='row')
+
+    @property
+    def get_columns(self):
+        """
+        :return: The names of the columns
+        """
+        return pd.Index([name for _, name, _, _, _, _ in self.query('PRAGMA table_info(materials)')
+                         if name != 'row'])
+
+    @property
+    def get_compounds(self):
+        """
+        Return the list of compounds that are non-centrosymmetric
+        :return: list of compound names
+        """
+        return [c for c, in self.query('SELECT Compound FROM compounds ORDER BY first_row')]
+
+    def find_articles(self, compounds):
+        """
+        Find structural articles for a given compound name
+        :input: compounds (list of str)
+        :rtype: dictionary of articles, with keys being the compound names (empty lists for the compounds
+                that are not in the database)
+        """
+        result = {c: [] for c in compounds}
+        for batch in batches(list(result.keys())):
+            rows = self.query('SELECT Compound, row, "Structural Paper Title", Reference FROM materials '
+                              'WHERE Compound IN (' + ', '.join('?' * len(batch)) + ') ORDER BY row', tuple(batch))
+            for compound, row, title, reference in rows:
+                result[compound].append([row, title, reference])
+        return result
+
+    def contain(self, elements, relation='and'):
+        """
+        Return a list of compounds in database that contain the elements
+        relation can be specified as 'and' or 'or'
+        The elements are element symbols: 'S' is found in 'Zn S' but not in 'Mn Si'
+        """
+        import lexicon as lex
+        if relation not in ['and', 'or']:
+            raise ValueError('relation should only be either \'and\' or \'or\'.')
+        elements = list(set(elements))
+        for element in elements:
+            if not lex.is_element(element):
+                raise ValueError('\'' + str(element) + '\' is not a chemical element')
+        if not elements:
+            return self.get_compounds if relation == 'and' else []
+
+        if relation == 'and':
+            # The compounds of the first element, each looked up in the (element, Compound) key of the others
+            exists = ''.join(' AND EXISTS (SELECT 1 FROM compound_elements e WHERE e.element = ? '
+                             'AND e.Compound = c.Compound)' for _ in elements[1:])
+            sql = ('SELECT c.Compound FROM compound_elements f JOIN compounds c ON c.Compound = f.Compound '
+                   'WHERE f.element = ?' + exists + ' ORDER BY c.first_row')
+        else:
+            sql = ('SELECT Compound FROM compounds WHERE Compound IN (SELECT Compound FROM compound_elements '
+                   'WHERE element IN (' + ', '.join('?' * len(elements)) + ')) ORDER BY first_row')
+        rows = self.query(sql, tuple(elements))
+        return [c for c, in rows]
+
+    def elements_no(self, number=2):
+        """
+        Input: number of elements
+        :return: list of materials with the corresponding number of elements
+        """
+        return [c for c, in self.query('SELECT Compound FROM compounds WHERE element_count = ? ORDER BY first_row',
+                                       (int(number),))]
+
+    def get_spacegroup(self, compounds):
+        """
+        Function to get the space groups of a list of compounds
+
+        :param compounds: list of str
+        :return: dictionary with keys being the chemical formula and the values
+                is (name of space group, space group number) of the first row of the compound,
+                or MISSING_SPACEGROUP if the compound is not in the database
+        """
+        result = {c: MISSING_SPACEGROUP for c in compounds}
+        for batch in batches(list(result.keys())):
+            rows = self.query('SELECT m.Compound, m."Space Group", m."SG #" FROM compounds c '
+                              'JOIN materials m ON m.Compound = c.Compound AND m.row = c.first_row '
+                              'WHERE c.Compound IN (' + ', '.join('?' * len(batch)) + ')', tuple(batch))
+            for compound, name, number in rows:
+                result[compound] = (name, number)
+        return result